@@ -27,6 +27,8 @@ options:
     description:
       - The prefix or name of the auto scaling group(s) you are searching for.
       - "Note: This is a regular expression match with implicit '^' (beginning of string). Append '$' for a complete name match."
+      - A complete name match without other regular expression characters is looked up directly
+        instead of listing every group.
     required: false
   tags:
     description:
@@ -209,6 +211,52 @@ def match_asg_tags(tags_to_match, asg):
         else: return False
     return True
 
+# characters that make the name option more than a literal name
+REGEX_SPECIAL = '.^$*+?{}[]|()'
+
+
+def exact_asg_name(name):
+    """
+    Returns the group name the name option matches completely, or None if it
+    is a prefix or regular expression that may match several groups.
+    """
+    if not name.endswith('$'):
+        return None
+    literal = []
+    escaped = False
+    for char in name[:-1]:
+        if escaped:
+            if char.isalnum():
+                # \d, \w and friends are classes, not characters
+                return None
+            literal.append(char)
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char in REGEX_SPECIAL:
+            return None
+        else:
+            literal.append(char)
+    if escaped or not literal:
+        # '$' alone only matches an empty name, which no group has
+        return None
+    return ''.join(literal)
+
+
+def iter_asgs(conn, names=None):
+    """
+    Yields the groups from every page of describe_auto_scaling_groups, so
+    only one page is held at a time.
+    """
+    params = dict()
+    if names:
+        params['AutoScalingGroupNames'] = names
+    paginator = conn.get_paginator('describe_auto_scaling_groups')
+    for page in paginator.paginate(**params):
+        for asg in page['AutoScalingGroups']:
+            yield asg
+
+
 def find_asgs(conn, module, name=None, tags=None):
     """
     Args:
@@ -293,30 +341,38 @@ def find_asgs(conn, module, name=None, tags=None):
         ]
     """
 
-    try:
-        asgs = conn.describe_auto_scaling_groups()
-    except ClientError as e:
-        module.fail_json(msg=e.message, **camel_dict_to_snake_dict(e.response))
-
     matched_asgs = []
 
-    if name is not None:
+    exact_name = None
+    if name:
+        exact_name = exact_asg_name(name)
         # if the user didn't specify a name
         name_prog = re.compile(r'^' + name)
 
-    for asg in asgs['AutoScalingGroups']:
-        if name:
-            matched_name = name_prog.search(asg['AutoScalingGroupName'])
+    try:
+        if exact_name is not None:
+            # group names are unique, so this is one call for at most one group
+            asgs = iter_asgs(conn, names=[exact_name])
         else:
-            matched_name = True
+            asgs = iter_asgs(conn)
 
-        if tags:
-            matched_tags = match_asg_tags(tags, asg)
-        else:
-            matched_tags = True
+        for asg in asgs:
+            if name:
+                matched_name = name_prog.search(asg['AutoScalingGroupName'])
+            else:
+                matched_name = True
+
+            if tags:
+                matched_tags = match_asg_tags(tags, asg)
+            else:
+                matched_tags = True
 
-        if matched_name and matched_tags:
-            matched_asgs.append(camel_dict_to_snake_dict(asg))
+            if matched_name and matched_tags:
+                matched_asgs.append(camel_dict_to_snake_dict(asg))
+                if exact_name is not None:
+                    break
+    except ClientError as e:
+        module.fail_json(msg=e.message, **camel_dict_to_snake_dict(e.response))
 
     return matched_asgs
 
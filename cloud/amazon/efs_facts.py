@@ -50,6 +50,12 @@ options:
                     - SecurityGroups - Optional. List of security group IDs, of the form "sg-xxxxxxxx". These must be for the same VPC as subnet specified.
         required: false
         default: None
+    concurrency:
+        description:
+            - Number of API calls made at the same time to fetch the tags, mount targets and security groups of the file systems.
+        required: false
+        default: 4
+        version_added: "2.3"
 extends_documentation_fragment:
     - aws
 '''
@@ -158,12 +164,28 @@ tags:
             "name": "my-efs",
             "key": "Value"
         }
-
+api_calls:
+    description: number of describe calls made per API method, including throttled retries, and their total and longest latency in seconds
+    returned: always
+    type: dict
+    sample:
+        {
+            "describe_file_systems": {"calls": 1, "seconds": 0.214, "max_seconds": 0.214},
+            "describe_tags": {"calls": 12, "seconds": 1.503, "max_seconds": 0.187}
+        }
 '''
 
 
 from time import sleep
+from time import time as timestamp
 from collections import defaultdict
+import random
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
 try:
     from botocore.exceptions import ClientError
@@ -172,13 +194,20 @@ try:
 except ImportError as e:
     HAS_BOTO3 = False
 
+# throttled calls are retried up to MAX_RETRIES times, waiting at most
+# MAX_BACKOFF_SECONDS between two of them
+MAX_RETRIES = 8
+MAX_BACKOFF_SECONDS = 20
+DEFAULT_CONCURRENCY = 4
+
+
 class EFSConnection(object):
     STATE_CREATING = 'creating'
     STATE_AVAILABLE = 'available'
     STATE_DELETING = 'deleting'
     STATE_DELETED = 'deleted'
 
-    def __init__(self, module, region, **aws_connect_params):
+    def __init__(self, module, region, concurrency=DEFAULT_CONCURRENCY, **aws_connect_params):
         try:
             self.connection = boto3_conn(module, conn_type='client',
                                          resource='efs', region=region,
@@ -187,16 +216,22 @@ class EFSConnection(object):
             module.fail_json(msg="Failed to connect to AWS: %s" % str(e))
 
         self.region = region
+        self.concurrency = concurrency
+        self.stats = CallStats()
 
     def get_file_systems(self, **kwargs):
         """
-         Returns generator of file systems including all attributes of FS
+         Returns list of file systems including all attributes of FS. Tags,
+         mount targets and their security groups of the available ones are
+         fetched stage by stage on a pool of threads
         """
-        items = iterate_all(
+        items = list(iterate_all(
             'FileSystems',
             self.connection.describe_file_systems,
+            stats=self.stats,
             **kwargs
-        )
+        ))
+        available = []
         for item in items:
             item['CreationTime'] = str(item['CreationTime'])
             """
@@ -206,13 +241,29 @@ class EFSConnection(object):
             item['MountPoint'] = '.%s.efs.%s.amazonaws.com:/' % (item['FileSystemId'], self.region)
             if 'Timestamp' in item['SizeInBytes']:
                 item['SizeInBytes']['Timestamp'] = str(item['SizeInBytes']['Timestamp'])
+            item['Tags'] = {}
+            item['MountTargets'] = []
             if item['LifeCycleState'] == self.STATE_AVAILABLE:
-                item['Tags'] = self.get_tags(FileSystemId=item['FileSystemId'])
-                item['MountTargets'] = list(self.get_mount_targets(FileSystemId=item['FileSystemId']))
-            else:
-                item['Tags'] = {}
-                item['MountTargets'] = []
-            yield item
+                available.append(item)
+
+        def add_tags(item):
+            item['Tags'] = self.get_tags(FileSystemId=item['FileSystemId'])
+
+        def add_mount_targets(item):
+            item['MountTargets'] = list(iterate_all(
+                'MountTargets',
+                self.connection.describe_mount_targets,
+                stats=self.stats,
+                FileSystemId=item['FileSystemId']
+            ))
+
+        run_concurrently(
+            [(add_tags, item) for item in available] +
+            [(add_mount_targets, item) for item in available],
+            self.concurrency
+        )
+        self.add_security_groups([target for item in available for target in item['MountTargets']])
+        return items
 
     def get_tags(self, **kwargs):
         """
@@ -221,27 +272,26 @@ class EFSConnection(object):
         tags = iterate_all(
             'Tags',
             self.connection.describe_tags,
+            stats=self.stats,
             **kwargs
         )
         return dict((tag['Key'], tag['Value']) for tag in tags)
 
-    def get_mount_targets(self, **kwargs):
+    def add_security_groups(self, targets):
         """
-         Returns mount targets for selected instance of EFS
+         Sets security groups of the mount targets, fetched concurrently
         """
-        targets = iterate_all(
-            'MountTargets',
-            self.connection.describe_mount_targets,
-            **kwargs
-        )
+        def add(target):
+            target['SecurityGroups'] = list(self.get_security_groups(
+                MountTargetId=target['MountTargetId']
+            ))
+
         for target in targets:
-            if target['LifeCycleState'] == self.STATE_AVAILABLE:
-                target['SecurityGroups'] = list(self.get_security_groups(
-                    MountTargetId=target['MountTargetId']
-                ))
-            else:
-                target['SecurityGroups'] = []
-            yield target
+            target['SecurityGroups'] = []
+        run_concurrently(
+            [(add, target) for target in targets if target['LifeCycleState'] == self.STATE_AVAILABLE],
+            self.concurrency
+        )
 
     def get_security_groups(self, **kwargs):
         """
@@ -250,30 +300,113 @@ class EFSConnection(object):
         return iterate_all(
             'SecurityGroups',
             self.connection.describe_mount_target_security_groups,
+            stats=self.stats,
             **kwargs
         )
 
 
-def iterate_all(attr, map_method, **kwargs):
+class CallStats(object):
+    """
+     Number and latency of API calls per stage (API method), shared by threads
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+
+    def record(self, stage, seconds):
+        self.lock.acquire()
+        try:
+            stats = self.stages.setdefault(stage, dict(calls=0, seconds=0.0, max_seconds=0.0))
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+        finally:
+            self.lock.release()
+
+    def summary(self):
+        self.lock.acquire()
+        try:
+            return dict((stage, dict(calls=stats['calls'],
+                                     seconds=round(stats['seconds'], 3),
+                                     max_seconds=round(stats['max_seconds'], 3)))
+                        for (stage, stats) in self.stages.items())
+        finally:
+            self.lock.release()
+
+
+def backoff_delay(retries):
     """
-     Method creates iterator from boto result set
+     Exponential delay before retrying a throttled call, capped and jittered
+     so that concurrent callers spread out
+    """
+    delay = min(MAX_BACKOFF_SECONDS, 2 ** retries)
+    return random.uniform(delay / 2.0, delay)
+
+
+def iterate_all(attr, map_method, stats=None, **kwargs):
+    """
+     Method creates iterator from boto result set, following NextMarker and
+     retrying throttled calls with backoff. Other errors are raised
     """
     args = dict((key, value) for (key, value) in kwargs.items() if value is not None)
-    wait = 1
+    stage = getattr(map_method, '__name__', attr)
+    retries = 0
     while True:
+        started = timestamp()
         try:
             data = map_method(**args)
-            for elm in data[attr]:
-                yield elm
-            if 'NextMarker' in data:
-                args['Marker'] = data['Nextmarker']
-                continue
-            break
+            error = None
         except ClientError as e:
-            if e.response['Error']['Code'] == "ThrottlingException" and wait < 600:
-                sleep(wait)
-                wait = wait * 2
-                continue
+            error = e
+        if stats is not None:
+            stats.record(stage, timestamp() - started)
+        if error is not None:
+            if error.response['Error']['Code'] != "ThrottlingException" or retries >= MAX_RETRIES:
+                raise error
+            sleep(backoff_delay(retries))
+            retries += 1
+            continue
+        retries = 0
+        for elm in data[attr]:
+            yield elm
+        if data.get('NextMarker'):
+            args['Marker'] = data['NextMarker']
+            continue
+        break
+
+
+def run_concurrently(tasks, concurrency):
+    """
+     Calls every (function, argument) task on at most concurrency threads.
+     The first error raised by a task is raised again once all are done
+    """
+    work = queue.Queue()
+    for task in tasks:
+        work.put(task)
+    errors = []
+
+    def worker():
+        while True:
+            try:
+                function, argument = work.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                function(argument)
+            except Exception as e:
+                errors.append(e)
+
+    threads = []
+    for i in range(min(concurrency, len(tasks))):
+        t = threading.Thread(target=worker)
+        t.daemon = True
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+
+    if errors:
+        raise errors[0]
 
 
 def prefix_to_attr(attr_id):
@@ -341,7 +474,8 @@ def main():
         id=dict(required=False, type='str', default=None),
         name=dict(required=False, type='str', default=None),
         tags=dict(required=False, type="dict", default={}),
-        targets=dict(required=False, type="list", default=[])
+        targets=dict(required=False, type="list", default=[]),
+        concurrency=dict(required=False, type="int", default=DEFAULT_CONCURRENCY)
     ))
 
     module = AnsibleModule(argument_spec=argument_spec)
@@ -349,15 +483,21 @@ def main():
     if not HAS_BOTO3:
         module.fail_json(msg='boto3 required for this module')
 
+    if module.params.get('concurrency') < 1:
+        module.fail_json(msg='concurrency must be at least 1')
+
     region, _, aws_connect_params = get_aws_connection_info(module, boto3=True)
-    connection = EFSConnection(module, region, **aws_connect_params)
+    connection = EFSConnection(module, region, concurrency=module.params.get('concurrency'), **aws_connect_params)
 
     name = module.params.get('name')
     fs_id = module.params.get('id')
     tags = module.params.get('tags')
     targets = module.params.get('targets')
 
-    file_systems_info = connection.get_file_systems(FileSystemId=fs_id, CreationToken=name)
+    try:
+        file_systems_info = connection.get_file_systems(FileSystemId=fs_id, CreationToken=name)
+    except ClientError as e:
+        module.fail_json(msg=str(e), **camel_dict_to_snake_dict(e.response))
 
     if tags:
         file_systems_info = filter(lambda item: has_tags(item['Tags'], tags), file_systems_info)
@@ -368,7 +508,7 @@ def main():
                                    has_targets(item['MountTargets'], targets), file_systems_info)
 
     file_systems_info = [camel_dict_to_snake_dict(x) for x in file_systems_info]
-    module.exit_json(changed=False, ansible_facts={'efs': file_systems_info})
+    module.exit_json(changed=False, ansible_facts={'efs': file_systems_info}, api_calls=connection.stats.summary())
 
 from ansible.module_utils.basic import *
 from ansible.module_utils.ec2 import *
@@ -155,9 +155,13 @@ except ImportError:
 
 import re
 import datetime
+import random
 import time
 from functools import reduce
 
+# DescribeStream returns at most 100 shards per call
+DESCRIBE_STREAM_SHARD_LIMIT = 100
+
 
 def convert_to_lower(data):
     """Convert all uppercase keys in dict with lowercase_
@@ -294,7 +298,48 @@ def get_tags(client, stream_name, check_mode=False):
     return success, err_msg, results
 
 
-def find_stream(client, stream_name, check_mode=False):
+def get_shards(client, stream_name, count_only=False):
+    """Page through every shard of a Kinesis Stream.
+    Args:
+        client (botocore.client.EC2): Boto3 client.
+        stream_name (str): Name of the Kinesis stream.
+
+    Kwargs:
+        count_only (bool): Only count the shards instead of collecting them.
+            default=False
+
+    Basic Usage:
+        >>> client = boto3.client('kinesis')
+        >>> stream_name = 'test-stream'
+        >>> description, shard_count = (
+                get_shards(client, stream_name, count_only=True)
+            )
+
+    Returns:
+        Tuple (dict, list) or Tuple (dict, int) when count_only is set
+    """
+    params = {
+        'StreamName': stream_name,
+        'Limit': DESCRIBE_STREAM_SHARD_LIMIT,
+    }
+    shards = list()
+    shard_count = 0
+    while True:
+        description = client.describe_stream(**params)['StreamDescription']
+        page = description.pop('Shards')
+        shard_count += len(page)
+        if not count_only:
+            shards.extend(page)
+        if not description['HasMoreShards'] or not page:
+            break
+        params['ExclusiveStartShardId'] = page[-1]['ShardId']
+
+    if count_only:
+        return description, shard_count
+    return description, shards
+
+
+def find_stream(client, stream_name, check_mode=False, shards='list'):
     """Retrieve a Kinesis Stream.
     Args:
         client (botocore.client.EC2): Boto3 client.
@@ -303,6 +348,10 @@ def find_stream(client, stream_name, check_mode=False):
     Kwargs:
         check_mode (bool): This will pass DryRun as one of the parameters to the aws api.
             default=False
+        shards (str): 'list' to include Shards and ShardsCount, 'count' to
+            only include ShardsCount, None to only describe the stream
+            without paging through its shards.
+            default='list'
 
     Basic Usage:
         >>> client = boto3.client('kinesis')
@@ -313,22 +362,25 @@ def find_stream(client, stream_name, check_mode=False):
     """
     err_msg = ''
     success = False
-    params = {
-        'StreamName': stream_name,
-    }
     results = dict()
-    has_more_shards = True
-    shards = list()
     try:
         if not check_mode:
-            while has_more_shards:
+            if shards == 'list':
+                results, shard_list = get_shards(client, stream_name)
+                results['Shards'] = shard_list
+                results['ShardsCount'] = len(shard_list)
+            elif shards == 'count':
+                results, shard_count = (
+                    get_shards(client, stream_name, count_only=True)
+                )
+                results['ShardsCount'] = shard_count
+            else:
                 results = (
-                    client.describe_stream(**params)['StreamDescription']
+                    client.describe_stream(
+                        StreamName=stream_name, Limit=1
+                    )['StreamDescription']
                 )
-                shards.extend(results.pop('Shards'))
-                has_more_shards = results['HasMoreShards']
-            results['Shards'] = shards
-            results['ShardsCount'] = len(shards)
+                results.pop('Shards')
         else:
             results = {
                 'HasMoreShards': True,
@@ -344,6 +396,39 @@ def find_stream(client, stream_name, check_mode=False):
     return success, err_msg, results
 
 
+def wait_with_backoff(check, wait_timeout, delay=1, max_delay=30):
+    """Call check until it returns True or the timeout is reached, sleeping
+    exponentially longer between calls with random jitter, so that many
+    waiters do not poll the API in step.
+    Args:
+        check (callable): Returns True when the wait is over.
+        wait_timeout (int): Number of seconds to wait.
+
+    Kwargs:
+        delay (int): Seconds to sleep after the first call.
+            default=1
+        max_delay (int): Longest sleep between two calls.
+            default=30
+
+    Basic Usage:
+        >>> wait_with_backoff(lambda: stream_is_ready(), 300)
+
+    Returns:
+        bool
+    """
+    deadline = time.time() + wait_timeout
+    attempt = 0
+    while True:
+        if check():
+            return True
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return False
+        backoff = min(max_delay, delay * 2 ** attempt)
+        time.sleep(min(remaining, random.uniform(backoff / 2.0, backoff)))
+        attempt += 1
+
+
 def wait_for_status(client, stream_name, status, wait_timeout=300,
                     check_mode=False):
     """Wait for the the status to change for a Kinesis Stream.
@@ -366,43 +451,28 @@ def wait_for_status(client, stream_name, status, wait_timeout=300,
     Returns:
         Tuple (bool, str, dict)
     """
-    polling_increment_secs = 5
-    wait_timeout = time.time() + wait_timeout
-    status_achieved = False
-    stream = dict()
-    err_msg = ""
+    found = dict(stream=dict())
 
-    while wait_timeout > time.time():
-        try:
-            find_success, find_msg, stream = (
-                find_stream(client, stream_name, check_mode=check_mode)
+    def status_achieved():
+        find_success, find_msg, stream = (
+            find_stream(
+                client, stream_name, check_mode=check_mode, shards=None
             )
-            if check_mode:
-                status_achieved = True
-                break
-
-            elif status != 'DELETING':
-                if find_success and stream:
-                    if stream.get('StreamStatus') == status:
-                        status_achieved = True
-                        break
-
-            elif status == 'DELETING' and not check_mode:
-                if not find_success:
-                    status_achieved = True
-                    break
-
-            else:
-                time.sleep(polling_increment_secs)
-        except botocore.exceptions.ClientError as e:
-            err_msg = str(e)
-
-    if not status_achieved:
-        err_msg = "Wait time out reached, while waiting for results"
-    else:
+        )
+        found['stream'] = stream
+        if check_mode:
+            return True
+        elif status != 'DELETING':
+            return find_success and stream.get('StreamStatus') == status
+        # a throttled describe must not be mistaken for a deleted stream
+        return not find_success and 'ResourceNotFoundException' in find_msg
+
+    if wait_with_backoff(status_achieved, wait_timeout):
         err_msg = "Status {0} achieved successfully".format(status)
+        return True, err_msg, found['stream']
 
-    return status_achieved, err_msg, stream
+    err_msg = "Wait time out reached, while waiting for results"
+    return False, err_msg, found['stream']
 
 
 def tags_action(client, stream_name, tags, action='create', check_mode=False):
@@ -783,7 +853,9 @@ def update(client, current_stream, stream_name, retention_period=None,
                     return wait_success, False, wait_msg
             elif changed and not wait:
                 stream_found, stream_msg, current_stream = (
-                    find_stream(client, stream_name, check_mode=check_mode)
+                    find_stream(
+                        client, stream_name, check_mode=check_mode, shards=None
+                    )
                 )
                 if stream_found:
                     if current_stream['StreamStatus'] != 'ACTIVE':
@@ -855,7 +927,9 @@ def create_stream(client, stream_name, number_of_shards=1, retention_period=None
     results = dict()
 
     stream_found, stream_msg, current_stream = (
-        find_stream(client, stream_name, check_mode=check_mode)
+        find_stream(
+            client, stream_name, check_mode=check_mode, shards='count'
+        )
     )
     if stream_found:
         if current_stream['ShardsCount'] != number_of_shards:
@@ -915,7 +989,9 @@ def create_stream(client, stream_name, number_of_shards=1, retention_period=None
                     return success, changed, err_msg, results
 
             stream_found, stream_msg, current_stream = (
-                find_stream(client, stream_name, check_mode=check_mode)
+                find_stream(
+                    client, stream_name, check_mode=check_mode, shards=None
+                )
             )
             if retention_period and current_stream['StreamStatus'] == 'ACTIVE':
                 changed, err_msg = (
@@ -983,7 +1059,9 @@ def delete_stream(client, stream_name, wait=False, wait_timeout=300,
     err_msg = ''
     results = dict()
     stream_found, stream_msg, current_stream = (
-        find_stream(client, stream_name, check_mode=check_mode)
+        find_stream(
+            client, stream_name, check_mode=check_mode, shards=None
+        )
     )
     if stream_found:
         success, err_msg = (
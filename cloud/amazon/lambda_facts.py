@@ -16,6 +16,13 @@
 
 import datetime
 import sys
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
 try:
     import boto3
@@ -24,6 +31,10 @@ try:
 except ImportError:
     HAS_BOTO3 = False
 
+# error codes of requests refused for going over the account's API rate
+THROTTLING_ERRORS = ('TooManyRequestsException', 'ThrottlingException')
+THROTTLING_RETRIES = 5
+
 
 DOCUMENTATION = '''
 ---
@@ -40,6 +51,9 @@ options:
   query:
     description:
       - Specifies the resource type for which to gather facts.  Leave blank to retrieve all facts.
+      - With query 'all' and no function_name, every function of the region is listed, and the aliases,
+        versions, policy and event source mappings of each are gathered on C(concurrency) threads.
+      - With query 'config' and no function_name, the configuration of every function is listed.
     required: true
     choices: [ "aliases", "all", "config", "mappings", "policy", "versions" ]
     default: "all"
@@ -54,6 +68,19 @@ options:
       - For query type 'mappings', this is the Amazon Resource Name (ARN) of the Amazon Kinesis or DynamoDB stream.
     default: null
     required: false
+  concurrency:
+    description:
+      - For query type 'all' without function_name, the number of functions whose details are gathered at once.
+    default: 4
+    required: false
+    version_added: "2.3"
+  rate_limit:
+    description:
+      - For query type 'all' without function_name, the most API requests made per second by all threads
+        together. Use 0 for no limit.
+    default: 10
+    required: false
+    version_added: "2.3"
 author: Pierre Jodouin (@pjodouin)
 requirements:
     - boto3
@@ -83,6 +110,12 @@ EXAMPLES = '''
     max_items: 20
 - name: show Lambda facts
   debug: var=lambda_facts
+# Inventory every function of the region with all its details
+- name: Gather all facts of all functions
+  lambda_facts:
+    query: all
+    concurrency: 8
+    rate_limit: 15
 '''
 
 RETURN = '''
@@ -125,6 +158,150 @@ def fix_return(node):
     return node_value
 
 
+class RateLimiter(object):
+    """
+    Spaces out API requests so that at most rate of them start per second,
+    whichever thread makes them.
+    """
+
+    def __init__(self, rate):
+        self.interval = rate and 1.0 / rate or 0
+        self.lock = threading.Lock()
+        self.next_request = time.time()
+
+    def wait(self):
+        if not self.interval:
+            return
+        self.lock.acquire()
+        try:
+            now = time.time()
+            delay = self.next_request - now
+            self.next_request = max(now, self.next_request) + self.interval
+        finally:
+            self.lock.release()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def call(limiter, method, **params):
+    """
+    Makes one API request once the rate limiter allows it, retrying throttled requests.
+
+    :param limiter: RateLimiter shared by all threads
+    :param method: boto3 client method
+    :return dict: response
+    """
+
+    for attempt in range(THROTTLING_RETRIES + 1):
+        limiter.wait()
+        try:
+            return method(**params)
+        except ClientError as e:
+            if e.response['Error']['Code'] not in THROTTLING_ERRORS or attempt == THROTTLING_RETRIES:
+                raise
+        time.sleep(2 ** attempt)
+
+
+def list_all(limiter, method, key, **params):
+    """
+    Returns the items of every page of a Marker/NextMarker paginated listing.
+
+    :param limiter: RateLimiter shared by all threads
+    :param method: boto3 client method
+    :param key: key of the items in each page
+    :return list:
+    """
+
+    items = []
+    while True:
+        page = call(limiter, method, **params)
+        items.extend(page[key])
+        if not page.get('NextMarker'):
+            return items
+        params['Marker'] = page['NextMarker']
+
+
+def function_inventory(client, module):
+    """
+    Returns all facts of every lambda function. Event source mappings are listed once for all functions,
+    the aliases, versions and policy of each function are fetched on a pool of threads.
+
+    :param client: AWS API client reference (boto3)
+    :param module: Ansible module reference
+    :return dict:
+    """
+
+    limiter = RateLimiter(module.params.get('rate_limit'))
+
+    try:
+        functions = list_all(limiter, client.list_functions, 'Functions')
+        mapping_params = dict()
+        if module.params.get('event_source_arn'):
+            mapping_params['EventSourceArn'] = module.params.get('event_source_arn')
+        mappings = list_all(limiter, client.list_event_source_mappings, 'EventSourceMappings', **mapping_params)
+    except ClientError as e:
+        module.fail_json(msg='Unable to get function list, error: {0}'.format(e))
+
+    details = dict()
+    for func in functions:
+        details[func['FunctionName']] = dict(func, aliases=[], versions=[], policy={}, mappings=[])
+    for mapping in mappings:
+        # arn:aws:lambda:region:account:function:name[:qualifier]
+        function_name = mapping['FunctionArn'].split(':')[6]
+        if function_name in details:
+            details[function_name]['mappings'].append(mapping)
+
+    def add_aliases(function_name):
+        details[function_name]['aliases'] = list_all(
+            limiter, client.list_aliases, 'Aliases', FunctionName=function_name)
+
+    def add_versions(function_name):
+        details[function_name]['versions'] = list_all(
+            limiter, client.list_versions_by_function, 'Versions', FunctionName=function_name)
+
+    def add_policy(function_name):
+        # get_policy returns a JSON string so must convert to dict before reassigning to its key
+        details[function_name]['policy'] = json.loads(
+            call(limiter, client.get_policy, FunctionName=function_name)['Policy'])
+
+    work = queue.Queue()
+    for function_name in details:
+        for task in (add_aliases, add_versions, add_policy):
+            work.put((task, function_name))
+    errors = []
+
+    def worker():
+        while True:
+            try:
+                task, function_name = work.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                task(function_name)
+            except ClientError as e:
+                # functions deleted since they were listed keep empty details
+                if e.response['Error']['Code'] != 'ResourceNotFoundException':
+                    errors.append((function_name, e))
+            except Exception as e:
+                # e.g. connection errors and timeouts, which must not end the thread
+                # with its remaining tasks undone
+                errors.append((function_name, e))
+
+    threads = []
+    for i in range(min(module.params.get('concurrency'), work.qsize())):
+        t = threading.Thread(target=worker)
+        t.daemon = True
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+
+    if errors:
+        module.fail_json(msg='Unable to get {0} details, error: {1}'.format(*errors[0]))
+
+    return dict((function_name, camel_dict_to_snake_dict(facts)) for (function_name, facts) in details.items())
+
+
 def alias_details(client, module):
     """
     Returns list of aliases for a specified function.
@@ -180,7 +357,7 @@ def all_details(client, module):
         lambda_facts[function_name].update(version_details(client, module)[function_name])
         lambda_facts[function_name].update(mapping_details(client, module)[function_name])
     else:
-        lambda_facts.update(config_details(client, module))
+        lambda_facts.update(function_inventory(client, module))
 
     return lambda_facts
 
@@ -214,7 +391,10 @@ def config_details(client, module):
             params['Marker'] = module.params.get('next_marker')
 
         try:
-            lambda_facts.update(function_list=client.list_functions(**params)['Functions'])
+            if params:
+                lambda_facts.update(function_list=client.list_functions(**params)['Functions'])
+            else:
+                lambda_facts.update(function_list=list_all(RateLimiter(0), client.list_functions, 'Functions'))
         except ClientError as e:
             if e.response['Error']['Code'] == 'ResourceNotFoundException':
                 lambda_facts.update(function_list=[])
@@ -342,7 +522,9 @@ def main():
         dict(
             function_name=dict(required=False, default=None, aliases=['function', 'name']),
             query=dict(required=False, choices=['aliases', 'all', 'config', 'mappings', 'policy',  'versions'], default='all'),
-            event_source_arn=dict(required=False, default=None)
+            event_source_arn=dict(required=False, default=None),
+            concurrency=dict(required=False, type='int', default=4),
+            rate_limit=dict(required=False, type='float', default=10)
         )
     )
 
@@ -357,6 +539,11 @@ def main():
     if not HAS_BOTO3:
         module.fail_json(msg='boto3 is required for this module.')
 
+    if module.params['concurrency'] < 1:
+        module.fail_json(msg='concurrency must be at least 1.')
+    if module.params['rate_limit'] < 0:
+        module.fail_json(msg='rate_limit can not be negative.')
+
     # validate function_name if present
     function_name = module.params['function_name']
     if function_name:
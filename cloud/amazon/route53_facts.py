@@ -112,6 +112,41 @@ options:
         'tags',
         ]
     default: 'list'
+  all_pages:
+    description:
+      - "Used with query: record_sets and query: hosted_zone with
+        hosted_zone_method: list. Follows every page of results instead of
+        returning the first one, retrying with backoff when Route53 throttles
+        the requests. C(max_items) then sets the size of each page."
+    required: false
+    default: false
+    version_added: "2.3"
+  subdomain:
+    description:
+      - "Used with query: record_sets and all_pages. Only return the record
+        sets for this name and the names below it, e.g. C(internal.example.com.).
+        Route53 sorts record names label by label from the right, so these are
+        listed together and paging starts at this name and stops after them."
+    required: false
+    version_added: "2.3"
+  dest:
+    description:
+      - "Used with query: record_sets and all_pages. Write the record sets to
+        this local file as they are fetched instead of returning them, so
+        zones of any size can be exported. Only the number of record sets
+        is returned, and the task reports a change as C(dest) is rewritten."
+    required: false
+    version_added: "2.3"
+  dest_format:
+    description:
+      - Format of C(dest). C(json_lines) writes each record set as returned
+        by the API as a JSON document on its own line. C(csv) writes a
+        header and one row per record set, with multiple values separated
+        by newlines within the cell.
+    required: false
+    choices: [ 'json_lines', 'csv' ]
+    default: 'json_lines'
+    version_added: "2.3"
 author: Karen Cheng(@Etherdaemon)
 extends_documentation_fragment: aws
 '''
@@ -158,7 +193,43 @@ EXAMPLES = '''
     delegation_set_id: 'delegation id'
   register: delegation_sets
 
+- name: List every A record set in a zone, however many pages it takes
+  route53_facts:
+    query: record_sets
+    hosted_zone_id: 'ZZZ1111112222'
+    type: A
+    all_pages: true
+  register: a_records
+
+- name: Export a large zone to a CSV file on the controller
+  route53_facts:
+    query: record_sets
+    hosted_zone_id: 'ZZZ1111112222'
+    all_pages: true
+    dest: /tmp/zone.csv
+    dest_format: csv
+  delegate_to: localhost
+
+- name: List only the record sets below internal.example.com.
+  route53_facts:
+    query: record_sets
+    hosted_zone_id: 'ZZZ1111112222'
+    subdomain: internal.example.com.
+    all_pages: true
+  register: internal_records
+
 '''
+import csv
+import os
+import random
+import tempfile
+import time
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
 try:
     import boto
     import botocore
@@ -172,6 +243,148 @@ try:
 except ImportError:
     HAS_BOTO3 = False
 
+# Route53 allows five requests per second per account, requests over that
+# fail with one of these codes and are retried after a growing delay
+THROTTLING_ERRORS = ('Throttling', 'ThrottlingException', 'PriorRequestNotComplete')
+THROTTLING_RETRIES = 8
+THROTTLING_MAX_DELAY = 30
+
+RECORD_PAGE_PARAMS = (
+    ('NextRecordName', 'StartRecordName'),
+    ('NextRecordType', 'StartRecordType'),
+    ('NextRecordIdentifier', 'StartRecordIdentifier'),
+)
+
+CSV_FIELDS = ('Name', 'Type', 'TTL', 'SetIdentifier', 'Weight', 'Region',
+              'Failover', 'HealthCheckId', 'AliasTarget', 'Values')
+
+
+def call_with_backoff(method, **params):
+    attempt = 0
+    while True:
+        try:
+            return method(**params)
+        except botocore.exceptions.ClientError as e:
+            code = e.response.get('Error', {}).get('Code')
+            if code not in THROTTLING_ERRORS or attempt >= THROTTLING_RETRIES:
+                raise
+        time.sleep(random.uniform(0, min(THROTTLING_MAX_DELAY, 2 ** attempt)))
+        attempt += 1
+
+
+def record_pages(client, params):
+    ''' yield every page of record sets, starting from the one params point
+    at, following NextRecordName (and type and identifier) while the listing
+    is truncated '''
+    params = dict(params)
+    while True:
+        page = call_with_backoff(client.list_resource_record_sets, **params)
+        yield page
+        if not page['IsTruncated']:
+            return
+        for next_key, start_key in RECORD_PAGE_PARAMS:
+            if next_key in page:
+                params[start_key] = page[next_key]
+            else:
+                params.pop(start_key, None)
+
+
+def normalize_record_name(name):
+    name = name.lower()
+    if not name.endswith('.'):
+        name += '.'
+    return name
+
+
+def in_subdomain(name, subdomain):
+    name = normalize_record_name(name)
+    return name == subdomain or name.endswith('.' + subdomain)
+
+
+def all_record_sets(client, module, params):
+    ''' yield the record sets matching the type and subdomain filters from
+    every page, stopping as soon as the listing has moved past the
+    subdomain '''
+    record_type = module.params.get('type')
+    subdomain = module.params.get('subdomain')
+    if subdomain:
+        subdomain = normalize_record_name(subdomain)
+        if not module.params.get('start_record_name'):
+            params['StartRecordName'] = subdomain
+            params.pop('StartRecordType', None)
+
+    seen_subdomain = False
+    for page in record_pages(client, params):
+        for record in page['ResourceRecordSets']:
+            if subdomain:
+                if in_subdomain(record['Name'], subdomain):
+                    seen_subdomain = True
+                elif seen_subdomain:
+                    return
+                else:
+                    continue
+            if record_type and record['Type'] != record_type:
+                continue
+            yield record
+
+
+class RecordSetWriter(object):
+    ''' writes record sets to a temporary file next to dest, which replaces
+    dest once every record has been written '''
+
+    def __init__(self, module, dest, dest_format):
+        self.module = module
+        self.dest = dest
+        self.dest_format = dest_format
+        self.count = 0
+        fd, self.tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(dest)))
+        self.f = os.fdopen(fd, 'w')
+        if dest_format == 'csv':
+            self.writer = csv.writer(self.f, lineterminator='\n')
+            self.writer.writerow(CSV_FIELDS)
+
+    def encode(self, value):
+        # the python 2 csv module only writes byte strings
+        if PY2 and isinstance(value, text_type):
+            return value.encode('utf-8')
+        return value
+
+    def write(self, record):
+        if self.dest_format == 'csv':
+            row = []
+            for field in CSV_FIELDS:
+                if field == 'Values':
+                    row.append('\n'.join([r['Value'] for r in record.get('ResourceRecords', [])]))
+                elif field == 'AliasTarget':
+                    row.append(record.get('AliasTarget', {}).get('DNSName', ''))
+                else:
+                    row.append(record.get(field, ''))
+            self.writer.writerow([self.encode(value) for value in row])
+        else:
+            self.f.write(json.dumps(record) + '\n')
+        self.count += 1
+
+    def close(self):
+        self.f.close()
+        self.module.atomic_move(self.tmp_path, self.dest)
+
+    def cleanup(self):
+        ''' remove the temporary file unless close() has moved it to dest '''
+        self.f.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def all_hosted_zones(client, params):
+    params = dict(params)
+    zones = []
+    while True:
+        page = call_with_backoff(client.list_hosted_zones, **params)
+        zones.extend(page['HostedZones'])
+        if not page['IsTruncated']:
+            return zones
+        params['Marker'] = page['NextMarker']
+
 
 def get_hosted_zone(client, module):
     params = dict()
@@ -214,6 +427,9 @@ def list_hosted_zones(client, module):
     if module.params.get('delegation_set_id'):
         params['DelegationSetId'] = module.params.get('delegation_set_id')
 
+    if module.params.get('all_pages'):
+        return dict(HostedZones=all_hosted_zones(client, params), IsTruncated=False)
+
     results = client.list_hosted_zones(**params)
     return results
 
@@ -322,6 +538,12 @@ def record_sets_details(client, module):
     if module.params.get('start_record_name'):
         params['StartRecordName'] = module.params.get('start_record_name')
 
+    if module.params.get('all_pages'):
+        # type is a filter here, as a start it needs start_record_name too
+        if module.params.get('type') and module.params.get('start_record_name'):
+            params['StartRecordType'] = module.params.get('type')
+        return all_record_sets_details(client, module, params)
+
     if module.params.get('type') and not module.params.get('start_record_name'):
         module.fail_json(msg="start_record_name must be specified if type is set")
     elif module.params.get('type'):
@@ -331,6 +553,21 @@ def record_sets_details(client, module):
     return results
 
 
+def all_record_sets_details(client, module, params):
+    records = all_record_sets(client, module, params)
+    if not module.params.get('dest'):
+        return dict(ResourceRecordSets=list(records), IsTruncated=False)
+
+    writer = RecordSetWriter(module, module.params.get('dest'), module.params.get('dest_format'))
+    try:
+        for record in records:
+            writer.write(record)
+        writer.close()
+    finally:
+        writer.cleanup()
+    return dict(changed=True, dest=module.params.get('dest'), record_count=writer.count, IsTruncated=False)
+
+
 def health_check_details(client, module):
     health_check_invocations = {
         'list': list_health_checks,
@@ -396,6 +633,10 @@ def main():
             'count',
             'tags',
         ], default='list'),
+        all_pages=dict(type='bool', default=False),
+        subdomain=dict(),
+        dest=dict(type='path'),
+        dest_format=dict(choices=['json_lines', 'csv'], default='json_lines'),
         )
     )
 
@@ -406,6 +647,9 @@ def main():
         ],
     )
 
+    if (module.params.get('subdomain') or module.params.get('dest')) and not module.params.get('all_pages'):
+        module.fail_json(msg="subdomain and dest can only be used with all_pages")
+
     # Validate Requirements
     if not (HAS_BOTO or HAS_BOTO3):
         module.fail_json(msg='json and boto/boto3 is required.')
@@ -431,6 +675,7 @@ def main():
 # import module snippets
 from ansible.module_utils.basic import *
 from ansible.module_utils.ec2 import *
+from ansible.module_utils.six import PY2, text_type
 
 if __name__ == '__main__':
     main()
@@ -27,6 +27,14 @@ description:
   - If the key represents a prefix then Note that when a value is removed, the existing
     value if any is returned as part of the results.
   - "See http://www.consul.io/docs/agent/http.html#kv for more details."
+  - With the state 'sync' a whole tree of keys below the prefix given in C(key)
+    is made to match the supplied C(tree) or C(src). The prefix is read once
+    and the differences are applied through the transaction endpoint, see
+    https://www.consul.io/docs/agent/http/kv.html#txn
+  - With the state 'wait_for' the module holds a blocking query on the key,
+    or on every key below it with C(recurse), and returns once it changes,
+    instead of polling it repeatedly. See
+    https://www.consul.io/docs/agent/http.html#blocking-queries
 requirements:
   - "python >= 2.6"
   - python-consul
@@ -45,9 +53,14 @@ options:
             lock associated with a key/value pair with the states 'acquire' or
             'release' respectively. a valid session must be supplied to make the
             attempt changed will be true if the attempt is successful, false
-            otherwise.
+            otherwise. The state 'sync' makes every key below the prefix C(key)
+            match C(tree) or C(src); keys below the prefix that are not supplied
+            are removed. The state 'wait_for' waits until the key (or prefix with
+            C(recurse)) is modified, or holds C(value) if one is given, and
+            returns its contents without changing anything. Check mode is
+            only supported with state 'sync'.
         required: false
-        choices: ['present', 'absent', 'acquire', 'release']
+        choices: ['present', 'absent', 'acquire', 'release', 'sync', 'wait_for']
         default: present
     key:
         description:
@@ -111,6 +124,41 @@ options:
         required: false
         default: True
         version_added: "2.1"
+    tree:
+        description:
+          - with state 'sync', a dictionary of keys relative to the prefix
+            C(key) and their values. Nested dictionaries are flattened into
+            keys separated by '/'. A null value is stored as an empty value.
+          - Mutually exclusive with C(src) and C(value).
+        required: false
+        default: None
+        version_added: "2.3"
+    src:
+        description:
+          - with state 'sync', a local directory to load the tree from. Each
+            file below it becomes a key, named by its path relative to C(src),
+            holding the contents of the file.
+          - Mutually exclusive with C(tree) and C(value).
+        required: false
+        default: None
+        version_added: "2.3"
+    index:
+        description:
+          - with state 'wait_for', the index to wait for a change from, usually
+            the C(index) returned by an earlier task. If not given the current
+            index of the key is read first, so only later changes count. If the
+            key was deleted since this index, that is not noticed and the wait
+            goes on until the key is written again.
+        required: false
+        default: None
+        version_added: "2.3"
+    timeout:
+        description:
+          - with state 'wait_for', the number of seconds to wait before giving
+            up. The result then has C(timed_out) set.
+        required: false
+        default: 300
+        version_added: "2.3"
 """
 
 
@@ -137,12 +185,81 @@ EXAMPLES = '''
       value: 20160509
       session: "{{ sessionid }}"
       state: acquire
+
+  - name: make everything below config/app match a dictionary
+    consul_kv:
+      key: config/app
+      state: sync
+      tree:
+        db:
+          host: db.example.com
+          port: 5432
+        log_level: info
+
+  - name: make everything below config/web match the files of a directory
+    consul_kv:
+      key: config/web
+      state: sync
+      src: files/consul/web
+
+  - name: wait until the rollout flag is set by another host
+    consul_kv:
+      key: rollout/web/ready
+      value: 'true'
+      state: wait_for
+      timeout: 600
+    register: ready
+    failed_when: ready.timed_out
+
+  - name: wait for any change below config/app after a known index
+    consul_kv:
+      key: config/app
+      recurse: true
+      state: wait_for
+      index: "{{ previous.index }}"
 '''
 
+RETURN = '''
+added:
+    description: keys created by state 'sync'
+    returned: when state is sync
+    type: list
+    sample: ['config/app/db/host']
+updated:
+    description: keys whose value was changed by state 'sync'
+    returned: when state is sync
+    type: list
+    sample: ['config/app/log_level']
+removed:
+    description: keys below the prefix removed by state 'sync'
+    returned: when state is sync
+    type: list
+    sample: ['config/app/old_setting']
+transactions:
+    description: number of transactions sent to apply the changes
+    returned: when state is sync
+    type: int
+    sample: 1
+timed_out:
+    description: whether state 'wait_for' gave up after C(timeout) seconds
+    returned: when state is wait_for
+    type: bool
+    sample: false
+'''
+
+import os
 import sys
+import time
+import base64
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
 
 try:
     import consul
+    import requests
     from requests.exceptions import ConnectionError
     python_consul_installed = True
 except ImportError, e:
@@ -150,13 +267,26 @@ except ImportError, e:
 
 from requests.exceptions import ConnectionError
 
+# Consul refuses transactions with more than 64 operations
+TXN_MAX_OPERATIONS = 64
+# and caps blocking queries at ten minutes
+MAX_BLOCKING_WAIT = 600
+
+
+class TransactionConflict(Exception):
+    pass
+
 def execute(module):
 
     state = module.params.get('state')
 
     if state == 'acquire' or state == 'release':
         lock(module, state)
-    if state == 'present':
+    if state == 'sync':
+        sync_tree(module)
+    elif state == 'wait_for':
+        wait_for_change(module)
+    elif state == 'present':
         add_value(module)
     else:
         remove_value(module)
@@ -240,6 +370,225 @@ def remove_value(module):
                      data=existing)
 
 
+def sync_tree(module):
+    ''' make the keys below the prefix match the supplied tree. The prefix is
+    read once and every difference is applied with a check-and-set against the
+    index that was read, so a concurrent writer fails the transaction instead
+    of being overwritten. '''
+    consul_api = get_consul_api(module)
+
+    prefix = module.params.get('key').rstrip('/') + '/'
+    if module.params.get('src'):
+        wanted = load_tree_from_directory(module, module.params.get('src'))
+    elif module.params.get('tree') is not None:
+        wanted = flatten_tree(module.params.get('tree'))
+    else:
+        module.fail_json(msg='state sync requires either tree or src')
+
+    index, entries = consul_api.kv.get(prefix, recurse=True)
+    existing = {}
+    for entry in entries or []:
+        # folders have no value and are left alone
+        if entry['Key'].endswith('/') and entry['Value'] is None:
+            continue
+        existing[entry['Key'][len(prefix):]] = entry
+
+    flags = module.params.get('flags')
+    operations = []
+    added = []
+    updated = []
+    removed = []
+    for name in sorted(wanted):
+        value = wanted[name]
+        entry = existing.get(name)
+        if entry is None:
+            # an index of 0 only creates the key if it still does not exist
+            operations.append(txn_set(prefix + name, value, 0, flags))
+            added.append(prefix + name)
+        elif entry['Value'] != value or \
+                (flags is not None and entry['Flags'] != int(flags)):
+            operations.append(
+                txn_set(prefix + name, value, entry['ModifyIndex'], flags))
+            updated.append(prefix + name)
+    for name in sorted(existing):
+        if name not in wanted:
+            operations.append(dict(KV=dict(
+                Verb='delete-cas', Key=prefix + name,
+                Index=existing[name]['ModifyIndex'])))
+            removed.append(prefix + name)
+
+    transactions = 0
+    if operations and not module.check_mode:
+        for start in range(0, len(operations), TXN_MAX_OPERATIONS):
+            try:
+                execute_transaction(
+                    module, operations[start:start + TXN_MAX_OPERATIONS])
+            except TransactionConflict, e:
+                module.fail_json(
+                    msg='keys below %s were changed by another writer, %d of '
+                        '%d operations were applied: %s' % (
+                            prefix, start, len(operations), str(e)),
+                    transactions=transactions)
+            transactions += 1
+
+    module.exit_json(changed=bool(operations),
+                     index=index,
+                     key=prefix,
+                     added=added,
+                     updated=updated,
+                     removed=removed,
+                     transactions=transactions)
+
+
+def wait_for_change(module):
+    ''' hold blocking queries on the key until it is modified after the
+    index given, or holds the expected value, or the timeout expires. Consul
+    answers a blocking query early when anything it covers changes, which
+    for a missing key is any key in the store, so the data returned is
+    compared with what was there before and the wait goes on if the key
+    itself did not change. '''
+    consul_api = get_consul_api(module)
+
+    key = module.params.get('key')
+    recurse = module.params.get('recurse')
+    expected = module.params.get('value')
+    if expected is not None:
+        if recurse:
+            module.fail_json(msg='value can not be waited for with recurse')
+        expected = encode_value(expected)
+
+    deadline = time.time() + module.params.get('timeout')
+    current, data = consul_api.kv.get(key, recurse=recurse)
+    if expected is not None and value_matches(data, expected):
+        module.exit_json(changed=False, index=current, key=key,
+                         data=data, timed_out=False)
+    index = module.params.get('index')
+    if index is None:
+        index = current
+    elif expected is None and modified_after(data, index):
+        module.exit_json(changed=False, index=current, key=key,
+                         data=data, timed_out=False)
+    previous = modify_indexes(data)
+
+    while True:
+        remaining = int(deadline - time.time())
+        if remaining <= 0:
+            module.exit_json(changed=False, index=index, key=key,
+                             timed_out=True)
+        current, data = consul_api.kv.get(
+            key, recurse=recurse, index=index,
+            wait='%ds' % min(remaining, MAX_BLOCKING_WAIT))
+        if current == index:
+            # the wait expired without a change
+            continue
+        # a lower index means it was reset, e.g. by a snapshot restore, and
+        # is taken as the new starting point just the same
+        index = current
+        state = modify_indexes(data)
+        if state == previous:
+            # woken by a write to some other key
+            continue
+        previous = state
+        if expected is None or value_matches(data, expected):
+            module.exit_json(changed=False, index=index, key=key,
+                             data=data, timed_out=False)
+
+
+def modify_indexes(data):
+    ''' what identifies the state of a key, or of the keys below a prefix '''
+    if data is None:
+        return None
+    if isinstance(data, list):
+        return sorted([(entry['Key'], entry['ModifyIndex']) for entry in data])
+    return data['ModifyIndex']
+
+
+def modified_after(data, index):
+    if data is None:
+        return False
+    if not isinstance(data, list):
+        data = [data]
+    for entry in data:
+        if entry['ModifyIndex'] > index:
+            return True
+    return False
+
+
+def value_matches(data, expected):
+    return data is not None and data['Value'] == expected
+
+
+def flatten_tree(tree, path=''):
+    ''' turn nested dictionaries into a flat dictionary of keys joined with
+    '/' and string values '''
+    flat = {}
+    for name, value in tree.items():
+        key = path + str(name).strip('/')
+        if isinstance(value, dict):
+            flat.update(flatten_tree(value, key + '/'))
+        elif value is None:
+            flat[key] = encode_value('')
+        else:
+            flat[key] = encode_value(value)
+    return flat
+
+
+def encode_value(value):
+    if isinstance(value, bool):
+        value = str(value).lower()
+    elif not isinstance(value, (binary_type, text_type)):
+        value = str(value)
+    if isinstance(value, text_type):
+        value = value.encode('utf-8')
+    return value
+
+
+def load_tree_from_directory(module, src):
+    if not os.path.isdir(src):
+        module.fail_json(msg='src %s is not a directory' % src)
+    tree = {}
+    for root, dirs, files in os.walk(src):
+        for name in files:
+            path = os.path.join(root, name)
+            key = os.path.relpath(path, src).replace(os.sep, '/')
+            f = open(path, 'rb')
+            try:
+                tree[key] = f.read()
+            finally:
+                f.close()
+    return tree
+
+
+def txn_set(key, value, index, flags=None):
+    operation = dict(Verb='cas', Key=key, Index=index,
+                     Value=base64.b64encode(value).decode('ascii'))
+    if flags is not None:
+        operation['Flags'] = int(flags)
+    return dict(KV=operation)
+
+
+def execute_transaction(module, operations):
+    ''' apply the operations atomically with a single request to the txn
+    endpoint, raising TransactionConflict if any check-and-set failed '''
+    url = '%s://%s:%s/v1/txn' % (module.params.get('scheme'),
+                                 module.params.get('host'),
+                                 module.params.get('port'))
+    params = {}
+    if module.params.get('token'):
+        params['token'] = module.params.get('token')
+    response = requests.put(url, params=params, data=json.dumps(operations),
+                            verify=module.params.get('validate_certs'))
+    if response.status_code == 409:
+        errors = response.json().get('Errors') or []
+        raise TransactionConflict('; '.join([
+            '%s: %s' % (operations[error['OpIndex']]['KV']['Key'],
+                        error['What']) for error in errors]))
+    if response.status_code != 200:
+        module.fail_json(msg='transaction failed with status %d: %s' % (
+            response.status_code, response.text))
+    return response.json()
+
+
 def get_consul_api(module, token=None):
     return consul.Consul(host=module.params.get('host'),
                          port=module.params.get('port'),
@@ -264,13 +613,25 @@ def main():
         port=dict(default=8500, type='int'),
         recurse=dict(required=False, type='bool'),
         retrieve=dict(required=False, default=True),
-        state=dict(default='present', choices=['present', 'absent', 'acquire', 'release']),
+        state=dict(default='present', choices=['present', 'absent', 'acquire', 'release', 'sync', 'wait_for']),
         token=dict(required=False, default='anonymous', no_log=True),
         value=dict(required=False),
-        session=dict(required=False)
+        session=dict(required=False),
+        tree=dict(required=False, type='dict'),
+        src=dict(required=False, type='path'),
+        index=dict(required=False, type='int'),
+        timeout=dict(required=False, default=300, type='int')
     )
 
-    module = AnsibleModule(argument_spec, supports_check_mode=False)
+    module = AnsibleModule(argument_spec, supports_check_mode=True,
+                           mutually_exclusive=[['tree', 'src'],
+                                               ['value', 'tree'],
+                                               ['value', 'src']])
+
+    # only the sync state reports what it would change
+    if module.check_mode and module.params.get('state') != 'sync':
+        module.exit_json(skipped=True,
+                         msg='check mode is only supported with state sync')
 
     test_dependencies(module)
         
@@ -285,5 +646,6 @@ def main():
 
 # import module snippets
 from ansible.module_utils.basic import *
+from ansible.module_utils.six import binary_type, text_type
 if __name__ == '__main__':
     main()
@@ -40,8 +40,9 @@ options:
     required: true
   format:
     description:
-      - The type of compression to use. Can be 'gz', 'bz2', or 'zip'.
-    choices: [ 'gz', 'bz2', 'zip' ]
+      - The type of compression to use. Can be 'gz', 'bz2', 'xz', 'zst', 'zip' or 'tar'.
+      - 'xz' requires the lzma module (or backports.lzma), 'zst' requires the zstandard module.
+    choices: [ 'gz', 'bz2', 'xz', 'zst', 'zip', 'tar' ]
     default: 'gz'
   dest:
     description:
@@ -54,11 +55,39 @@ options:
     type: bool
     required: false
     default: false
+  manifest:
+    description:
+      - Keep a manifest of the archive members (path, size, mtime and checksum) in a C(<dest>.manifest) file next to the archive.
+      - When the manifest of the source paths matches the stored one, the archive is left untouched instead of being rebuilt.
+      - Only applies when archiving multiple files or trees.
+    type: bool
+    required: false
+    default: false
+    version_added: 2.3
+  threads:
+    description:
+      - Number of processes used to compress I(gz), I(bz2) and I(xz) output.
+      - With more than one, the stream is cut into independent blocks that are compressed in parallel and
+        written as consecutive gzip, bzip2 or xz members, which standard tools decompress as a single file.
+      - This only pays off with that many idle CPUs on the target; on a single CPU it is slightly slower
+        than I(threads=1), and the output is a little larger.
+      - For I(zst) this is passed to the zstandard compressor, which does its own multi-threading.
+      - Ignored for I(zip) and I(tar), or when the multiprocessing module is not available on the target.
+    required: false
+    default: 1
+    version_added: 2.3
+  compression_level:
+    description:
+      - Compression level, from 1 (fastest) to 9 (smallest) for I(gz), I(bz2) and I(xz), or 1 to 22 for I(zst).
+      - Defaults to 9 for I(gz) and I(bz2), 6 for I(xz) and 3 for I(zst). Ignored for I(zip) and I(tar).
+    required: false
+    default: null
+    version_added: 2.3
 
 author: "Ben Doherty (@bendoh)"
 notes:
     - requires tarfile, zipfile, gzip, and bzip2 packages on target host
-    - can produce I(gzip), I(bzip2) and I(zip) compressed files or archives
+    - can produce I(gzip), I(bzip2), I(xz), I(zstd) and I(zip) compressed files or archives
 '''
 
 EXAMPLES = '''
@@ -78,6 +107,15 @@ EXAMPLES = '''
         - /path/wong/foo
     dest: /path/file.tar.bz2
     format: bz2
+
+# Compress a large tree using 8 cores
+- archive: path=/path/to/artifacts dest=/path/to/artifacts.tgz threads=8
+
+# Create a fast zstd archive of /path/to/foo
+- archive: path=/path/to/foo dest=/path/to/foo.tar.zst format=zst compression_level=1
+
+# Only rebuild /path/logs.tgz when something under /path/logs changed
+- archive: path=/path/logs dest=/path/logs.tgz manifest=yes
 '''
 
 RETURN = '''
@@ -104,6 +142,18 @@ arcroot:
 expanded_paths:
     description: The list of matching paths from paths argument.
     type: list
+added:
+    description: Archive members that were not in the previous manifest.
+    type: list
+    returned: when manifest is true
+removed:
+    description: Archive members of the previous manifest that no longer exist.
+    type: list
+    returned: when manifest is true
+modified:
+    description: Archive members whose size, mtime or checksum differ from the previous manifest.
+    type: list
+    returned: when manifest is true
 '''
 
 import os
@@ -112,17 +162,287 @@ import glob
 import shutil
 import gzip
 import bz2
-import filecmp
 import zipfile
 import tarfile
+import struct
+import zlib
+
+try:
+    import multiprocessing
+    HAS_MULTIPROCESSING = True
+except ImportError:
+    HAS_MULTIPROCESSING = False
+
+try:
+    import lzma
+    HAS_LZMA = True
+except ImportError:
+    try:
+        from backports import lzma
+        HAS_LZMA = True
+    except ImportError:
+        HAS_LZMA = False
+
+try:
+    import zstandard
+    HAS_ZSTANDARD = True
+except ImportError:
+    HAS_ZSTANDARD = False
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+
+# Size of the uncompressed blocks handed to each compression process
+PARALLEL_BLOCK_SIZE = 1024 * 1024
+
+# Default and maximum compression level of each compressed format
+COMPRESSION_LEVELS = dict(
+    gz=(9, 9),
+    bz2=(9, 9),
+    xz=(6, 9),
+    zst=(3, 22),
+)
+
+
+def compress_block(args):
+    ''' Compress one block into a complete, standalone gzip, bzip2 or xz member '''
+    format, level, data = args
+
+    if format == 'bz2':
+        return bz2.compress(data, level)
+
+    if format == 'xz':
+        return lzma.compress(data, preset=level)
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    body = compressor.compress(data) + compressor.flush()
+    header = struct.pack('<BBBBLBB', 0x1f, 0x8b, 8, 0, 0, 0, 255)
+    trailer = struct.pack('<LL', zlib.crc32(data) & 0xffffffff, len(data) & 0xffffffff)
+    return header + body + trailer
+
+
+class ParallelCompressor(object):
+    ''' File-like object that compresses what is written to it on a process pool
+
+    The output is a sequence of gzip, bzip2 or xz members, one per block, in
+    the order the data was written. Only a bounded number of blocks are in flight.
+    '''
+
+    def __init__(self, path, format, level, threads):
+        self.format = format
+        self.level = level
+        self.threads = threads
+        self.fileobj = open(path, 'wb')
+        self.pool = multiprocessing.Pool(threads)
+        self.pending = []
+        self.buffer = []
+        self.buffered = 0
+        self.members = 0
+
+    def write(self, data):
+        self.buffer.append(data)
+        self.buffered += len(data)
+
+        if self.buffered >= PARALLEL_BLOCK_SIZE:
+            self._submit()
+
+    def _submit(self):
+        if self.buffer:
+            data = self.buffer[0][:0].join(self.buffer)
+        else:
+            data = ''.encode('ascii')
+        self.buffer = []
+        self.buffered = 0
+        self.members += 1
+
+        self.pending.append(self.pool.apply_async(compress_block, [(self.format, self.level, data)]))
+
+        # Keep memory bounded: wait for the oldest block before queueing more
+        while len(self.pending) > self.threads * 2:
+            self.fileobj.write(self.pending.pop(0).get())
+
+    def close(self):
+        try:
+            # An empty input still needs one (empty) member to be a valid file
+            if self.buffered or not self.members:
+                self._submit()
+
+            while self.pending:
+                self.fileobj.write(self.pending.pop(0).get())
+
+            self.pool.close()
+        finally:
+            self.pool.terminate()
+            self.fileobj.close()
+
+
+class ZstdCompressor(object):
+    ''' File-like object streaming what is written to it into a zstd frame '''
+
+    def __init__(self, path, level, threads):
+        if threads > 1:
+            self.compressor = zstandard.ZstdCompressor(level=level, threads=threads).compressobj()
+        else:
+            self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        self.fileobj = open(path, 'wb')
+
+    def write(self, data):
+        self.fileobj.write(self.compressor.compress(data))
+
+    def close(self):
+        try:
+            self.fileobj.write(self.compressor.flush())
+        finally:
+            self.fileobj.close()
+
+
+def open_compressed(path, format, level, threads, parallel):
+    ''' Open a writable, streaming compressed file object for the given format '''
+    if parallel:
+        return ParallelCompressor(path, format, level, threads)
+    elif format == 'gz':
+        return gzip.GzipFile(path, 'wb', level)
+    elif format == 'bz2':
+        return bz2.BZ2File(path, 'w', compresslevel=level)
+    elif format == 'xz':
+        return lzma.LZMAFile(path, 'w', preset=level)
+    elif format == 'zst':
+        return ZstdCompressor(path, level, threads)
+
+    raise OSError("Invalid format")
+
+
+def archive_members(archive_paths, match_root, dest, manifest=False):
+    ''' Yield (fullpath, arcname, is_dir, top) for everything that goes into the archive,
+    leaving out the manifest of the archive when manifest is set '''
+    manifest_path = None
+    if manifest:
+        manifest_path = dest + '.manifest'
+
+    # Identify the archive itself by device and inode, so it is never added
+    # to itself. Only the directory holding it needs per-file checks.
+    dest_id = dest_dir_id = None
+    if os.path.exists(dest):
+        st = os.stat(dest)
+        dest_id = (st.st_dev, st.st_ino)
+        st = os.stat(os.path.dirname(os.path.abspath(dest)))
+        dest_dir_id = (st.st_dev, st.st_ino)
+
+    for path in archive_paths:
+        if os.path.isdir(path):
+            # Recurse into directories
+            for dirpath, dirnames, filenames in os.walk(path, topdown=True):
+                if not dirpath.endswith(os.sep):
+                    dirpath += os.sep
+
+                check_dest = False
+                if dest_dir_id is not None:
+                    st = os.stat(dirpath)
+                    check_dest = (st.st_dev, st.st_ino) == dest_dir_id
+
+                for dirname in dirnames:
+                    fullpath = dirpath + dirname
+                    yield fullpath, match_root.sub('', fullpath), True, path
+
+                for filename in filenames:
+                    fullpath = dirpath + filename
+
+                    if fullpath == manifest_path:
+                        continue
+
+                    if check_dest:
+                        st = os.lstat(fullpath)
+                        if (st.st_dev, st.st_ino) == dest_id:
+                            continue
+
+                    yield fullpath, match_root.sub('', fullpath), False, path
+        else:
+            yield path, match_root.sub('', path), False, None
+
+
+def build_manifest(module, archive_paths, match_root, dest, format):
+    ''' Describe every archive member by its size, mtime and checksum, and list the source files '''
+    members = {}
+    sources = []
+
+    for fullpath, arcname, is_dir, top in archive_members(archive_paths, match_root, dest, True):
+        st = os.lstat(fullpath)
+
+        if is_dir:
+            members[arcname] = dict(type='dir')
+            continue
+
+        sources.append(fullpath)
+
+        if os.path.islink(fullpath):
+            members[arcname] = dict(type='link', checksum=os.readlink(fullpath))
+        else:
+            members[arcname] = dict(type='file', size=st.st_size, mtime=int(st.st_mtime), checksum=module.sha1(fullpath))
+
+    return dict(format=format, members=members), sources
+
+
+def read_manifest(manifest_path):
+    ''' Load a previously written manifest, or None if there is no usable one '''
+    if not os.path.exists(manifest_path):
+        return None
+
+    try:
+        f = open(manifest_path, 'r')
+        try:
+            return json.loads(f.read())
+        finally:
+            f.close()
+    except (IOError, ValueError):
+        return None
+
+
+def write_manifest(module, manifest_path, manifest):
+    ''' Atomically replace the manifest next to the archive '''
+    tmp_path = manifest_path + '.tmp'
+
+    f = open(tmp_path, 'w')
+    try:
+        f.write(json.dumps(manifest, sort_keys=True))
+    finally:
+        f.close()
+
+    module.atomic_move(tmp_path, manifest_path)
+
+
+def diff_manifest(old, new):
+    ''' Return the added, removed and modified member names between two manifests '''
+    if old is None:
+        old_members = {}
+    else:
+        old_members = old.get('members', {})
+
+    new_members = new['members']
+
+    added = [name for name in new_members if name not in old_members]
+    removed = [name for name in old_members if name not in new_members]
+    modified = [name for name in new_members if name in old_members and new_members[name] != old_members[name]]
+
+    added.sort()
+    removed.sort()
+    modified.sort()
+
+    return added, removed, modified
+
 
 def main():
     module = AnsibleModule(
         argument_spec = dict(
             path = dict(type='list', required=True),
-            format  = dict(choices=['gz', 'bz2', 'zip', 'tar'], default='gz', required=False),
+            format  = dict(choices=['gz', 'bz2', 'xz', 'zst', 'zip', 'tar'], default='gz', required=False),
             dest = dict(required=False, type='path'),
             remove = dict(required=False, default=False, type='bool'),
+            manifest = dict(required=False, default=False, type='bool'),
+            threads = dict(required=False, default=1, type='int'),
+            compression_level = dict(required=False, default=None, type='int'),
         ),
         add_file_common_args=True,
         supports_check_mode=True,
@@ -133,9 +453,14 @@ def main():
     paths = params['path']
     dest = params['dest']
     remove = params['remove']
+    use_manifest = params['manifest']
+    threads = params['threads']
+    level = params['compression_level']
+    diff_result = {}
 
     expanded_paths = []
     format = params['format']
+    compressor = None
     globby = False
     changed = False
     state = 'absent'
@@ -158,6 +483,24 @@ def main():
         else:
             expanded_paths.append(path)
 
+    if threads < 1:
+        module.fail_json(threads=threads, msg='Error, threads must be at least 1')
+
+    if format == 'xz' and not HAS_LZMA:
+        module.fail_json(msg='lzma or backports.lzma is required for the xz format')
+
+    if format == 'zst' and not HAS_ZSTANDARD:
+        module.fail_json(msg='zstandard is required for the zst format')
+
+    if format in COMPRESSION_LEVELS:
+        default_level, max_level = COMPRESSION_LEVELS[format]
+        if level is None:
+            level = default_level
+        elif level < 1 or level > max_level:
+            module.fail_json(compression_level=level, msg='Error, compression_level must be between 1 and %d for the %s format' % (max_level, format))
+
+    parallel = threads > 1 and format in ('gz', 'bz2', 'xz') and HAS_MULTIPROCESSING
+
     if len(expanded_paths) == 0:
         return module.fail_json(path=', '.join(paths), expanded_paths=', '.join(expanded_paths), msg='Error, no source paths were found')
 
@@ -205,7 +548,7 @@ def main():
     # No source files were found but the named archive exists: are we 'compress' or 'archive' now?
     if len(missing) == len(expanded_paths) and dest and os.path.exists(dest):
         # Just check the filename to know if it's an archive or simple compressed file
-        if re.search(r'(\.tar|\.tar\.gz|\.tgz|.tbz2|\.tar\.bz2|\.zip)$', os.path.basename(dest), re.IGNORECASE):
+        if re.search(r'(\.tar|\.tar\.gz|\.tgz|.tbz2|\.tar\.bz2|\.txz|\.tar\.xz|\.tzst|\.tar\.zst|\.zip)$', os.path.basename(dest), re.IGNORECASE):
             state = 'archive'
         else:
             state = 'compress'
@@ -223,11 +566,35 @@ def main():
         archive = None
         size = 0
         errors = []
+        rebuild = state != 'archive'
+        match_root = re.compile('^%s' % re.escape(arcroot))
+        manifest_path = dest + '.manifest'
 
         if os.path.lexists(dest):
             size = os.path.getsize(dest)
 
-        if state != 'archive':
+        if rebuild and use_manifest:
+            try:
+                manifest, sources = build_manifest(module, archive_paths, match_root, dest, format)
+            except (IOError, OSError):
+                e = get_exception()
+                module.fail_json(dest=dest, msg='Error building archive manifest: %s' % str(e))
+
+            previous = None
+            if os.path.exists(dest):
+                previous = read_manifest(manifest_path)
+
+            added, removed, modified = diff_manifest(previous, manifest)
+            diff_result = dict(added=added, removed=removed, modified=modified)
+
+            if previous is not None and previous.get('format') == format and not (added or removed or modified):
+                # Nothing changed since the archive was written, keep it as is
+                rebuild = False
+                successes = sources
+                if state != 'incomplete':
+                    state = 'archive'
+
+        if rebuild:
             if check_mode:
                 changed = True
 
@@ -237,58 +604,41 @@ def main():
                     if format == 'zip':
                         arcfile = zipfile.ZipFile(dest, 'w', zipfile.ZIP_DEFLATED)
 
-                    # Easier compression using tarfile module
-                    elif format == 'gz' or format == 'bz2':
-                        arcfile = tarfile.open(dest, 'w|' + format)
-
                     # Or plain tar archiving
                     elif format == 'tar':
                         arcfile = tarfile.open(dest, 'w')
 
-                    match_root = re.compile('^%s' % re.escape(arcroot))
-                    for path in archive_paths:
-                        if os.path.isdir(path):
-                            # Recurse into directories
-                            for dirpath, dirnames, filenames in os.walk(path, topdown=True):
-                                if not dirpath.endswith(os.sep):
-                                    dirpath += os.sep
-
-                                for dirname in dirnames:
-                                    fullpath = dirpath + dirname
-                                    arcname = match_root.sub('', fullpath)
-
-                                    try:
-                                        if format == 'zip':
-                                            arcfile.write(fullpath, arcname)
-                                        else:
-                                            arcfile.add(fullpath, arcname, recursive=False)
-
-                                    except Exception:
-                                        e = get_exception()
-                                        errors.append('%s: %s' % (fullpath, str(e)))
-
-                                for filename in filenames:
-                                    fullpath = dirpath + filename
-                                    arcname = match_root.sub('', fullpath)
-
-                                    if not filecmp.cmp(fullpath, dest):
-                                        try:
-                                            if format == 'zip':
-                                                arcfile.write(fullpath, arcname)
-                                            else:
-                                                arcfile.add(fullpath, arcname, recursive=False)
-
-                                            successes.append(fullpath)
-                                        except Exception:
-                                            e = get_exception()
-                                            errors.append('Adding %s: %s' % (path, str(e)))
-                        else:
+                    # Easier compression using tarfile module, streamed into
+                    # the compressor so memory stays flat
+                    else:
+                        compressor = open_compressed(dest, format, level, threads, parallel)
+                        arcfile = tarfile.open(mode='w|', fileobj=compressor)
+
+                    for fullpath, arcname, is_dir, top in archive_members(archive_paths, match_root, dest, use_manifest):
+                        # Top-level files are not caught: any error there is fatal
+                        if top is None:
                             if format == 'zip':
-                                arcfile.write(path, match_root.sub('', path))
+                                arcfile.write(fullpath, arcname)
                             else:
-                                arcfile.add(path, match_root.sub('', path), recursive=False)
+                                arcfile.add(fullpath, arcname, recursive=False)
+
+                            successes.append(fullpath)
+                            continue
 
-                            successes.append(path)
+                        try:
+                            if format == 'zip':
+                                arcfile.write(fullpath, arcname)
+                            else:
+                                arcfile.add(fullpath, arcname, recursive=False)
+
+                            if not is_dir:
+                                successes.append(fullpath)
+                        except Exception:
+                            e = get_exception()
+                            if is_dir:
+                                errors.append('%s: %s' % (fullpath, str(e)))
+                            else:
+                                errors.append('Adding %s: %s' % (top, str(e)))
 
                 except Exception:
                     e = get_exception()
@@ -298,9 +648,19 @@ def main():
                     arcfile.close()
                     state = 'archive'
 
+                if compressor:
+                    compressor.close()
+
                 if len(errors) > 0:
                     module.fail_json(msg='Errors when writing archive at %s: %s' % (dest, '; '.join(errors)))
 
+                if use_manifest:
+                    try:
+                        write_manifest(module, manifest_path, manifest)
+                    except (IOError, OSError):
+                        e = get_exception()
+                        module.fail_json(dest=dest, msg='Error writing archive manifest at %s: %s' % (manifest_path, str(e)))
+
         if state in ['archive', 'incomplete'] and remove:
             for path in successes:
                 try:
@@ -315,8 +675,13 @@ def main():
             if len(errors) > 0:
                 module.fail_json(dest=dest, msg='Error deleting some source files: ' + str(e), files=errors)
 
+        if use_manifest:
+            # The manifest tells exactly whether the archive contents changed
+            if rebuild:
+                changed = True
+
         # Rudimentary check: If size changed then file changed. Not perfect, but easy.
-        if os.path.getsize(dest) != size:
+        elif os.path.getsize(dest) != size:
             changed = True
 
         if len(successes) and state != 'incomplete':
@@ -355,12 +720,7 @@ def main():
                     else:
                         f_in = open(path, 'rb')
 
-                        if format == 'gz':
-                            f_out = gzip.open(dest, 'wb')
-                        elif format == 'bz2':
-                            f_out = bz2.BZ2File(dest, 'wb')
-                        else:
-                            raise OSError("Invalid format")
+                        f_out = open_compressed(dest, format, level, threads, parallel)
 
                         shutil.copyfileobj(f_in, f_out)
 
@@ -396,7 +756,7 @@ def main():
 
     changed = module.set_fs_attributes_if_different(file_args, changed)
 
-    module.exit_json(archived=successes, dest=dest, changed=changed, state=state, arcroot=arcroot, missing=missing, expanded_paths=expanded_paths)
+    module.exit_json(archived=successes, dest=dest, changed=changed, state=state, arcroot=arcroot, missing=missing, expanded_paths=expanded_paths, **diff_result)
 
 if __name__ == '__main__':
     main()
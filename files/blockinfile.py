@@ -100,6 +100,19 @@ options:
     description:
       - 'This flag indicates that filesystem links, if they exist, should be followed.'
     version_added: "2.1"
+  blocks:
+    required: false
+    default: null
+    description:
+      - A list of blocks to manage in the file in a single read, write and
+        validate pass, instead of running the module once per block.
+      - Each item is a dictionary with a C(marker) (required and unique per item)
+        and optionally C(block), C(state), C(insertafter) and C(insertbefore),
+        which default to the module options of the same name.
+      - Insertion points are searched in the file as it was before any block
+        was applied. Blocks sharing an insertion point are inserted in list order.
+      - Mutually exclusive with C(block) and C(marker).
+    version_added: "2.3"
 """
 
 EXAMPLES = r"""
@@ -144,6 +157,17 @@ EXAMPLES = r"""
       - { name: host1, ip: 10.10.1.10 }
       - { name: host2, ip: 10.10.1.11 }
       - { name: host3, ip: 10.10.1.12 }
+
+- name: Add the same mappings in one pass over /etc/hosts
+  blockinfile:
+    dest: /etc/hosts
+    blocks:
+      - marker: "# {mark} ANSIBLE MANAGED BLOCK host1"
+        block: "10.10.1.10 host1"
+      - marker: "# {mark} ANSIBLE MANAGED BLOCK host2"
+        block: "10.10.1.11 host2"
+      - marker: "# {mark} ANSIBLE MANAGED BLOCK host3"
+        state: absent
 """
 
 import re
@@ -172,6 +196,77 @@ def write_changes(module, contents, dest):
         module.atomic_move(tmpfile, dest, unsafe_writes=module.params['unsafe_writes'])
 
 
+def marker_index(lines, markers):
+    """Map each marker length to the last line index of each line prefix.
+
+    A line starts with a marker when its prefix of the marker's length is
+    equal to it, so one scan over the lines is enough to locate every
+    marker of a given length.
+    """
+    lengths = set([len(m) for m in markers])
+    index = dict([(length, {}) for length in lengths])
+    for i, line in enumerate(lines):
+        for length in lengths:
+            index[length][line[:length]] = i
+    return index
+
+
+def resolve_edits(module, lines, specs):
+    """Compute the (start, end, blocklines) edit of each block on lines."""
+    markers = []
+    for spec in specs:
+        markers.extend([spec['marker0'], spec['marker1']])
+    index = marker_index(lines, markers)
+
+    # Last match of each insertion regex, shared by the blocks using it
+    matches = {}
+
+    edits = []
+    for order, spec in enumerate(specs):
+        n0 = index[len(spec['marker0'])].get(spec['marker0'])
+        n1 = index[len(spec['marker1'])].get(spec['marker1'])
+
+        if None in (n0, n1):
+            insertafter = spec['insertafter']
+            insertbefore = spec['insertbefore']
+            if insertafter not in (None, 'EOF'):
+                pattern = insertafter
+            elif insertbefore not in (None, 'BOF'):
+                pattern = insertbefore
+            else:
+                pattern = None
+
+            if pattern is not None:
+                if pattern not in matches:
+                    insertre = re.compile(pattern)
+                    matches[pattern] = None
+                    for i, line in enumerate(lines):
+                        if insertre.search(line):
+                            matches[pattern] = i
+                n0 = matches[pattern]
+                if n0 is None:
+                    n0 = len(lines)
+                elif insertafter is not None:
+                    n0 += 1
+            elif insertbefore is not None:
+                n0 = 0           # insertbefore=BOF
+            else:
+                n0 = len(lines)  # insertafter=EOF
+            n1 = n0
+        elif n0 < n1:
+            n1 += 1
+        else:
+            n0, n1 = n1, n0 + 1
+
+        edits.append((n0, n1, order, spec['blocklines']))
+
+    edits.sort()
+    for i in range(1, len(edits)):
+        if edits[i][0] < edits[i-1][1]:
+            module.fail_json(rc=258, msg='Blocks overlap in the file at line %d' % (edits[i][0] + 1))
+    return edits
+
+
 def check_file_attrs(module, changed, message):
 
     file_args = module.load_file_common_arguments(module.params)
@@ -197,8 +292,9 @@ def main():
             create=dict(default=False, type='bool'),
             backup=dict(default=False, type='bool'),
             validate=dict(default=None, type='str'),
+            blocks=dict(default=None, type='list'),
         ),
-        mutually_exclusive=[['insertbefore', 'insertafter']],
+        mutually_exclusive=[['insertbefore', 'insertafter'], ['blocks', 'block'], ['blocks', 'marker']],
         add_file_common_args=True,
         supports_check_mode=True
     )
@@ -227,61 +323,64 @@ def main():
 
     insertbefore = params['insertbefore']
     insertafter = params['insertafter']
-    block = params['block']
-    marker = params['marker']
-    present = params['state'] == 'present'
+    multi = params['blocks'] is not None
 
-    if not present and not path_exists:
-        module.exit_json(changed=False, msg="File not present")
-
-    if insertbefore is None and insertafter is None:
-        insertafter = 'EOF'
-
-    if insertafter not in (None, 'EOF'):
-        insertre = re.compile(insertafter)
-    elif insertbefore not in (None, 'BOF'):
-        insertre = re.compile(insertbefore)
+    if multi:
+        items = params['blocks']
     else:
-        insertre = None
-
-    marker0 = re.sub(r'{mark}', 'BEGIN', marker)
-    marker1 = re.sub(r'{mark}', 'END', marker)
-    if present and block:
-        # Escape seqeuences like '\n' need to be handled in Ansible 1.x
-        if module.ansible_version.startswith('1.'):
-            block = re.sub('', block, '')
-        blocklines = [marker0] + block.splitlines() + [marker1]
-    else:
-        blocklines = []
-
-    n0 = n1 = None
-    for i, line in enumerate(lines):
-        if line.startswith(marker0):
-            n0 = i
-        if line.startswith(marker1):
-            n1 = i
-
-    if None in (n0, n1):
-        n0 = None
-        if insertre is not None:
-            for i, line in enumerate(lines):
-                if insertre.search(line):
-                    n0 = i
-            if n0 is None:
-                n0 = len(lines)
-            elif insertafter is not None:
-                n0 += 1
-        elif insertbefore is not None:
-            n0 = 0           # insertbefore=BOF
+        items = [dict(marker=params['marker'], block=params['block'])]
+
+    specs = []
+    seen = set()
+    for item in items:
+        if not isinstance(item, dict) or 'marker' not in item:
+            module.fail_json(msg='Each item of blocks must be a dictionary with a marker')
+        unknown = set(item.keys()) - set(['marker', 'block', 'state', 'insertafter', 'insertbefore'])
+        if unknown:
+            module.fail_json(msg='Unsupported keys in blocks item: %s' % ', '.join(sorted(unknown)))
+        if item['marker'] in seen:
+            module.fail_json(msg='Duplicate marker in blocks: %s' % item['marker'])
+        seen.add(item['marker'])
+
+        spec = dict(
+            state=item.get('state', params['state']),
+            block=item.get('block', '') or '',
+            insertafter=insertafter,
+            insertbefore=insertbefore,
+        )
+        if 'insertafter' in item or 'insertbefore' in item:
+            if item.get('insertafter') is not None and item.get('insertbefore') is not None:
+                module.fail_json(msg='insertafter and insertbefore are mutually exclusive in blocks item %s' % item['marker'])
+            spec['insertafter'] = item.get('insertafter')
+            spec['insertbefore'] = item.get('insertbefore')
+        if spec['state'] not in ('absent', 'present'):
+            module.fail_json(msg='Invalid state in blocks item %s: %s' % (item['marker'], spec['state']))
+        if spec['insertbefore'] is None and spec['insertafter'] is None:
+            spec['insertafter'] = 'EOF'
+
+        spec['marker0'] = re.sub(r'{mark}', 'BEGIN', item['marker'])
+        spec['marker1'] = re.sub(r'{mark}', 'END', item['marker'])
+        block = spec['block']
+        if spec['state'] == 'present' and block:
+            # Escape seqeuences like '\n' need to be handled in Ansible 1.x
+            if module.ansible_version.startswith('1.'):
+                block = re.sub('', block, '')
+            spec['blocklines'] = [spec['marker0']] + block.splitlines() + [spec['marker1']]
         else:
-            n0 = len(lines)  # insertafter=EOF
-    elif n0 < n1:
-        lines[n0:n1+1] = []
-    else:
-        lines[n1:n0+1] = []
-        n0 = n1
+            spec['blocklines'] = []
+        specs.append(spec)
+
+    present = [spec for spec in specs if spec['state'] == 'present']
+
+    if not present and not path_exists:
+        module.exit_json(changed=False, msg="File not present")
 
-    lines[n0:n0] = blocklines
+    # Apply all edits from the bottom of the file up, so that the line
+    # numbers resolved on the original content stay valid
+    edits = resolve_edits(module, lines, specs)
+    edits.reverse()
+    for n0, n1, order, blocklines in edits:
+        lines[n0:n1] = blocklines
 
     if lines:
         result = '\n'.join(lines)
@@ -295,7 +394,10 @@ def main():
     elif original is None:
         msg = 'File created'
         changed = True
-    elif not blocklines:
+    elif multi:
+        msg = 'Blocks updated'
+        changed = True
+    elif not specs[0]['blocklines']:
         msg = 'Block removed'
         changed = True
     else:
@@ -22,8 +22,23 @@ import os
 import platform
 import socket
 import sys
+import threading
 import types
 import urllib
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+try:
+    import httplib
+except ImportError:
+    import http.client as httplib
+
+try:
+    import ssl
+    HAS_SSL_CONTEXT = hasattr(ssl, "create_default_context")
+except ImportError:
+    HAS_SSL_CONTEXT = False
 
 HAS_LIB_JSON = True
 try:
@@ -61,6 +76,22 @@ success:
     returned: success
     type: boolean
     sample: True
+rpc_calls:
+    description: number of requests made to the LogicMonitor API,
+                 not counting the ones answered from the response cache
+    returned: success
+    type: int
+    sample: 12
+added:
+    description: display names of the hosts which were added
+    returned: when hosts is set
+    type: list
+    sample: ["web01.example.com"]
+updated:
+    description: display names of the hosts which were updated
+    returned: when hosts is set
+    type: list
+    sample: ["web02.example.com"]
 ...
 '''
 
@@ -185,6 +216,20 @@ options:
       - Optional for putting an object into SDT (action=sdt)
     required: false
     default: 30
+  hosts:
+    description:
+      - A list of hosts to add or update in one task, each a dictionary with a 'hostname' and optionally 'displayname', 'collector', 'description', 'groups', 'properties' and 'alertenable'. Missing keys default to the parameters of the same name.
+      - Collectors, host groups and hosts are fetched once for the whole list, and the adds and updates are sent concurrently.
+      - Optional for managing hosts (target=host; action=add or action=update)
+    required: false
+    default: null
+    version_added: "2.3"
+  concurrency:
+    description:
+      - The number of hosts added or updated at the same time when using 'hosts'.
+    required: false
+    default: 4
+    version_added: "2.3"
 ...
 '''
 EXAMPLES = '''
@@ -228,6 +273,30 @@ EXAMPLES = '''
           groups="/servers/production,/datacenter1"
           properties="{'snmp.community':'secret','dc':'1', 'type':'prod'}"
 
+    #example of registering a whole fleet of hosts in one task
+    ---
+    - hosts: localhost
+      vars:
+        company: 'mycompany'
+        user: 'myusername'
+        password: 'mypassword'
+      tasks:
+      - name: Deploy LogicMonitor Hosts
+        logicmonitor:
+          target: host
+          action: add
+          collector: 'mycompany-Collector'
+          company: '{{ company }}'
+          user: '{{ user }}'
+          password: '{{ password }}'
+          concurrency: 8
+          hosts:
+            - hostname: web01.example.com
+              groups: ['/servers/production']
+            - hostname: web02.example.com
+              displayname: web02
+              properties: {'dc': '1', 'type': 'prod'}
+
     #example of putting a datasource in SDT
     ---
     - hosts: localhost
@@ -537,6 +606,108 @@ EXAMPLES = '''
 '''
 
 
+LM_HOST = "logicmonitor.com"
+LM_PATH = "/santaba/"
+
+# RPCs which only read from the account, and whose responses are cached
+READ_ONLY_RPC_PREFIXES = ("get", "verify")
+
+
+def is_read_only_rpc(action):
+    for prefix in READ_ONLY_RPC_PREFIXES:
+        if action.startswith(prefix):
+            return True
+    return False
+
+
+def uses_proxy(host):
+    """Whether requests to host go through a proxy from the environment,
+    as open_url would send them"""
+    return "https" in urllib.getproxies() and not urllib.proxy_bypass(host)
+
+
+class RPCSession(object):
+    """Connection to a LogicMonitor account, shared by the calls of a run.
+
+    Requests go over a single keep-alive HTTPS connection when the ssl
+    module can verify certificates on it and no proxy is configured for
+    the account's host, and through open_url otherwise. Responses to
+    read-only RPCs are kept until the next RPC which may change the
+    account.
+    """
+
+    def __init__(self, module, company, user, password, version):
+        self.module = module
+        self.host = company + "." + LM_HOST
+        self.headers = {"X-LM-User-Agent": version}
+        self.creds = urllib.urlencode(
+            {"c": company,
+                "u": user,
+                "p": password})
+        self.conn = None
+        self.cache = {}
+        self.calls = 0
+        self.keepalive = HAS_SSL_CONTEXT and not uses_proxy(self.host)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _url(self, path, params):
+        param_str = urllib.urlencode(params)
+        if param_str:
+            param_str = param_str + "&"
+        return LM_PATH + path + "?" + param_str + self.creds
+
+    def _keepalive_request(self, url, headers, retry):
+        if not retry:
+            # A failed request may still have been applied, so one which
+            # can not be retried does not risk an idle connection either
+            self.close()
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = httplib.HTTPSConnection(
+                    self.host, context=ssl.create_default_context())
+            try:
+                self.conn.request("GET", url, headers=headers)
+                resp = self.conn.getresponse()
+                raw = resp.read()
+            except (httplib.HTTPException, socket.error):
+                # The server may have closed the idle connection,
+                # retry once on a new one
+                self.close()
+                if attempt or not retry:
+                    raise IOError("Error making request to " + self.host)
+                continue
+            if resp.status >= 400:
+                raise IOError("HTTP Error %s: %s" % (resp.status, resp.reason))
+            return raw
+
+    def request(self, path, params, headers=None, retry=False):
+        """Make a request and return the response body. Only a request
+        which is safe to repeat is retried after a connection error."""
+        url = self._url(path, params)
+        self.calls += 1
+        if self.keepalive:
+            return self._keepalive_request(url, headers or {}, retry)
+        return open_url("https://" + self.host + url, headers=headers).read()
+
+    def rpc(self, action, params):
+        """Make an RPC call, answering read-only ones from the cache
+        when possible"""
+        if not is_read_only_rpc(action):
+            self.cache.clear()
+            return self.request("rpc/" + action, params, self.headers)
+
+        key = (action, urllib.urlencode(sorted(params.items())))
+        if key not in self.cache:
+            self.cache[key] = self.request("rpc/" + action, params, self.headers, retry=True)
+        else:
+            self.module.debug("Using cached response to " + action)
+        return self.cache[key]
+
+
 class LogicMonitor(object):
 
     def __init__(self, module, **params):
@@ -549,36 +720,19 @@ class LogicMonitor(object):
         self.user = params["user"]
         self.password = params["password"]
         self.fqdn = socket.getfqdn()
-        self.lm_url = "logicmonitor.com/santaba"
+        self.lm_url = LM_HOST + LM_PATH.rstrip("/")
         self.__version__ = self.__version__ + "-ansible-module"
+        self.session = RPCSession(module, self.company, self.user,
+                                  self.password, self.__version__)
+        self.results = {}
 
     def rpc(self, action, params):
         """Make a call to the LogicMonitor RPC library
         and return the response"""
         self.module.debug("Running LogicMonitor.rpc")
 
-        param_str = urllib.urlencode(params)
-        creds = urllib.urlencode(
-            {"c": self.company,
-                "u": self.user,
-                "p": self.password})
-
-        if param_str:
-            param_str = param_str + "&"
-
-        param_str = param_str + creds
-
         try:
-            url = ("https://" + self.company + "." + self.lm_url +
-                   "/rpc/" + action + "?" + param_str)
-
-            # Set custom LogicMonitor header with version
-            headers = {"X-LM-User-Agent": self.__version__}
-
-            # Set headers
-            f = open_url(url, headers=headers)
-
-            raw = f.read()
+            raw = self.session.rpc(action, params)
             resp = json.loads(raw)
             if resp["status"] == 403:
                 self.module.debug("Authentication failed.")
@@ -593,24 +747,11 @@ class LogicMonitor(object):
          server \"do\" function"""
         self.module.debug("Running LogicMonitor.do...")
 
-        param_str = urllib.urlencode(params)
-        creds = (urllib.urlencode(
-            {"c": self.company,
-                "u": self.user,
-                "p": self.password}))
-
-        if param_str:
-            param_str = param_str + "&"
-        param_str = param_str + creds
-
         try:
             self.module.debug("Attempting to open URL: " +
                               "https://" + self.company + "." + self.lm_url +
-                              "/do/" + action + "?" + param_str)
-            f = open_url(
-                "https://" + self.company + "." + self.lm_url +
-                "/do/" + action + "?" + param_str)
-            return f.read()
+                              "/do/" + action)
+            return self.session.request("do/" + action, params)
         except IOError:
             # self.module.debug("Error opening URL. " + ioe)
             self.fail("Unknown exception opening URL")
@@ -797,8 +938,9 @@ class LogicMonitor(object):
         self.module.fail_json(msg=msg, changed=self.change, failed=True)
 
     def exit(self, changed):
-        self.module.debug("Changed: " + changed)
-        self.module.exit_json(changed=changed, success=True)
+        self.module.debug("Changed: " + str(changed))
+        self.module.exit_json(changed=changed, success=True,
+                              rpc_calls=self.session.calls)
 
     def output_info(self, info):
         self.module.debug("Registering properties as Ansible facts")
@@ -1640,6 +1782,240 @@ class Host(LogicMonitor):
         return map(lambda x: x.strip(), groups)
 
 
+class HostBatch(Host):
+    """Several LogicMonitor hosts, added or updated together.
+
+    Collectors, host groups and hosts are each fetched once and compared
+    with the requested hosts locally. The resulting adds and updates are
+    then sent on a pool of threads, each with its own session.
+    """
+
+    def __init__(self, params, module=None):
+        """Initializor for the LogicMonitor host batch object"""
+        self.change = False
+        self.params = params
+
+        LogicMonitor.__init__(self, module, **self.params)
+        self.module.debug("Instantiating HostBatch object")
+
+        self.concurrency = self.params["concurrency"]
+        self.hosts = []
+        for host in self.params["hosts"]:
+            if not isinstance(host, dict) or not host.get("hostname"):
+                self.fail(msg="Each entry of hosts must be a dictionary " +
+                              "with a hostname")
+            spec = {
+                "hostname": host["hostname"],
+                "displayname": host.get("displayname") or host["hostname"],
+                "collector": host.get("collector") or self.params["collector"],
+                "description": host.get("description", self.params["description"]),
+                "groups": list(self._strip_groups(host.get("groups", self.params["groups"]) or [])),
+                "properties": host.get("properties", self.params["properties"]) or {},
+                "alertenable": host.get("alertenable", self.params["alertenable"])}
+            if not spec["collector"]:
+                self.fail(msg="No collector specified for host " +
+                              spec["hostname"])
+            self.hosts.append(spec)
+
+    def update(self):
+        """Add the hosts which are not registered yet and update
+        the ones which don't match the LogicMonitor account"""
+        self.module.debug("Running HostBatch.update...")
+
+        collectors = {}
+        for collector in self.get_collectors() or []:
+            collectors[collector["description"]] = collector
+
+        self.module.debug("Making RPC call to 'getHosts'")
+        hostlist_json = json.loads(self.rpc("getHosts", {"hostGroupId": 1}))
+        if hostlist_json["status"] != 200:
+            self.fail(msg="Error: unable to list hosts.\n" +
+                          hostlist_json["errmsg"])
+        by_displayname = {}
+        by_hostname = {}
+        for host in hostlist_json["data"]["hosts"]:
+            by_displayname[host["displayedAs"]] = host
+            by_hostname[(host["hostName"], host["agentId"])] = host
+
+        # Group paths are resolved from a single getHostGroups response,
+        # which is only fetched again after creating missing groups
+        paths = {}
+        for spec in self.hosts:
+            for path in spec["groups"]:
+                paths[path] = True
+        missing = [path for path in paths.keys() if self.get_group(path) is None]
+        if missing:
+            self.module.debug("System changed")
+            self.change = True
+            if self.check_mode:
+                self.exit(changed=True)
+            for path in missing:
+                self.create_group(path)
+        groups = {}
+        for path in paths.keys():
+            groups[path] = self.get_group(path)
+        static_groups = {}
+        resp = json.loads(self.rpc("getHostGroups", {}))
+        if resp["status"] == 200:
+            for group in resp["data"]:
+                if group.get("appliesTo", "") == "":
+                    static_groups[group["id"]] = True
+
+        work = []
+        for spec in self.hosts:
+            collector = collectors.get(spec["collector"])
+            if collector is None:
+                self.fail(msg="Specified collector " + spec["collector"] +
+                              " doesn't exist")
+            info = (by_displayname.get(spec["displayname"]) or
+                    by_hostname.get((spec["hostname"], collector["id"])))
+
+            h = {"hostName": spec["hostname"],
+                 "displayedAs": spec["displayname"],
+                 "alertEnable": spec["alertenable"],
+                 "agentId": collector["id"]}
+            if spec["description"]:
+                h["description"] = spec["description"]
+            if spec["groups"]:
+                h["hostGroupIds"] = ",".join(
+                    [str(groups[path]["id"]) for path in spec["groups"]])
+            propnum = 0
+            for key, value in spec["properties"].items():
+                h["propName" + str(propnum)] = key
+                h["propValue" + str(propnum)] = value
+                propnum = propnum + 1
+
+            if info is None:
+                work.append(("addHost", spec, h, None))
+            else:
+                h["id"] = info["id"]
+                h["opType"] = "replace"
+                if self._host_changed(spec, info, collector, groups, static_groups):
+                    work.append(("updateHost", spec, h, None))
+                elif spec["properties"]:
+                    # Properties are not part of the host list
+                    work.append(("updateHost", spec, h, info))
+
+        results = self._run(work)
+
+        self.results = {"added": [], "updated": []}
+        for action, spec, changed in results:
+            if changed:
+                self.change = True
+                if action == "addHost":
+                    self.results["added"].append(spec["displayname"])
+                else:
+                    self.results["updated"].append(spec["displayname"])
+
+    def _host_changed(self, spec, info, collector, groups, static_groups):
+        """Compare the simple properties and the groups
+        of a host against the host list"""
+        if info["alertEnable"] != self.module.boolean(spec["alertenable"]):
+            return True
+        if info["description"] != spec["description"]:
+            return True
+        if info["displayedAs"] != spec["displayname"]:
+            return True
+        if info["agentId"] != collector["id"]:
+            return True
+
+        current = []
+        for path in info["fullPathInIds"]:
+            if path != [] and path[-1] in static_groups:
+                current.append(path[-1])
+        wanted = [groups[path]["id"] for path in spec["groups"]]
+        current.sort()
+        wanted.sort()
+        return current != wanted
+
+    def _properties_changed(self, session, spec, info):
+        """Compare the properties of a host with the requested ones"""
+        ignore = ['system.categories', 'snmp.version']
+
+        resp = json.loads(session.rpc("getHostProperties",
+                                      {'hostId': info["id"],
+                                       "filterSystemProperties": True}))
+        if resp["status"] != 200:
+            raise HostBatchError(resp["errmsg"])
+
+        p = {}
+        for prop in resp["data"]:
+            name = prop["name"]
+            if name in ignore:
+                continue
+            p[name] = prop["value"]
+            if "*******" in prop["value"] and name in spec["properties"]:
+                verify = json.loads(session.rpc(
+                    "verifyProperties",
+                    {"hostId": info["id"],
+                     "propName0": name,
+                     "propValue0": spec["properties"][name]}))
+                if verify["status"] == 200 and verify["data"]["match"]:
+                    p[name] = spec["properties"][name]
+
+        for name, value in spec["properties"].items():
+            if name not in p or p[name] != value:
+                return True
+        return False
+
+    def _run(self, work):
+        """Send the adds and updates on a pool of threads. Items carrying
+        host information only get updated if their properties changed.
+        Returns the (action, spec, changed) of every item"""
+        results = []
+        errors = []
+        sessions = []
+        queue_ = queue.Queue()
+        for item in work:
+            queue_.put(item)
+
+        def worker():
+            session = RPCSession(self.module, self.company, self.user,
+                                 self.password, self.__version__)
+            sessions.append(session)
+            while True:
+                try:
+                    action, spec, h, info = queue_.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    if info is not None and not self._properties_changed(session, spec, info):
+                        results.append((action, spec, False))
+                        continue
+                    if not self.check_mode:
+                        resp = json.loads(session.rpc(action, h))
+                        if resp["status"] != 200:
+                            raise HostBatchError(resp["errmsg"])
+                    results.append((action, spec, True))
+                except (IOError, ValueError, HostBatchError):
+                    e = get_exception()
+                    errors.append("%s: %s" % (spec["displayname"], e))
+            session.close()
+
+        threads = []
+        for i in range(min(self.concurrency, len(work))):
+            t = threading.Thread(target=worker)
+            t.daemon = True
+            t.start()
+            threads.append(t)
+        for t in threads:
+            t.join()
+
+        # Report the requests of every session in rpc_calls
+        for session in sessions:
+            self.session.calls += session.calls
+
+        if errors:
+            self.change = self.change or len(results) > 0
+            self.fail(msg="Error: unable to add or update hosts.\n" +
+                          "\n".join(errors))
+        return results
+
+
+class HostBatchError(Exception):
+    pass
+
+
 class Datasource(LogicMonitor):
 
     def __init__(self, params, module=None):
@@ -2069,6 +2445,15 @@ def selector(module):
 
     if module.params["target"] == "collector":
         target = Collector(module.params, module)
+    elif module.params["target"] == "host" and module.params["hosts"]:
+        if module.params["action"] not in ["add", "update"]:
+            module.fail_json(
+                msg="Parameter 'hosts' is only supported for actions " +
+                    "'add' and 'update'.")
+        if module.params["concurrency"] < 1:
+            module.fail_json(msg="Parameter 'concurrency' must be at least 1.")
+
+        target = HostBatch(module.params, module)
     elif module.params["target"] == "host":
         # Make sure required parameter collector is specified
         if ((module.params["action"] == "add" or
@@ -2115,7 +2500,9 @@ def selector(module):
         module.fail_json(msg=errmsg)
 
     action()
-    module.exit_json(changed=target.change)
+    target.session.close()
+    module.exit_json(changed=target.change, rpc_calls=target.session.calls,
+                     **target.results)
 
 
 def main():
@@ -2149,7 +2536,9 @@ def main():
             duration=dict(required=False, default=30),
             properties=dict(required=False, default={}, type="dict"),
             groups=dict(required=False, default=[], type="list"),
-            alertenable=dict(required=False, default="true", choices=BOOLEANS)
+            alertenable=dict(required=False, default="true", choices=BOOLEANS),
+            hosts=dict(required=False, default=None, type="list"),
+            concurrency=dict(required=False, default=4, type="int")
         ),
         supports_check_mode=True
     )
@@ -2163,6 +2552,7 @@ def main():
 from ansible.module_utils.basic import *
 from ansible.module_utils.urls import *
 from ansible.module_utils.urls import open_url
+from ansible.module_utils.pycompat24 import get_exception
 
 
 if __name__ == "__main__":
@@ -39,6 +39,7 @@ options:
   host:
     description:
       - Host to operate on in Nagios.
+      - Since 2.3, a list of hosts (or comma separated hosts) to operate on, all with a single write to the command file.
     required: false
     default: null
   cmdfile:
@@ -131,6 +132,13 @@ EXAMPLES = '''
 # unsilence all alerts
 - nagios: action=unsilence host={{ inventory_hostname }}
 
+# schedule downtime for ALL services on every host of a rack
+- nagios:
+    action: downtime
+    minutes: 60
+    service: all
+    host: "{{ groups['rack42'] }}"
+
 # SHUT UP NAGIOS
 - nagios: action=silence_nagios
 
@@ -144,7 +152,13 @@ EXAMPLES = '''
 import ConfigParser
 import types
 import time
+import os
 import os.path
+try:
+    from select import PIPE_BUF
+except ImportError:
+    # The smallest size POSIX guarantees writes to a pipe to be atomic for
+    PIPE_BUF = 512
 
 ######################################################################
 
@@ -206,7 +220,7 @@ def main():
             action=dict(required=True, default=None, choices=ACTION_CHOICES),
             author=dict(default='Ansible'),
             comment=dict(default='Scheduling downtime'),
-            host=dict(required=False, default=None),
+            host=dict(required=False, default=None, type='list'),
             servicegroup=dict(required=False, default=None),
             minutes=dict(default=30),
             cmdfile=dict(default=which_cmdfile()),
@@ -312,7 +326,7 @@ class Nagios(object):
         self.action = kwargs['action']
         self.author = kwargs['author']
         self.comment = kwargs['comment']
-        self.host = kwargs['host']
+        self.hosts = kwargs['host'] or []
         self.servicegroup = kwargs['servicegroup']
         self.minutes = int(kwargs['minutes'])
         self.cmdfile = kwargs['cmdfile']
@@ -324,6 +338,7 @@ class Nagios(object):
             self.services = kwargs['services'].split(',')
 
         self.command_results = []
+        self.command_buffer = []
 
     def _now(self):
         """
@@ -334,18 +349,44 @@ class Nagios(object):
 
     def _write_command(self, cmd):
         """
-        Write the given command to the Nagios command file
+        Queue the given command to be written to the Nagios command
+        file by _flush_commands()
+        """
+
+        self.command_buffer.append(cmd)
+        self.command_results.append(cmd.strip())
+        return True
+
+    def _flush_commands(self):
+        """
+        Write all queued commands to the Nagios command file, opening
+        it once. Commands are grouped into writes of at most PIPE_BUF
+        bytes, which Nagios reads without interleaving them with the
+        commands of other writers.
         """
 
+        writes = []
+        chunk = ''
+        for cmd in self.command_buffer:
+            if chunk and len(chunk) + len(cmd) > PIPE_BUF:
+                writes.append(chunk)
+                chunk = ''
+            chunk += cmd
+        if chunk:
+            writes.append(chunk)
+
         try:
-            fp = open(self.cmdfile, 'w')
-            fp.write(cmd)
-            fp.flush()
-            fp.close()
-            self.command_results.append(cmd.strip())
-        except IOError:
+            fd = os.open(self.cmdfile, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, int('666', 8))
+            try:
+                for data in writes:
+                    while data:
+                        data = data[os.write(fd, data):]
+            finally:
+                os.close(fd)
+        except (IOError, OSError):
             self.module.fail_json(msg='unable to write to nagios command file',
                                   cmdfile=self.cmdfile)
+        self.command_buffer = []
 
     def _fmt_dt_str(self, cmd, host, duration, author=None,
                     comment=None, start=None,
@@ -951,62 +992,73 @@ class Nagios(object):
         cmdstr = '%s %s%s' % (pre, cmd, post)
         self._write_command(cmdstr)
 
-    def act(self):
+    def act_on_host(self, host):
         """
-        Figure out what you want to do from ansible, and then do the
-        needful (at the earliest).
+        Queue the commands of the action for one host.
         """
         # host or service downtime?
         if self.action == 'downtime':
             if self.services == 'host':
-                self.schedule_host_downtime(self.host, self.minutes)
+                self.schedule_host_downtime(host, self.minutes)
             elif self.services == 'all':
-                self.schedule_host_svc_downtime(self.host, self.minutes)
+                self.schedule_host_svc_downtime(host, self.minutes)
             else:
-                self.schedule_svc_downtime(self.host,
+                self.schedule_svc_downtime(host,
                                            services=self.services,
                                            minutes=self.minutes)
 
         elif self.action == 'delete_downtime':
             if self.services=='host':
-                self.delete_host_downtime(self.host)
+                self.delete_host_downtime(host)
             elif self.services=='all':
-                self.delete_host_downtime(self.host, comment='')
+                self.delete_host_downtime(host, comment='')
             else:
-                self.delete_host_downtime(self.host, services=self.services)
-
-        elif self.action == "servicegroup_host_downtime":
-            if self.servicegroup:
-                self.schedule_servicegroup_host_downtime(servicegroup = self.servicegroup, minutes = self.minutes)
-        elif self.action == "servicegroup_service_downtime":
-            if self.servicegroup:
-                self.schedule_servicegroup_svc_downtime(servicegroup = self.servicegroup, minutes = self.minutes)
+                self.delete_host_downtime(host, services=self.services)
 
         # toggle the host AND service alerts
         elif self.action == 'silence':
-            self.silence_host(self.host)
+            self.silence_host(host)
 
         elif self.action == 'unsilence':
-            self.unsilence_host(self.host)
+            self.unsilence_host(host)
 
         # toggle host/svc alerts
         elif self.action == 'enable_alerts':
             if self.services == 'host':
-                self.enable_host_notifications(self.host)
+                self.enable_host_notifications(host)
             elif self.services == 'all':
-                self.enable_host_svc_notifications(self.host)
+                self.enable_host_svc_notifications(host)
             else:
-                self.enable_svc_notifications(self.host,
+                self.enable_svc_notifications(host,
                                               services=self.services)
 
         elif self.action == 'disable_alerts':
             if self.services == 'host':
-                self.disable_host_notifications(self.host)
+                self.disable_host_notifications(host)
             elif self.services == 'all':
-                self.disable_host_svc_notifications(self.host)
+                self.disable_host_svc_notifications(host)
             else:
-                self.disable_svc_notifications(self.host,
+                self.disable_svc_notifications(host,
                                                services=self.services)
+
+    def act(self):
+        """
+        Figure out what you want to do from ansible, and then do the
+        needful (at the earliest).
+        """
+        # host or service downtime?
+        if self.action in ['downtime', 'delete_downtime', 'silence', 'unsilence',
+                           'enable_alerts', 'disable_alerts']:
+            for host in self.hosts:
+                self.act_on_host(host)
+
+        elif self.action == "servicegroup_host_downtime":
+            if self.servicegroup:
+                self.schedule_servicegroup_host_downtime(servicegroup = self.servicegroup, minutes = self.minutes)
+        elif self.action == "servicegroup_service_downtime":
+            if self.servicegroup:
+                self.schedule_servicegroup_svc_downtime(servicegroup = self.servicegroup, minutes = self.minutes)
+
         elif self.action == 'silence_nagios':
             self.silence_nagios()
 
@@ -1021,6 +1073,7 @@ class Nagios(object):
             self.module.fail_json(msg="unknown action specified: '%s'" % \
                                       self.action)
 
+        self._flush_commands()
         self.module.exit_json(nagios_commands=self.command_results,
                               changed=True)
 
@@ -63,7 +63,8 @@ options:
         description:
             - Name of the host in Zabbix.
             - host_name is the unique identifier used and cannot be updated using this module.
-        required: true
+            - Required unless C(hosts) is given.
+        required: false
     host_groups:
         description:
             - List of host groups the host is part of.
@@ -117,6 +118,20 @@ options:
         default: "yes"
         choices: [ "yes", "no" ]
         version_added: "2.0"
+    hosts:
+        description:
+            - List of hosts to sync, each a dictionary with a C(host_name) and optionally C(host_groups),
+              C(link_templates), C(status), C(state), C(inventory_mode), C(interfaces) and C(proxy),
+              which default to the options of the same name.
+            - Groups, templates, proxies and the existing hosts are loaded with a handful of calls, the hosts
+              are compared in memory, and the changes are applied with batched C(host.create),
+              C(host.massupdate), C(hostinterface) and C(host.delete) calls.
+            - The interfaces of an existing host are only changed when C(interfaces) is given for it.
+            - With C(force=no) the module fails, before changing anything, when any of the hosts is already present.
+            - Mutually exclusive with C(host_name).
+        required: false
+        default: None
+        version_added: "2.3"
 '''
 
 EXAMPLES = '''
@@ -150,6 +165,45 @@ EXAMPLES = '''
         dns: ""
         port: 12345
     proxy: a.zabbix.proxy
+
+- name: Sync a list of hosts in one task
+  local_action:
+    module: zabbix_host
+    server_url: http://monitor.example.com
+    login_user: username
+    login_password: password
+    host_groups:
+      - Example group1
+    link_templates:
+      - Example template1
+    hosts:
+      - host_name: ExampleHost1
+        interfaces:
+          - { type: 1, main: 1, useip: 1, ip: 10.xx.xx.1, dns: "", port: 10050 }
+      - host_name: ExampleHost2
+        proxy: a.zabbix.proxy
+        interfaces:
+          - { type: 1, main: 1, useip: 1, ip: 10.xx.xx.2, dns: "", port: 10050 }
+      - host_name: OldHost
+        state: absent
+'''
+
+RETURN = '''
+created:
+    description: names of the hosts created in multi-host mode
+    returned: when hosts is given
+    type: list
+    sample: ["ExampleHost1"]
+updated:
+    description: names of the hosts updated in multi-host mode
+    returned: when hosts is given
+    type: list
+    sample: ["ExampleHost2"]
+deleted:
+    description: names of the hosts deleted in multi-host mode
+    returned: when hosts is given
+    type: list
+    sample: ["OldHost"]
 '''
 
 import logging
@@ -162,6 +216,9 @@ try:
 except ImportError:
     HAS_ZABBIX_API = False
 
+# number of hosts read, created or updated with one call in multi-host mode
+HOST_BATCH_SIZE = 1000
+
 
 # Extend the ZabbixAPI
 # Since the zabbix-api python module too old (version 1.0, no higher version so far),
@@ -411,13 +468,224 @@ class Host(object):
         except Exception, e:
             self._module.fail_json(msg="Failed to set inventory_mode to host: %s" % e)
 
+    # get groups by group names, with a single call
+    def get_groups_by_names(self, group_names):
+        groups = {}
+        if group_names:
+            for group in self._zapi.hostgroup.get({'output': ['groupid', 'name'], 'filter': {'name': group_names}}):
+                groups[group['name']] = group['groupid']
+        return groups
+
+    # get templates by template names, with a single call
+    def get_templates_by_names(self, template_names):
+        templates = {}
+        if template_names:
+            for template in self._zapi.template.get({'output': ['templateid', 'host'], 'filter': {'host': template_names}}):
+                templates[template['host']] = template['templateid']
+        return templates
+
+    # get proxies by proxy names, with a single call
+    def get_proxies_by_names(self, proxy_names):
+        proxies = {}
+        if proxy_names:
+            for proxy in self._zapi.proxy.get({'output': ['proxyid', 'host'], 'filter': {'host': proxy_names}}):
+                proxies[proxy['host']] = proxy['proxyid']
+        return proxies
+
+    # get hosts by host names along with their groups, interfaces and templates
+    def get_hosts_by_names(self, host_names):
+        hosts = {}
+        for offset in range(0, len(host_names), HOST_BATCH_SIZE):
+            host_list = self._zapi.host.get({'output': 'extend', 'filter': {'host': host_names[offset:offset + HOST_BATCH_SIZE]},
+                                             'selectGroups': ['groupid', 'name'], 'selectInterfaces': 'extend',
+                                             'selectParentTemplates': ['templateid']})
+            for host in host_list:
+                hosts[host['host']] = host
+        return hosts
+
+    # check the properties of a preloaded host
+    def check_host_properties(self, host, host_groups, status, interfaces, template_ids, proxy_id):
+        if set(host_groups) != set([group['name'] for group in host['groups']]):
+            return True
+
+        if int(status) != int(host['status']):
+            return True
+
+        if interfaces is not None and self.check_interface_properties(host['interfaces'], interfaces):
+            return True
+
+        if set(template_ids) != set([template['templateid'] for template in host['parentTemplates']]):
+            return True
+
+        if proxy_id is not None and host['proxy_hostid'] != proxy_id:
+            return True
+
+        return False
+
+    # get the interfaces to update, create and delete to turn the existing interfaces into the given ones
+    def diff_interfaces(self, host_id, interfaces, exist_interface_list):
+        update, create = [], []
+        remaining = list(exist_interface_list)
+        for interface in interfaces:
+            interface = dict(interface)
+            for exist_interface in remaining:
+                if int(interface['type']) == int(exist_interface['type']):
+                    remaining.remove(exist_interface)
+                    for key in interface.keys():
+                        if str(exist_interface[key]) != str(interface[key]):
+                            interface['interfaceid'] = exist_interface['interfaceid']
+                            update.append(interface)
+                            break
+                    break
+            else:
+                interface['hostid'] = host_id
+                create.append(interface)
+        delete = [exist_interface['interfaceid'] for exist_interface in remaining]
+        return update, create, delete
+
+
+# convert inventory_mode to its API value
+def inventory_mode_value(inventory_mode):
+    return {'automatic': 1, 'manual': 0, 'disabled': -1}.get(inventory_mode)
+
+
+# create, update and delete many hosts, with a handful of calls
+def sync_hosts(module, host, host_specs):
+    specs = []
+    for spec in host_specs:
+        if not isinstance(spec, dict) or not spec.get('host_name'):
+            module.fail_json(msg="Each entry of hosts must be a dictionary with a host_name")
+        entry = {}
+        for key in ('host_groups', 'link_templates', 'status', 'state', 'inventory_mode', 'interfaces', 'proxy'):
+            entry[key] = spec.get(key, module.params[key])
+        entry['host_name'] = spec['host_name']
+        entry['status'] = 1 if entry['status'] == "disabled" else 0
+        entry['host_groups'] = entry['host_groups'] or []
+        entry['link_templates'] = entry['link_templates'] or []
+        specs.append(entry)
+
+    # preload everything the hosts refer to
+    group_names, template_names, proxy_names = set(), set(), set()
+    for spec in specs:
+        group_names.update(spec['host_groups'])
+        template_names.update(spec['link_templates'])
+        if spec['proxy']:
+            proxy_names.add(spec['proxy'])
+    groups = host.get_groups_by_names(list(group_names))
+    templates = host.get_templates_by_names(list(template_names))
+    proxies = host.get_proxies_by_names(list(proxy_names))
+    existing = host.get_hosts_by_names([spec['host_name'] for spec in specs])
+
+    for name in group_names:
+        if name not in groups:
+            module.fail_json(msg="Hostgroup not found: %s" % name)
+    for name in template_names:
+        if name not in templates:
+            module.fail_json(msg="Template not found: %s" % name)
+    for name in proxy_names:
+        if name not in proxies:
+            module.fail_json(msg="Proxy not found: %s" % name)
+
+    creates, deletes = [], []
+    updates = {}
+    interface_updates, interface_creates, interface_deletes = [], [], []
+    created, updated, deleted, present = [], [], [], []
+    for spec in specs:
+        host_name = spec['host_name']
+        zabbix_host_obj = existing.get(host_name)
+        group_ids = [{'groupid': groups[name]} for name in spec['host_groups']]
+        template_ids = [templates[name] for name in spec['link_templates']]
+
+        if spec['state'] == "absent":
+            if zabbix_host_obj:
+                deletes.append(zabbix_host_obj['hostid'])
+                deleted.append(host_name)
+            continue
+
+        if not group_ids:
+            module.fail_json(msg="Specify at least one group for host '%s'." % host_name)
+
+        if not zabbix_host_obj:
+            if not spec['interfaces']:
+                module.fail_json(msg="Specify at least one interface for creating host '%s'." % host_name)
+            parameters = {'host': host_name, 'interfaces': spec['interfaces'], 'groups': group_ids,
+                          'status': spec['status'], 'templates': [{'templateid': t} for t in template_ids]}
+            if spec['proxy']:
+                parameters['proxy_hostid'] = proxies[spec['proxy']]
+            if spec['inventory_mode']:
+                parameters['inventory_mode'] = inventory_mode_value(spec['inventory_mode'])
+            creates.append(parameters)
+            created.append(host_name)
+            continue
+
+        if not module.params['force']:
+            present.append(host_name)
+            continue
+
+        host_id = zabbix_host_obj['hostid']
+        proxy_id = None
+        if spec['proxy']:
+            proxy_id = proxies[spec['proxy']]
+        if not host.check_host_properties(zabbix_host_obj, spec['host_groups'], spec['status'], spec['interfaces'],
+                                          template_ids, proxy_id):
+            continue
+
+        # hosts getting the same changes are updated together with host.massupdate
+        exist_template_ids = set([t['templateid'] for t in zabbix_host_obj['parentTemplates']])
+        templates_clear = sorted(exist_template_ids.difference(template_ids))
+        key = (tuple(sorted([g['groupid'] for g in group_ids])), spec['status'], tuple(sorted(set(template_ids))),
+               tuple(templates_clear), proxy_id, spec['inventory_mode'])
+        updates.setdefault(key, []).append({'hostid': host_id})
+
+        if spec['interfaces'] is not None:
+            update, create, delete = host.diff_interfaces(host_id, spec['interfaces'], zabbix_host_obj['interfaces'])
+            interface_updates.extend(update)
+            interface_creates.extend(create)
+            interface_deletes.extend(delete)
+        updated.append(host_name)
+
+    if present:
+        module.fail_json(changed=False, hosts=present,
+                         msg="Hosts present, Can't update configuration without force: %s" % ", ".join(present))
+
+    changed = bool(created or updated or deleted)
+    if changed and not module.check_mode:
+        try:
+            for offset in range(0, len(creates), HOST_BATCH_SIZE):
+                host._zapi.host.create(creates[offset:offset + HOST_BATCH_SIZE])
+            for (group_ids, status, template_ids, templates_clear, proxy_id, inventory_mode), hosts in updates.items():
+                for offset in range(0, len(hosts), HOST_BATCH_SIZE):
+                    parameters = {'hosts': hosts[offset:offset + HOST_BATCH_SIZE],
+                                  'groups': [{'groupid': g} for g in group_ids], 'status': status,
+                                  'templates': [{'templateid': t} for t in template_ids]}
+                    if templates_clear:
+                        parameters['templates_clear'] = [{'templateid': t} for t in templates_clear]
+                    if proxy_id is not None:
+                        parameters['proxy_hostid'] = proxy_id
+                    if inventory_mode:
+                        parameters['inventory_mode'] = inventory_mode_value(inventory_mode)
+                    host._zapi.host.massupdate(parameters)
+            if interface_updates:
+                host._zapi.hostinterface.update(interface_updates)
+            if interface_creates:
+                host._zapi.hostinterface.create(interface_creates)
+            if interface_deletes:
+                host._zapi.hostinterface.delete(interface_deletes)
+            if deletes:
+                host._zapi.host.delete(deletes)
+        except Exception, e:
+            module.fail_json(msg="Failed to sync hosts: %s" % e)
+
+    module.exit_json(changed=changed, created=created, updated=updated, deleted=deleted)
+
+
 def main():
     module = AnsibleModule(
         argument_spec=dict(
             server_url=dict(type='str', required=True, aliases=['url']),
             login_user=dict(type='str', required=True),
             login_password=dict(type='str', required=True, no_log=True),
-            host_name=dict(type='str', required=True),
+            host_name=dict(type='str', required=False),
             http_login_user=dict(type='str', required=False, default=None),
             http_login_password=dict(type='str', required=False, default=None, no_log=True),
             host_groups=dict(type='list', required=False),
@@ -428,8 +696,11 @@ def main():
             timeout=dict(type='int', default=10),
             interfaces=dict(type='list', required=False),
             force=dict(type='bool', default=True),
-            proxy=dict(type='str', required=False)
+            proxy=dict(type='str', required=False),
+            hosts=dict(type='list', required=False)
         ),
+        required_one_of=[['host_name', 'hosts']],
+        mutually_exclusive=[['host_name', 'hosts']],
         supports_check_mode=True
     )
 
@@ -465,6 +736,9 @@ def main():
 
     host = Host(module, zbx)
 
+    if module.params['hosts']:
+        sync_hosts(module, host, module.params['hosts'])
+
     template_ids = []
     if link_templates:
         template_ids = host.get_template_ids(link_templates)
@@ -147,6 +147,9 @@ try:
 except ImportError:
     HAS_ZABBIX_API = False
 
+# number of hosts whose graphs are looked up with one graph.get call
+GRAPH_GET_HOST_CHUNK = 500
+
 
 # Extend the ZabbixAPI
 # Since the zabbix-api python module too old (version 1.0, and there's no higher version so far), it doesn't support the 'screenitem' api call,
@@ -228,12 +231,31 @@ class Screen(object):
         except Exception as e:
             self._module.fail_json(msg="Failed to delete screen %s: %s" % (screen_name, e))
 
+    # get the graphs matching any of the names on any of the hosts, indexed by (host id, graph name)
+    def get_graph_index(self, hosts, graph_name_list):
+        graph_index = {}
+        for offset in range(0, len(hosts), GRAPH_GET_HOST_CHUNK):
+            host_ids = hosts[offset:offset + GRAPH_GET_HOST_CHUNK]
+            graphs_list = self._zapi.graph.get({'output': ['graphid', 'name'], 'selectHosts': ['hostid'],
+                                                'hostids': host_ids, 'search': {'name': graph_name_list},
+                                                'searchByAny': True, 'sortfield': 'graphid'})
+            for graph in graphs_list:
+                for graph_name in graph_name_list:
+                    # like the name search of graph.get, case insensitive substring match
+                    if graph_name.lower() not in graph['name'].lower():
+                        continue
+                    for host in graph['hosts']:
+                        graph_index.setdefault((host['hostid'], graph_name), []).append(graph['graphid'])
+        return graph_index
+
     # get graph ids
-    def get_graph_ids(self, hosts, graph_name_list):
+    def get_graph_ids(self, hosts, graph_name_list, graph_index=None):
+        if graph_index is None:
+            graph_index = self.get_graph_index(hosts, graph_name_list)
         graph_id_lists = []
         vsize = 1
         for host in hosts:
-            graph_id_list = self.get_graphs_by_host_id(graph_name_list, host)
+            graph_id_list = self.get_graphs_by_host_id(graph_name_list, host, graph_index)
             size = len(graph_id_list)
             if size > 0:
                 graph_id_lists.extend(graph_id_list)
@@ -242,17 +264,12 @@ class Screen(object):
         return graph_id_lists, vsize
 
     #  getGraphs
-    def get_graphs_by_host_id(self, graph_name_list, host_id):
+    def get_graphs_by_host_id(self, graph_name_list, host_id, graph_index=None):
+        if graph_index is None:
+            graph_index = self.get_graph_index([host_id], graph_name_list)
         graph_ids = []
         for graph_name in graph_name_list:
-            graphs_list = self._zapi.graph.get({'output': 'extend', 'search': {'name': graph_name}, 'hostids': host_id})
-            graph_id_list = []
-            if len(graphs_list) > 0:
-                for graph in graphs_list:
-                    graph_id = graph['graphid']
-                    graph_id_list.append(graph_id)
-            if len(graph_id_list) > 0:
-                graph_ids.extend(graph_id_list)
+            graph_ids.extend(graph_index.get((host_id, graph_name), []))
         return graph_ids
 
     # get screen items
@@ -265,13 +282,10 @@ class Screen(object):
         try:
             if len(screen_item_id_list) == 0:
                 return True
-            screen_item_list = self.get_screen_items(screen_id)
-            if len(screen_item_list) > 0:
-                if self._module.check_mode:
-                    self._module.exit_json(changed=True)
-                self._zapi.screenitem.delete(screen_item_id_list)
-                return True
-            return False
+            if self._module.check_mode:
+                self._module.exit_json(changed=True)
+            self._zapi.screenitem.delete(screen_item_id_list)
+            return True
         except ZabbixAPIException:
             pass
 
@@ -289,7 +303,7 @@ class Screen(object):
         return h_size, v_size
 
     # create screen_items
-    def create_screen_items(self, screen_id, hosts, graph_name_list, width, height, h_size):
+    def create_screen_items(self, screen_id, hosts, graph_name_list, width, height, h_size, graph_index=None):
         if len(hosts) < 4:
             if width is None or width < 0:
                 width = 500
@@ -299,27 +313,35 @@ class Screen(object):
         if height is None or height < 0:
             height = 100
 
-        try:
-            # when there're only one host, only one row is not good.
-            if len(hosts) == 1:
-                graph_id_list = self.get_graphs_by_host_id(graph_name_list, hosts[0])
-                for i, graph_id in enumerate(graph_id_list):
+        if graph_index is None:
+            graph_index = self.get_graph_index(hosts, graph_name_list)
+
+        screen_items = []
+        # when there're only one host, only one row is not good.
+        if len(hosts) == 1:
+            graph_id_list = self.get_graphs_by_host_id(graph_name_list, hosts[0], graph_index)
+            for i, graph_id in enumerate(graph_id_list):
+                if graph_id is not None:
+                    screen_items.append({'screenid': screen_id, 'resourcetype': 0, 'resourceid': graph_id,
+                                         'width': width, 'height': height,
+                                         'x': i % h_size, 'y': i / h_size, 'colspan': 1, 'rowspan': 1,
+                                         'elements': 0, 'valign': 0, 'halign': 0,
+                                         'style': 0, 'dynamic': 0, 'sort_triggers': 0})
+        else:
+            for i, host in enumerate(hosts):
+                graph_id_list = self.get_graphs_by_host_id(graph_name_list, host, graph_index)
+                for j, graph_id in enumerate(graph_id_list):
                     if graph_id is not None:
-                        self._zapi.screenitem.create({'screenid': screen_id, 'resourcetype': 0, 'resourceid': graph_id,
-                                                      'width': width, 'height': height,
-                                                      'x': i % h_size, 'y': i / h_size, 'colspan': 1, 'rowspan': 1,
-                                                      'elements': 0, 'valign': 0, 'halign': 0,
-                                                      'style': 0, 'dynamic': 0, 'sort_triggers': 0})
-            else:
-                for i, host in enumerate(hosts):
-                    graph_id_list = self.get_graphs_by_host_id(graph_name_list, host)
-                    for j, graph_id in enumerate(graph_id_list):
-                        if graph_id is not None:
-                            self._zapi.screenitem.create({'screenid': screen_id, 'resourcetype': 0, 'resourceid': graph_id,
-                                                          'width': width, 'height': height,
-                                                          'x': i, 'y': j, 'colspan': 1, 'rowspan': 1,
-                                                          'elements': 0, 'valign': 0, 'halign': 0,
-                                                          'style': 0, 'dynamic': 0, 'sort_triggers': 0})
+                        screen_items.append({'screenid': screen_id, 'resourcetype': 0, 'resourceid': graph_id,
+                                             'width': width, 'height': height,
+                                             'x': i, 'y': j, 'colspan': 1, 'rowspan': 1,
+                                             'elements': 0, 'valign': 0, 'halign': 0,
+                                             'style': 0, 'dynamic': 0, 'sort_triggers': 0})
+
+        try:
+            # all the items of the screen are created with a single call
+            if screen_items:
+                self._zapi.screenitem.create(screen_items)
         except Already_Exists:
             pass
 
@@ -393,13 +415,14 @@ def main():
             screen_item_id_list = []
             resource_id_list = []
 
-            graph_ids, v_size = screen.get_graph_ids(hosts, graph_names)
+            graph_index = screen.get_graph_index(hosts, graph_names)
+            graph_ids, v_size = screen.get_graph_ids(hosts, graph_names, graph_index)
             h_size, v_size = screen.get_hsize_vsize(hosts, v_size)
 
             if not screen_id:
                 # create screen
                 screen_id = screen.create_screen(screen_name, h_size, v_size)
-                screen.create_screen_items(screen_id, hosts, graph_names, graph_width, graph_height, h_size)
+                screen.create_screen_items(screen_id, hosts, graph_names, graph_width, graph_height, h_size, graph_index)
                 created_screens.append(screen_name)
             else:
                 screen_item_list = screen.get_screen_items(screen_id)
@@ -415,7 +438,7 @@ def main():
                     deleted = screen.delete_screen_items(screen_id, screen_item_id_list)
                     if deleted:
                         screen.update_screen(screen_id, screen_name, h_size, v_size)
-                        screen.create_screen_items(screen_id, hosts, graph_names, graph_width, graph_height, h_size)
+                        screen.create_screen_items(screen_id, hosts, graph_names, graph_width, graph_height, h_size, graph_index)
                         changed_screens.append(screen_name)
 
     if created_screens and changed_screens:
@@ -79,6 +79,60 @@ options:
     default: null
     choices: []
     aliases: []
+  concurrency:
+    description:
+      - Number of fact categories collected at the same time. Each one
+        collecting concurrently uses its own connection and session.
+    required: false
+    default: 4
+    version_added: "2.3"
+  cache_dir:
+    description:
+      - A directory to keep collected facts in between runs. Facts are
+        collected again only once the configuration of the device changed,
+        which is checked with a single call, or once they are older than
+        C(cache_ttl).
+      - Runtime values, such as object status, are only as fresh as the
+        cached facts. The system_info category is never cached.
+    required: false
+    default: null
+    version_added: "2.3"
+  cache_ttl:
+    description:
+      - Maximum age in seconds of the facts used from C(cache_dir).
+    required: false
+    default: 3600
+    version_added: "2.3"
+  cache_max_size:
+    description:
+      - Maximum size of C(cache_dir) in megabytes. The least recently
+        used facts are removed once it is exceeded.
+    required: false
+    default: 100
+    version_added: "2.3"
+  fields:
+    description:
+      - List of the fields to collect for every object, such as
+        C(description) or C(member). Only these are requested from the
+        device; fields a category does not have are ignored.
+      - By default all fields are collected.
+      - Does not apply to the provision, software and system_info
+        categories, which are not made of objects and are always collected
+        in full.
+    required: false
+    default: null
+    version_added: "2.3"
+  dest:
+    description:
+      - Write the facts to this file, as JSON lines, instead of returning
+        them as C(ansible_facts). Every line holds the C(category),
+        C(name) and C(facts) of one object, and is written as soon as
+        the object is collected.
+      - Delegate the task to localhost to write the file on the
+        controller. Mutually exclusive with C(cache_dir).
+    required: false
+    default: null
+    version_added: "2.3"
 extends_documentation_fragment: f5
 '''
 
@@ -90,6 +144,41 @@ EXAMPLES = '''
       password: "secret"
       include: "interface,vlan"
   delegate_to: localhost
+
+- name: Collect BIG-IP facts, reusing them until the configuration changes
+  bigip_facts:
+      server: "lb.mydomain.com"
+      user: "admin"
+      password: "secret"
+      include: "pool,virtual_server,node"
+      cache_dir: "/var/cache/bigip_facts"
+  delegate_to: localhost
+
+- name: Write the destination and pool of every virtual server to a file
+  bigip_facts:
+      server: "lb.mydomain.com"
+      user: "admin"
+      password: "secret"
+      include: "virtual_server"
+      fields: "destination,default_pool_name"
+      dest: "/tmp/virtual_servers.json"
+  delegate_to: localhost
+'''
+
+RETURN = '''
+collection_stats:
+    description: Wall time in seconds and number of iControl calls spent
+                 collecting each fact category, and whether it was taken
+                 from C(cache_dir).
+    returned: always
+    type: dict
+    sample: {"pool": {"elapsed": 3.412, "calls": 29, "cached": false}, "vlan": {"elapsed": 0.0, "calls": 0, "cached": true}}
+dest:
+    description: File the facts were written to, with the number of objects
+                 written for each category in C(collection_stats).
+    returned: when dest is set
+    type: string
+    sample: "/tmp/virtual_servers.json"
 '''
 
 try:
@@ -100,8 +189,21 @@ else:
     bigsuds_found = True
 
 import fnmatch
+import hashlib
+import os
 import re
+import tempfile
+import threading
+import time
 import traceback
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+try:
+    import json
+except ImportError:
+    import simplejson as json
 
 
 class F5(object):
@@ -142,6 +244,179 @@ class F5(object):
     def get_active_folder(self):
         return self.api.System.Session.get_active_folder()
 
+    def get_config_generation(self):
+        """Time of the last configuration change, which is cheap to query
+        and changes on every change of the configuration"""
+        result = self.api.Management.DBVariable.query(['configsync.localconfigtime'])
+        return str(result[0]['value'])
+
+
+class CountingAPI(object):
+    """Counting iControl API proxy.
+
+    Wraps a bigsuds API instance and counts the SOAP calls made through it.
+
+    Attributes:
+        calls: A one-element list holding the number of calls made so far,
+            shared by every proxy derived from the same API instance.
+    """
+
+    def __init__(self, api, calls=None):
+        self._api = api
+        if calls is None:
+            calls = [0]
+        self.calls = calls
+
+    def __getattr__(self, name):
+        attr = getattr(self._api, name)
+        if not callable(attr):
+            return CountingAPI(attr, self.calls)
+
+        def call(*args, **kwargs):
+            self.calls[0] += 1
+            return attr(*args, **kwargs)
+        return call
+
+
+class FactCache(object):
+    """On-disk cache of collected facts.
+
+    Entries are keyed by device, user, fact category and filter. Each one
+    records the configuration generation of the device it was collected
+    at, and is only used while the device reports the same generation and
+    the entry is not older than the TTL.
+
+    Attributes:
+        path: Directory holding the cache entries.
+        ttl: Maximum age of an entry in seconds.
+        max_size: Maximum size of the cache in bytes, or None.
+    """
+
+    def __init__(self, path, ttl, max_size=None):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+
+    def path_for(self, server, server_port, user, name, fact_filter, fields=None):
+        if fields is not None:
+            fields = ','.join(sorted(fields))
+        key = "%s:%s|%s|%s|%s|%s" % (server, server_port, user, name, fact_filter, fields)
+        return os.path.join(self.path, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def lookup(self, path, generation):
+        try:
+            f = open(path, 'r')
+            try:
+                entry = json.loads(f.read())
+            finally:
+                f.close()
+        except (IOError, ValueError):
+            return None
+        if entry.get('generation') != generation:
+            return None
+        if time.time() - entry.get('stored', 0) > self.ttl:
+            return None
+        # Mark the entry as recently used for eviction
+        os.utime(path, None)
+        return entry['facts']
+
+    def store(self, path, generation, facts):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        tmp = "%s.%s.tmp" % (path, os.getpid())
+        f = open(tmp, 'w')
+        try:
+            f.write(json.dumps(dict(generation=generation, stored=time.time(), facts=facts)))
+        finally:
+            f.close()
+        os.rename(tmp, path)
+
+    def evict(self):
+        """Remove expired entries, then least recently used ones until the
+        cache fits in max_size bytes"""
+        if not os.path.isdir(self.path):
+            return []
+
+        entries = []
+        total = 0
+        evicted = []
+        now = time.time()
+        for filename in os.listdir(self.path):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(self.path, filename)
+            st = os.stat(path)
+            if now - st.st_mtime > self.ttl:
+                os.remove(path)
+                evicted.append(path)
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        entries.sort()
+        for mtime, size, path in entries:
+            if not self.max_size or total <= self.max_size:
+                break
+            os.remove(path)
+            total -= size
+            evicted.append(path)
+        return evicted
+
+
+class FactStream(object):
+    """JSON lines output of facts.
+
+    Every object is written as one line as soon as it is collected, so the
+    facts never have to be held in memory all at once.
+
+    Attributes:
+        counts: Number of lines written for each fact category.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def write(self, category, name, facts):
+        line = dict(category=category, facts=facts)
+        if name is not None:
+            line['name'] = name
+        line = json.dumps(line) + '\n'
+        self.lock.acquire()
+        try:
+            self.f.write(line)
+            self.counts[category] = self.counts.get(category, 0) + 1
+        finally:
+            self.lock.release()
+
+
+class FactOutput(object):
+    """Destination of the facts of one category.
+
+    Attributes:
+        category: Fact category name.
+        fields: Names of the fields to collect for every object, or None
+            for all of them.
+        stream: FactStream the facts are written to, or None to return them.
+    """
+
+    def __init__(self, category, fields=None, stream=None):
+        self.category = category
+        self.fields = fields
+        self.stream = stream
+
+    def project(self, fields):
+        if self.fields is None:
+            return fields
+        return [field for field in fields if field in self.fields]
+
+    def emit(self, result, name, facts):
+        if self.stream is None:
+            result[name] = facts
+        else:
+            self.stream.write(self.category, name, facts)
+
 
 class Interfaces(object):
     """Interfaces class.
@@ -1371,12 +1646,15 @@ class ProvisionInfo(object):
         return result
 
 
-def generate_dict(api_obj, fields):
+def generate_dict(api_obj, fields, output=None):
+    if output is None:
+        output = FactOutput(None)
     result_dict = {}
     lists = []
     supported_fields = []
-    if api_obj.get_list():
-        for field in fields:
+    names = list(api_obj.get_list())
+    if names:
+        for field in output.project(fields):
             try:
                 api_response = getattr(api_obj, "get_" + field)()
             except (MethodNotFound, WebFault):
@@ -1384,14 +1662,16 @@ def generate_dict(api_obj, fields):
             else:
                 lists.append(api_response)
                 supported_fields.append(field)
-        for i, j in enumerate(api_obj.get_list()):
+        for i, j in enumerate(names):
             temp = {}
             temp.update([(item[0], item[1][i]) for item in zip(supported_fields, lists)])
-            result_dict[j] = temp
+            output.emit(result_dict, j, temp)
     return result_dict
 
 
-def generate_simple_dict(api_obj, fields):
+def generate_simple_dict(api_obj, fields, output=None):
+    # The fields option names fields of objects, these categories are
+    # single records and are not projected
     result_dict = {}
     for field in fields:
         try:
@@ -1403,7 +1683,7 @@ def generate_simple_dict(api_obj, fields):
     return result_dict
 
 
-def generate_interface_dict(f5, regex):
+def generate_interface_dict(f5, regex, output=None):
     interfaces = Interfaces(f5.get_api(), regex)
     fields = ['active_media', 'actual_flow_control', 'bundle_state',
               'description', 'dual_media_state', 'enabled_state', 'if_index',
@@ -1415,29 +1695,29 @@ def generate_interface_dict(f5, regex):
               'sfp_media_state', 'stp_active_edge_port_state',
               'stp_enabled_state', 'stp_link_type',
               'stp_protocol_detection_reset_state']
-    return generate_dict(interfaces, fields)
+    return generate_dict(interfaces, fields, output)
 
 
-def generate_self_ip_dict(f5, regex):
+def generate_self_ip_dict(f5, regex, output=None):
     self_ips = SelfIPs(f5.get_api(), regex)
     fields = ['address', 'allow_access_list', 'description',
               'enforced_firewall_policy', 'floating_state', 'fw_rule',
               'netmask', 'staged_firewall_policy', 'traffic_group',
               'vlan', 'is_traffic_group_inherited']
-    return generate_dict(self_ips, fields)
+    return generate_dict(self_ips, fields, output)
 
 
-def generate_trunk_dict(f5, regex):
+def generate_trunk_dict(f5, regex, output=None):
     trunks = Trunks(f5.get_api(), regex)
     fields = ['active_lacp_state', 'configured_member_count', 'description',
               'distribution_hash_option', 'interface', 'lacp_enabled_state',
               'lacp_timeout_option', 'link_selection_policy', 'media_speed',
               'media_status', 'operational_member_count', 'stp_enabled_state',
               'stp_protocol_detection_reset_state']
-    return generate_dict(trunks, fields)
+    return generate_dict(trunks, fields, output)
 
 
-def generate_vlan_dict(f5, regex):
+def generate_vlan_dict(f5, regex, output=None):
     vlans = Vlans(f5.get_api(), regex)
     fields = ['auto_lasthop', 'cmp_hash_algorithm', 'description',
               'dynamic_forwarding', 'failsafe_action', 'failsafe_state',
@@ -1446,10 +1726,10 @@ def generate_vlan_dict(f5, regex):
               'sflow_poll_interval', 'sflow_poll_interval_global',
               'sflow_sampling_rate', 'sflow_sampling_rate_global',
               'source_check_state', 'true_mac_address', 'vlan_id']
-    return generate_dict(vlans, fields)
+    return generate_dict(vlans, fields, output)
 
 
-def generate_vs_dict(f5, regex):
+def generate_vs_dict(f5, regex, output=None):
     virtual_servers = VirtualServers(f5.get_api(), regex)
     fields = ['actual_hardware_acceleration', 'authentication_profile',
               'auto_lasthop', 'bw_controller_policy', 'clone_pool',
@@ -1467,10 +1747,10 @@ def generate_vs_dict(f5, regex):
               'source_address_translation_type', 'source_port_behavior',
               'staged_firewall_policy', 'translate_address_state',
               'translate_port_state', 'type', 'vlan', 'wildmask']
-    return generate_dict(virtual_servers, fields)
+    return generate_dict(virtual_servers, fields, output)
 
 
-def generate_pool_dict(f5, regex):
+def generate_pool_dict(f5, regex, output=None):
     pools = Pools(f5.get_api(), regex)
     fields = ['action_on_service_down', 'active_member_count',
               'aggregate_dynamic_ratio', 'allow_nat_state',
@@ -1484,10 +1764,10 @@ def generate_pool_dict(f5, regex):
               'queue_on_connection_limit_state', 'queue_time_limit',
               'reselect_tries', 'server_ip_tos', 'server_link_qos',
               'simple_timeout', 'slow_ramp_time']
-    return generate_dict(pools, fields)
+    return generate_dict(pools, fields, output)
 
 
-def generate_device_dict(f5, regex):
+def generate_device_dict(f5, regex, output=None):
     devices = Devices(f5.get_api(), regex)
     fields = ['active_modules', 'base_mac_address', 'blade_addresses',
               'build', 'chassis_id', 'chassis_type', 'comment',
@@ -1497,68 +1777,78 @@ def generate_device_dict(f5, regex):
               'optional_modules', 'platform_id', 'primary_mirror_address',
               'product', 'secondary_mirror_address', 'software_version',
               'timelimited_modules', 'timezone', 'unicast_addresses']
-    return generate_dict(devices, fields)
+    return generate_dict(devices, fields, output)
 
 
-def generate_device_group_dict(f5, regex):
+def generate_device_group_dict(f5, regex, output=None):
     device_groups = DeviceGroups(f5.get_api(), regex)
     fields = ['all_preferred_active', 'autosync_enabled_state', 'description',
               'device', 'full_load_on_sync_state',
               'incremental_config_sync_size_maximum',
               'network_failover_enabled_state', 'sync_status', 'type']
-    return generate_dict(device_groups, fields)
+    return generate_dict(device_groups, fields, output)
 
 
-def generate_traffic_group_dict(f5, regex):
+def generate_traffic_group_dict(f5, regex, output=None):
     traffic_groups = TrafficGroups(f5.get_api(), regex)
     fields = ['auto_failback_enabled_state', 'auto_failback_time',
               'default_device', 'description', 'ha_load_factor',
               'ha_order', 'is_floating', 'mac_masquerade_address',
               'unit_id']
-    return generate_dict(traffic_groups, fields)
+    return generate_dict(traffic_groups, fields, output)
 
 
-def generate_rule_dict(f5, regex):
+def generate_rule_dict(f5, regex, output=None):
     rules = Rules(f5.get_api(), regex)
     fields = ['definition', 'description', 'ignore_vertification',
               'verification_status']
-    return generate_dict(rules, fields)
+    return generate_dict(rules, fields, output)
 
 
-def generate_node_dict(f5, regex):
+def generate_node_dict(f5, regex, output=None):
     nodes = Nodes(f5.get_api(), regex)
     fields = ['address', 'connection_limit', 'description', 'dynamic_ratio',
               'monitor_instance', 'monitor_rule', 'monitor_status',
               'object_status', 'rate_limit', 'ratio', 'session_status']
-    return generate_dict(nodes, fields)
+    return generate_dict(nodes, fields, output)
 
 
-def generate_virtual_address_dict(f5, regex):
+def generate_virtual_address_dict(f5, regex, output=None):
     virtual_addresses = VirtualAddresses(f5.get_api(), regex)
     fields = ['address', 'arp_state', 'auto_delete_state', 'connection_limit',
               'description', 'enabled_state', 'icmp_echo_state',
               'is_floating_state', 'netmask', 'object_status',
               'route_advertisement_state', 'traffic_group']
-    return generate_dict(virtual_addresses, fields)
+    return generate_dict(virtual_addresses, fields, output)
 
 
-def generate_address_class_dict(f5, regex):
+def generate_address_class_dict(f5, regex, output=None):
     address_classes = AddressClasses(f5.get_api(), regex)
     fields = ['address_class', 'description']
-    return generate_dict(address_classes, fields)
+    return generate_dict(address_classes, fields, output)
 
 
-def generate_certificate_dict(f5, regex):
+def generate_certificate_dict(f5, regex, output=None):
     certificates = Certificates(f5.get_api(), regex)
-    return dict(zip(certificates.get_list(), certificates.get_certificate_list()))
+    if output is None:
+        output = FactOutput(None)
+    result_dict = {}
+    for name, certificate in zip(certificates.get_list(), certificates.get_certificate_list()):
+        output.emit(result_dict, name, certificate)
+    return result_dict
 
 
-def generate_key_dict(f5, regex):
+def generate_key_dict(f5, regex, output=None):
     keys = Keys(f5.get_api(), regex)
-    return dict(zip(keys.get_list(), keys.get_key_list()))
+    if output is None:
+        output = FactOutput(None)
+    result_dict = {}
+    for name, key in zip(keys.get_list(), keys.get_key_list()):
+        output.emit(result_dict, name, key)
+    return result_dict
 
 
-def generate_client_ssl_profile_dict(f5, regex):
+def generate_client_ssl_profile_dict(f5, regex, output=None):
     profiles = ProfileClientSSL(f5.get_api(), regex)
     fields = ['alert_timeout', 'allow_nonssl_state', 'authenticate_depth',
               'authenticate_once_state', 'ca_file', 'cache_size',
@@ -1579,10 +1869,10 @@ def generate_client_ssl_profile_dict(f5, regex):
               'server_name', 'session_ticket_state', 'sni_default_state',
               'sni_require_state', 'ssl_option', 'strict_resume_state',
               'unclean_shutdown_state', 'is_base_profile', 'is_system_profile']
-    return generate_dict(profiles, fields)
+    return generate_dict(profiles, fields, output)
 
 
-def generate_system_info_dict(f5):
+def generate_system_info_dict(f5, output=None):
     system_info = SystemInfo(f5.get_api())
     fields = ['base_mac_address',
               'blade_temperature', 'chassis_slot_information',
@@ -1592,19 +1882,135 @@ def generate_system_info_dict(f5):
               'product_information', 'pva_version', 'system_id',
               'system_information', 'time',
               'time_zone', 'uptime']
-    return generate_simple_dict(system_info, fields)
+    return generate_simple_dict(system_info, fields, output)
 
 
-def generate_software_list(f5):
+def generate_software_list(f5, output=None):
     software = Software(f5.get_api())
     software_list = software.get_all_software_status()
     return software_list
 
 
-def generate_provision_dict(f5):
+def generate_provision_dict(f5, output=None):
     provisioned = ProvisionInfo(f5.get_api())
     fields = ['list', 'provisioned_list']
-    return generate_simple_dict(provisioned, fields)
+    return generate_simple_dict(provisioned, fields, output)
+
+
+FACT_GENERATORS = {
+    'address_class': generate_address_class_dict,
+    'certificate': generate_certificate_dict,
+    'client_ssl_profile': generate_client_ssl_profile_dict,
+    'device': generate_device_dict,
+    'device_group': generate_device_group_dict,
+    'interface': generate_interface_dict,
+    'key': generate_key_dict,
+    'node': generate_node_dict,
+    'pool': generate_pool_dict,
+    'provision': generate_provision_dict,
+    'rule': generate_rule_dict,
+    'self_ip': generate_self_ip_dict,
+    'software': generate_software_list,
+    'system_info': generate_system_info_dict,
+    'traffic_group': generate_traffic_group_dict,
+    'trunk': generate_trunk_dict,
+    'virtual_address': generate_virtual_address_dict,
+    'virtual_server': generate_vs_dict,
+    'vlan': generate_vlan_dict,
+}
+
+# Fact categories which are not filtered by the filter option
+UNFILTERED_FACTS = ('provision', 'software', 'system_info')
+
+# Fact categories which mostly report runtime values, and are never cached
+UNCACHED_FACTS = ('system_info',)
+
+
+class FactCollectionError(Exception):
+    def __init__(self, error, tb):
+        Exception.__init__(self, str(error))
+        self.error = error
+        self.traceback = tb
+
+
+def collect_facts(f5, name, regex, output):
+    """Collect one fact category.
+
+    Returns the facts along with the wall time spent and the number of
+    iControl calls made to collect them. When streaming, the facts are
+    written out as they are collected and an empty result is returned.
+    """
+    calls = f5.get_api().calls[0]
+    start = time.time()
+    if name in UNFILTERED_FACTS:
+        facts = FACT_GENERATORS[name](f5, output)
+    else:
+        facts = FACT_GENERATORS[name](f5, regex, output)
+    # Categories which are not a set of named objects are written at once
+    if output.stream is not None and facts:
+        output.stream.write(name, None, facts)
+        facts = {}
+    stats = dict(elapsed=round(time.time() - start, 3),
+                 calls=f5.get_api().calls[0] - calls)
+    return facts, stats
+
+
+def collect_all_facts(connect, include, regex, concurrency, fields=None, stream=None):
+    """Collect fact categories on a pool of threads.
+
+    Every thread opens its own connection through connect() and collects
+    categories off a shared queue until none are left. Returns the facts
+    and per-category statistics, or raises the first error encountered.
+    """
+    facts = {}
+    stats = {}
+    errors = []
+    work = queue.Queue()
+    for name in include:
+        work.put(name)
+
+    def worker():
+        try:
+            f5 = connect()
+            saved_active_folder = f5.get_active_folder()
+            saved_recursive_query_state = f5.get_recursive_query_state()
+            if saved_active_folder != "/":
+                f5.set_active_folder("/")
+            if saved_recursive_query_state != "STATE_ENABLED":
+                f5.enable_recursive_query_state()
+        except Exception as e:
+            errors.append((e, traceback.format_exc()))
+            return
+
+        while not errors:
+            try:
+                name = work.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                facts[name], stats[name] = collect_facts(f5, name, regex, FactOutput(name, fields, stream))
+            except Exception as e:
+                errors.append((e, traceback.format_exc()))
+
+        # restore saved state
+        if saved_active_folder and saved_active_folder != "/":
+            f5.set_active_folder(saved_active_folder)
+        if saved_recursive_query_state and \
+           saved_recursive_query_state != "STATE_ENABLED":
+            f5.set_recursive_query_state(saved_recursive_query_state)
+
+    threads = []
+    for i in range(min(concurrency, len(include))):
+        t = threading.Thread(target=worker)
+        t.daemon = True
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+
+    if errors:
+        raise FactCollectionError(*errors[0])
+    return facts, stats
 
 
 def main():
@@ -1614,11 +2020,18 @@ def main():
         session=dict(type='bool', default=False),
         include=dict(type='list', required=True),
         filter=dict(type='str', required=False),
+        concurrency=dict(type='int', default=4),
+        cache_dir=dict(type='path', required=False),
+        cache_ttl=dict(type='int', default=3600),
+        cache_max_size=dict(type='int', default=100),
+        fields=dict(type='list', required=False),
+        dest=dict(type='path', required=False),
     )
     argument_spec.update(meta_args)
 
     module = AnsibleModule(
-        argument_spec=argument_spec
+        argument_spec=argument_spec,
+        mutually_exclusive=[['dest', 'cache_dir']]
     )
 
     if not bigsuds_found:
@@ -1631,6 +2044,12 @@ def main():
     validate_certs = module.params['validate_certs']
     session = module.params['session']
     fact_filter = module.params['filter']
+    concurrency = module.params['concurrency']
+    cache_dir = module.params['cache_dir']
+    cache_ttl = module.params['cache_ttl']
+    cache_max_size = module.params['cache_max_size']
+    fields = module.params['fields']
+    dest = module.params['dest']
 
     if validate_certs:
         import ssl
@@ -1641,7 +2060,10 @@ def main():
         regex = fnmatch.translate(fact_filter)
     else:
         regex = None
-    include = [x.lower() for x in module.params['include']]
+    include = []
+    for x in module.params['include']:
+        if x.lower() not in include:
+            include.append(x.lower())
     valid_includes = ('address_class', 'certificate', 'client_ssl_profile',
                       'device', 'device_group', 'interface', 'key', 'node',
                       'pool', 'provision', 'rule', 'self_ip', 'software',
@@ -1650,69 +2072,80 @@ def main():
     include_test = map(lambda x: x in valid_includes, include)
     if not all(include_test):
         module.fail_json(msg="value of include must be one or more of: %s, got: %s" % (",".join(valid_includes), ",".join(include)))
+    if concurrency < 1:
+        module.fail_json(msg="concurrency must be at least 1")
+
+    def connect():
+        # Concurrent connections each get their own session, so that the
+        # active folder and query state of one do not leak into another
+        f5 = F5(server, user, password, session or concurrency > 1,
+                validate_certs, server_port)
+        f5.api = CountingAPI(f5.get_api())
+        return f5
+
+    cache = None
+    if cache_dir:
+        cache = FactCache(cache_dir, cache_ttl, cache_max_size * 1024 * 1024)
+
+    facts = {}
+    stats = {}
+    if len(include) > 0:
+        missing = include
+        if cache is not None:
+            try:
+                generation = connect().get_config_generation()
+            except Exception as e:
+                module.fail_json(msg="received exception: %s\ntraceback: %s" % (e, traceback.format_exc()))
+            missing = []
+            for name in include:
+                cached = None
+                if name not in UNCACHED_FACTS:
+                    cached = cache.lookup(cache.path_for(server, server_port, user, name, fact_filter, fields), generation)
+                if cached is None:
+                    missing.append(name)
+                else:
+                    facts[name] = cached
+                    stats[name] = dict(elapsed=0.0, calls=0, cached=True)
+
+        stream = None
+        if dest:
+            try:
+                tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest) or '.')
+                stream = FactStream(os.fdopen(tmp_fd, 'w'))
+            except (IOError, OSError) as e:
+                module.fail_json(msg="Failed to open %s: %s" % (dest, e))
 
-    try:
-        facts = {}
-
-        if len(include) > 0:
-            f5 = F5(server, user, password, session, validate_certs, server_port)
-            saved_active_folder = f5.get_active_folder()
-            saved_recursive_query_state = f5.get_recursive_query_state()
-            if saved_active_folder != "/":
-                f5.set_active_folder("/")
-            if saved_recursive_query_state != "STATE_ENABLED":
-                f5.enable_recursive_query_state()
-
-            if 'interface' in include:
-                facts['interface'] = generate_interface_dict(f5, regex)
-            if 'self_ip' in include:
-                facts['self_ip'] = generate_self_ip_dict(f5, regex)
-            if 'trunk' in include:
-                facts['trunk'] = generate_trunk_dict(f5, regex)
-            if 'vlan' in include:
-                facts['vlan'] = generate_vlan_dict(f5, regex)
-            if 'virtual_server' in include:
-                facts['virtual_server'] = generate_vs_dict(f5, regex)
-            if 'pool' in include:
-                facts['pool'] = generate_pool_dict(f5, regex)
-            if 'provision' in include:
-                facts['provision'] = generate_provision_dict(f5)
-            if 'device' in include:
-                facts['device'] = generate_device_dict(f5, regex)
-            if 'device_group' in include:
-                facts['device_group'] = generate_device_group_dict(f5, regex)
-            if 'traffic_group' in include:
-                facts['traffic_group'] = generate_traffic_group_dict(f5, regex)
-            if 'rule' in include:
-                facts['rule'] = generate_rule_dict(f5, regex)
-            if 'node' in include:
-                facts['node'] = generate_node_dict(f5, regex)
-            if 'virtual_address' in include:
-                facts['virtual_address'] = generate_virtual_address_dict(f5, regex)
-            if 'address_class' in include:
-                facts['address_class'] = generate_address_class_dict(f5, regex)
-            if 'software' in include:
-                facts['software'] = generate_software_list(f5)
-            if 'certificate' in include:
-                facts['certificate'] = generate_certificate_dict(f5, regex)
-            if 'key' in include:
-                facts['key'] = generate_key_dict(f5, regex)
-            if 'client_ssl_profile' in include:
-                facts['client_ssl_profile'] = generate_client_ssl_profile_dict(f5, regex)
-            if 'system_info' in include:
-                facts['system_info'] = generate_system_info_dict(f5)
-
-            # restore saved state
-            if saved_active_folder and saved_active_folder != "/":
-                f5.set_active_folder(saved_active_folder)
-            if saved_recursive_query_state and \
-               saved_recursive_query_state != "STATE_ENABLED":
-                f5.set_recursive_query_state(saved_recursive_query_state)
-
-        result = {'ansible_facts': facts}
-
-    except Exception as e:
-        module.fail_json(msg="received exception: %s\ntraceback: %s" % (e, traceback.format_exc()))
+        try:
+            collected, collected_stats = collect_all_facts(connect, missing, regex, concurrency, fields, stream)
+        except FactCollectionError as e:
+            if stream is not None:
+                stream.f.close()
+                os.remove(tmp_path)
+            module.fail_json(msg="received exception: %s\ntraceback: %s" % (e.error, e.traceback))
+        for name in missing:
+            facts[name] = collected[name]
+            stats[name] = collected_stats[name]
+            stats[name]['cached'] = False
+
+        if stream is not None:
+            stream.f.close()
+            module.atomic_move(tmp_path, dest)
+            facts = {}
+            for name in missing:
+                stats[name]['objects'] = stream.counts.get(name, 0)
+
+        if cache is not None:
+            try:
+                for name in missing:
+                    if name not in UNCACHED_FACTS:
+                        cache.store(cache.path_for(server, server_port, user, name, fact_filter, fields), generation, collected[name])
+                cache.evict()
+            except (IOError, OSError) as e:
+                module.fail_json(msg="Failed to update the facts cache in %s: %s" % (cache_dir, e))
+
+    result = {'ansible_facts': facts, 'collection_stats': stats}
+    if dest:
+        result['dest'] = dest
 
     module.exit_json(**result)
 
@@ -129,6 +129,7 @@ EXAMPLES = '''
 author: "Ravi Bhure (@ravibhure)"
 '''
 
+import re
 import socket
 import csv
 import time
@@ -137,9 +138,22 @@ from string import Template
 
 DEFAULT_SOCKET_LOCATION="/var/run/haproxy.sock"
 RECV_SIZE = 1024
+PROMPT = '> '
 ACTION_CHOICES = ['enabled', 'disabled']
 WAIT_RETRIES=25
 WAIT_INTERVAL=5
+# HAProxy reads a CLI request into a buffer of tune.bufsize (16384 bytes by
+# default), so batches of commands are sent in chunks well below that
+CLI_CHUNK_SIZE = 8192
+
+
+def count_commands(cmd):
+    """
+    Number of commands in a line, where HAProxy splits on each ';' that is
+    not escaped with a backslash.
+    """
+    return len(re.split(r'(?<!\\);', cmd))
+
 
 ######################################################################
 class TimeoutException(Exception):
@@ -155,6 +169,9 @@ class HAProxy(object):
     on their website:
 
     http://haproxy.1wt.eu/download/1.5/doc/configuration.txt#Unix Socket commands
+
+    A single connection is kept open in interactive ('prompt') mode, where
+    HAProxy keeps the session alive and ends each response with a prompt.
     """
 
     def __init__(self, module):
@@ -171,24 +188,97 @@ class HAProxy(object):
         self.wait_retries = self.module.params['wait_retries']
         self.wait_interval = self.module.params['wait_interval']
         self.command_results = {}
+        self.client = None
+        self.buffer = ''
 
-    def execute(self, cmd, timeout=200, capture_output=True):
+    def connect(self):
         """
-        Executes a HAProxy command by sending a message to a HAProxy's local
-        UNIX socket and waiting up to 'timeout' milliseconds for the response.
+        Open the connection to HAProxy's UNIX socket and switch it to
+        interactive mode, so that it serves any number of commands.
         """
         self.client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         self.client.connect(self.socket)
-        self.client.sendall('%s\n' % cmd)
+        self.buffer = ''
+        self.client.sendall('prompt\n')
+        self.read_response()
+
+    def close(self):
+        if self.client is not None:
+            try:
+                self.client.sendall('quit\n')
+            except socket.error:
+                pass
+            self.client.close()
+            self.client = None
+
+    def read_response(self, count=1):
+        """
+        Read the responses to count commands. HAProxy prints a prompt once it
+        is done with each command, also with each of several commands sent
+        on one line separated by ';'. Anything read past the last expected
+        prompt is kept for the next call.
+        """
         result = ''
-        buf = ''
-        buf = self.client.recv(RECV_SIZE)
-        while buf:
-            result += buf
-            buf = self.client.recv(RECV_SIZE)
+        for i in range(count):
+            end = self.find_prompt()
+            while end is None:
+                buf = self.client.recv(RECV_SIZE)
+                if not buf:
+                    raise socket.error('connection closed by HAProxy')
+                self.buffer += buf
+                end = self.find_prompt()
+            result += self.buffer[:end]
+            self.buffer = self.buffer[end + len(PROMPT):]
+        return result
+
+    def find_prompt(self):
+        """
+        Return the offset of the prompt ending the first response in the
+        buffer, or None if that response is not complete yet.
+        """
+        if self.buffer.startswith(PROMPT):
+            return 0
+        end = self.buffer.find('\n' + PROMPT)
+        if end < 0:
+            return None
+        return end + 1
+
+    def execute(self, cmd, timeout=200, capture_output=True):
+        """
+        Executes a HAProxy command (or several, separated by ';') over the
+        interactive session and returns the response.
+        """
+        if self.client is None:
+            self.connect()
+        self.client.sendall('%s\n' % cmd)
+        result = self.read_response(count_commands(cmd))
         if capture_output:
             self.capture_command_output(cmd, result.strip())
-        self.client.close()
+        return result
+
+
+    def execute_lines(self, cmds, capture_output=True):
+        """
+        Executes many HAProxy commands, one per line. The lines are sent in
+        chunks that stay below CLI_CHUNK_SIZE, and the responses of each
+        chunk are read before the next one is sent.
+        """
+        if self.client is None:
+            self.connect()
+        result = ''
+        chunk, size = [], 0
+        for i, cmd in enumerate(cmds):
+            chunk.append(cmd)
+            size += len(cmd) + 1
+            if i + 1 < len(cmds) and size + len(cmds[i + 1]) + 1 <= CLI_CHUNK_SIZE:
+                continue
+            data = '\n'.join(chunk)
+            self.client.sendall(data + '\n')
+            output = self.read_response(sum([count_commands(c) for c in chunk]))
+            if capture_output:
+                self.capture_command_output(data, output.strip())
+            result += output
+            chunk, size = [], 0
         return result
 
 
@@ -204,14 +294,35 @@ class HAProxy(object):
         self.command_results['output'].append(output)
 
 
-    def discover_all_backends(self):
+    def get_stats(self):
+        """
+        Take a single 'show stat' snapshot and index it. Returns a dict keyed
+        by (pxname, svname), a dict mapping each svname to its entries in the
+        order HAProxy reported them, and the list of backend pxnames.
+        """
+        data = self.execute('show stat', 200, False).lstrip('# ')
+        by_name = {}
+        by_svname = {}
+        backends = []
+        for d in csv.DictReader(data.splitlines()):
+            if not d.get('svname'):
+                continue
+            entry = { 'status': d['status'], 'weight': d['weight'] }
+            by_name[(d['pxname'], d['svname'])] = entry
+            by_svname.setdefault(d['svname'], []).append(entry)
+            if d['svname'] == 'BACKEND':
+                backends.append(d['pxname'])
+        return by_name, by_svname, backends
+
+
+    def discover_all_backends(self, stats=None):
         """
         Discover all entries with svname = 'BACKEND' and return a list of their corresponding
         pxnames
         """
-        data = self.execute('show stat', 200, False).lstrip('# ')
-        r = csv.DictReader(data.splitlines())
-        return map(lambda d: d['pxname'], filter(lambda d: d['svname'] == 'BACKEND', r))
+        if stats is None:
+            stats = self.get_stats()
+        return stats[2]
 
 
     def execute_for_backends(self, cmd, pxname, svname, wait_for_status = None):
@@ -219,52 +330,64 @@ class HAProxy(object):
         Run some command on the specified backends. If no backends are provided they will
         be discovered automatically (all backends)
         """
+        stats = self.get_stats()
+
         # Discover backends if none are given
         if pxname is None:
-            backends = self.discover_all_backends()
+            backends = self.discover_all_backends(stats)
         else:
             backends = [pxname]
 
-        # Run the command for each requested backend
+        # Fail when backends were not found
         for backend in backends:
-            # Fail when backends were not found
-            state = self.get_state_for(backend, svname)
+            state = self.get_state_for(backend, svname, stats)
             if (self.fail_on_not_found or self.wait) and state is None:
                 self.module.fail_json(msg="The specified backend '%s/%s' was not found!" % (backend, svname))
 
-            self.execute(Template(cmd).substitute(pxname = backend, svname = svname))
+        # Run the command for all requested backends, one per line
+        if backends:
+            self.execute_lines([Template(cmd).substitute(pxname = backend, svname = svname) for backend in backends])
             if self.wait:
-                self.wait_until_status(backend, svname, wait_for_status)
+                self.wait_until_status(backends, svname, wait_for_status)
 
 
-    def get_state_for(self, pxname, svname):
+    def get_state_for(self, pxname, svname, stats=None):
         """
         Find the state of specific services. When pxname is not set, get all backends for a specific host.
         Returns a list of dictionaries containing the status and weight for those services.
         """
-        data = self.execute('show stat', 200, False).lstrip('# ')
-        r = csv.DictReader(data.splitlines())
-        state = map(lambda d: { 'status': d['status'], 'weight': d['weight'] }, filter(lambda d: (pxname is None or d['pxname'] == pxname) and d['svname'] == svname, r))
+        if stats is None:
+            stats = self.get_stats()
+        by_name, by_svname, backends = stats
+        if pxname is None:
+            state = by_svname.get(svname, [])
+        elif (pxname, svname) in by_name:
+            state = [by_name[(pxname, svname)]]
+        else:
+            state = []
         return state or None
 
 
-    def wait_until_status(self, pxname, svname, status):
+    def wait_until_status(self, pxnames, svname, status):
         """
-        Wait for a service to reach the specified status. Try RETRIES times
-        with INTERVAL seconds of sleep in between. If the service has not reached
-        the expected status in that time, the module will fail. If the service was 
+        Wait for services to reach the specified status. Try RETRIES times
+        with INTERVAL seconds of sleep in between, checking all of them on
+        one 'show stat' snapshot each time. If a service has not reached
+        the expected status in that time, the module will fail. If the service was
         not found, the module will fail.
         """
+        pending = list(pxnames)
         for i in range(1, self.wait_retries):
-            state = self.get_state_for(pxname, svname)
+            stats = self.get_stats()
 
             # We can assume there will only be 1 element in state because both svname and pxname are always set when we get here
-            if state[0]['status'] == status:
+            pending = [pxname for pxname in pending if self.get_state_for(pxname, svname, stats)[0]['status'] != status]
+            if not pending:
                 return True
             else:
                 time.sleep(self.wait_interval)
 
-        self.module.fail_json(msg="server %s/%s not status '%s' after %d retries. Aborting." % (pxname, svname, status, self.wait_retries))
+        self.module.fail_json(msg="server %s/%s not status '%s' after %d retries. Aborting." % (pending[0], svname, status, self.wait_retries))
 
 
     def enabled(self, host, backend, weight):
@@ -310,6 +433,7 @@ class HAProxy(object):
         # Get the state after the run
         state_after = self.get_state_for(self.backend, self.host)
         self.command_results['state_after'] = state_after
+        self.close()
 
         # Report change status
         if state_before != state_after:
@@ -347,5 +471,6 @@ def main():
 # import module snippets
 from ansible.module_utils.basic import *
 
-main()
+if __name__ == '__main__':
+    main()
 
@@ -24,11 +24,18 @@ __author__ = 'cschmidt'
 from lxml import etree
 import os
 import hashlib
-import sys
 import posixpath
+import shutil
+import threading
+import json
 import urlparse
 from ansible.module_utils.basic import *
 from ansible.module_utils.urls import *
+from ansible.module_utils.pycompat24 import get_exception
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 try:
     import boto3
     HAS_BOTO = True
@@ -109,6 +116,54 @@ options:
         default: 'yes'
         choices: ['yes', 'no']
         version_added: "1.9.3"
+    checksum_alg:
+        description:
+            - The checksum published next to the artifact in the repository to verify it against,
+              both for an existing C(dest) and for a downloaded file.
+        required: false
+        default: md5
+        choices: [md5, sha1, sha256]
+        version_added: "2.3"
+    chunk_size:
+        description:
+            - The number of bytes read from the network or disk at a time.
+        required: false
+        default: 65536
+        version_added: "2.3"
+    cache_dir:
+        description:
+            - A directory to keep verified artifacts in, laid out like a Maven repository, so they are
+              downloaded only once per host however many destinations or runs use them.
+            - Parsed C(maven-metadata.xml) files are kept there too, and revalidated with conditional
+              requests (ETag / If-Modified-Since) when resolving C(latest) and SNAPSHOT versions.
+            - Interrupted downloads are kept as C(.part) files and resumed with an HTTP range request.
+            - Destinations copied from the cache get the modification time of the cache entry, and are
+              not hashed again as long as their size and modification time match it.
+        required: false
+        default: null
+        version_added: "2.3"
+    cache_max_size:
+        description:
+            - The maximum size of C(cache_dir) in megabytes. The least recently used artifacts are
+              removed once it is exceeded. Unlimited by default.
+            - Only the artifacts count towards it; the cached C(maven-metadata.xml) files are never removed.
+        required: false
+        default: null
+        version_added: "2.3"
+    artifacts:
+        description:
+            - A list of artifacts to download, each a dictionary of C(group_id), C(artifact_id), C(dest)
+              and optionally C(version), C(classifier) and C(extension).
+            - The artifacts are downloaded concurrently. Mutually exclusive with C(group_id) and C(artifact_id).
+        required: false
+        default: null
+        version_added: "2.3"
+    concurrency:
+        description:
+            - The number of artifacts downloaded at the same time when using C(artifacts).
+        required: false
+        default: 4
+        version_added: "2.3"
 '''
 
 EXAMPLES = '''
@@ -123,6 +178,17 @@ EXAMPLES = '''
 
 # Download a WAR File to the Tomcat webapps directory to be deployed
 - maven_artifact: group_id=com.company artifact_id=web-app extension=war repository_url=https://repo.company.com/maven dest=/var/lib/tomcat7/webapps/web-app.war
+
+# Download the jars of a service concurrently, through a local cache verified with SHA-1
+- maven_artifact:
+    repository_url: https://repo.company.com/maven
+    cache_dir: /var/cache/maven_artifact
+    cache_max_size: 2048
+    checksum_alg: sha1
+    concurrency: 8
+    artifacts:
+      - { group_id: com.company, artifact_id: library-name, version: 1.2.0, dest: /opt/service/lib/ }
+      - { group_id: com.company, artifact_id: web-app, extension: war, dest: /opt/service/web-app.war }
 '''
 
 class Artifact(object):
@@ -192,30 +258,239 @@ class Artifact(object):
             return None
 
 
+CHECKSUM_ALGORITHMS = ("md5", "sha1", "sha256")
+
+
+class ArtifactCache(object):
+    """On-disk cache of verified artifacts, shared between runs and artifacts.
+
+    Files are stored under the repository layout (group/artifact/version/file),
+    so the key is the group, artifact, version and classifier/extension of the
+    artifact. Each file has a sidecar holding the checksum it was verified
+    against, so a cache hit does not need to hash the file again.
+    """
+
+    def __init__(self, path, max_size=None):
+        self.path = path
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entry_locks = {}
+
+    def lock_for(self, path):
+        """A lock serializing the downloads of one cache entry"""
+        self.lock.acquire()
+        try:
+            return self.entry_locks.setdefault(path, threading.Lock())
+        finally:
+            self.lock.release()
+
+    def path_for(self, artifact, url):
+        return os.path.join(self.path, artifact.path(), posixpath.basename(url))
+
+    def metadata_path_for(self, base, path):
+        # Several repositories may publish metadata for the same coordinates
+        repository = hashlib.sha1(base.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.path, path, "maven-metadata-%s.json" % repository)
+
+    def load_metadata(self, path):
+        if not os.path.exists(path):
+            return None
+        try:
+            f = open(path, 'r')
+            try:
+                return json.loads(f.read())
+            finally:
+                f.close()
+        except (IOError, ValueError):
+            return None
+
+    def store_metadata(self, path, entry):
+        if not os.path.exists(os.path.dirname(path)):
+            try:
+                os.makedirs(os.path.dirname(path))
+            except OSError:
+                if not os.path.isdir(os.path.dirname(path)):
+                    raise
+        tmp = "%s.%s.tmp" % (path, threading.current_thread().ident)
+        f = open(tmp, 'w')
+        try:
+            f.write(json.dumps(entry))
+        finally:
+            f.close()
+        os.rename(tmp, path)
+
+    def lookup(self, path, algorithm, checksum):
+        sidecar = path + "." + algorithm
+        if not (os.path.exists(path) and os.path.exists(sidecar)):
+            return False
+        f = open(sidecar, 'r')
+        try:
+            stored = f.read().strip()
+        finally:
+            f.close()
+        if stored != checksum:
+            return False
+        # Mark the entry as recently used for eviction
+        os.utime(path, None)
+        return True
+
+    def store(self, path, algorithm, checksum):
+        f = open(path + "." + algorithm, 'w')
+        try:
+            f.write(checksum)
+        finally:
+            f.close()
+
+    def is_copy(self, path, algorithm, filename):
+        """Whether filename is an unmodified copy of the entry at path, going by its
+        size and the modification time given to copies by mark_copy"""
+        if not os.path.exists(filename):
+            return False
+        st = os.stat(filename)
+        return st.st_size == os.path.getsize(path) and \
+            int(st.st_mtime) == int(os.path.getmtime(path + "." + algorithm))
+
+    def mark_copy(self, path, algorithm, filename):
+        """Give a verified copy of the entry at path the modification time of its sidecar"""
+        mtime = os.path.getmtime(path + "." + algorithm)
+        os.utime(filename, (mtime, mtime))
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_size bytes"""
+        if not self.max_size:
+            return []
+
+        self.lock.acquire()
+        try:
+            entries = []
+            total = 0
+            for dirpath, dirnames, filenames in os.walk(self.path):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    # Only artifacts count: partial downloads, checksum sidecars and
+                    # the small parsed metadata files are neither counted nor evicted
+                    if filename.endswith(".part") or os.path.splitext(filename)[1][1:] in CHECKSUM_ALGORITHMS:
+                        continue
+                    if filename.startswith("maven-metadata-") and filename.endswith(".json"):
+                        continue
+                    st = os.stat(path)
+                    entries.append((st.st_mtime, st.st_size, path))
+                    total += st.st_size
+
+            entries.sort()
+            evicted = []
+            for mtime, size, path in entries:
+                if total <= self.max_size:
+                    break
+                for name in [path] + [path + "." + a for a in CHECKSUM_ALGORITHMS]:
+                    if os.path.exists(name):
+                        os.remove(name)
+                total -= size
+                evicted.append(path)
+            return evicted
+        finally:
+            self.lock.release()
+
+
+class RaisingModule(object):
+    """The module as seen by fetch_url, which reports some errors with
+    fail_json. Those are raised as ValueError instead, so that a download
+    running on a worker thread does not exit on its own."""
+    def __init__(self, module):
+        self.module = module
+
+    def __getattr__(self, name):
+        return getattr(self.module, name)
+
+    def fail_json(self, **kwargs):
+        raise ValueError(kwargs.get('msg', 'Request failed'))
+
+
 class MavenDownloader:
-    def __init__(self, module, base="http://repo1.maven.org/maven2"):
+    def __init__(self, module, base="http://repo1.maven.org/maven2", cache=None, checksum_alg="md5", chunk_size=65536):
         self.module = module
         if base.endswith("/"):
             base = base.rstrip("/")
         self.base = base
         self.user_agent = "Maven Artifact Downloader/1.0"
+        self.cache = cache
+        self.checksum_alg = checksum_alg
+        self.chunk_size = chunk_size
+        self.metadata = {}
+        self.metadata_lock = threading.Lock()
+
+    def _metadata(self, path):
+        """Return the parsed maven-metadata.xml of path, as a dict of versions,
+        timestamp and build_number.
+
+        Parsed metadata is kept for the run, and in cache_dir along with the
+        ETag and Last-Modified validators of the response. A cached copy is
+        revalidated with a conditional GET, so an unchanged maven-metadata.xml
+        is neither transferred nor parsed again.
+        """
+        self.metadata_lock.acquire()
+        try:
+            if path in self.metadata:
+                return self.metadata[path]
+        finally:
+            self.metadata_lock.release()
+
+        cache_file = None
+        entry = None
+        if self.cache is not None:
+            cache_file = self.cache.metadata_path_for(self.base, path)
+            entry = self.cache.load_metadata(cache_file)
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response, info = self._request(self.base + "/%s/maven-metadata.xml" % path, "Failed to download maven-metadata.xml",
+                                       lambda r, i: (r, i), headers=headers or None, accepted=(200, 304))
+
+        if info["status"] == 304 and entry is not None:
+            metadata = entry["metadata"]
+        else:
+            if info["status"] == 304:
+                # Not modified, but we have nothing cached: fetch it unconditionally
+                response, info = self._request(self.base + "/%s/maven-metadata.xml" % path, "Failed to download maven-metadata.xml",
+                                               lambda r, i: (r, i))
+            xml = etree.parse(response)
+            timestamp = xml.xpath("/metadata/versioning/snapshot/timestamp/text()")
+            buildNumber = xml.xpath("/metadata/versioning/snapshot/buildNumber/text()")
+            metadata = dict(
+                versions=[str(v) for v in xml.xpath("/metadata/versioning/versions/version/text()")],
+                timestamp=timestamp and str(timestamp[0]) or None,
+                build_number=buildNumber and str(buildNumber[0]) or None,
+            )
+            if cache_file is not None and (info.get("etag") or info.get("last-modified")):
+                self.cache.store_metadata(cache_file, dict(etag=info.get("etag"), last_modified=info.get("last-modified"), metadata=metadata))
+
+        self.metadata_lock.acquire()
+        try:
+            self.metadata[path] = metadata
+        finally:
+            self.metadata_lock.release()
+        return metadata
 
     def _find_latest_version_available(self, artifact):
-        path = "/%s/maven-metadata.xml" % (artifact.path(False))
-        xml = self._request(self.base + path, "Failed to download maven-metadata.xml", lambda r: etree.parse(r))
-        v = xml.xpath("/metadata/versioning/versions/version[last()]/text()")
+        v = self._metadata(artifact.path(False))["versions"]
         if v:
-            return v[0]
+            return v[-1]
 
     def find_uri_for_artifact(self, artifact):
         if artifact.version == "latest":
             artifact.version = self._find_latest_version_available(artifact)
 
         if artifact.is_snapshot():
-            path = "/%s/maven-metadata.xml" % (artifact.path())
-            xml = self._request(self.base + path, "Failed to download maven-metadata.xml", lambda r: etree.parse(r))
-            timestamp = xml.xpath("/metadata/versioning/snapshot/timestamp/text()")[0]
-            buildNumber = xml.xpath("/metadata/versioning/snapshot/buildNumber/text()")[0]
+            metadata = self._metadata(artifact.path())
+            timestamp = metadata["timestamp"]
+            buildNumber = metadata["build_number"]
+            if timestamp is None or buildNumber is None:
+                raise ValueError("No snapshot timestamp and build number in maven-metadata.xml for " + str(artifact))
             return self._uri_for_artifact(artifact, artifact.version.replace("SNAPSHOT", timestamp + "-" + buildNumber))
 
         return self._uri_for_artifact(artifact, artifact.version)
@@ -230,7 +505,7 @@ class MavenDownloader:
 
         return posixpath.join(self.base, artifact.path(), artifact.artifact_id + "-" + version + "." + artifact.extension)
 
-    def _request(self, url, failmsg, f):
+    def _request(self, url, failmsg, f, headers=None, accepted=(200,)):
         url_to_use = url
         parsed_url = urlparse(url)
         if parsed_url.scheme=='s3':
@@ -245,75 +520,196 @@ class MavenDownloader:
         self.module.params['url_password'] = self.module.params.get('password', '')
         self.module.params['http_agent'] = self.module.params.get('user_agent', None)
 
-        response, info = fetch_url(self.module, url_to_use)
-        if info['status'] != 200:
+        response, info = fetch_url(RaisingModule(self.module), url_to_use, headers=headers)
+        if info['status'] not in accepted:
             raise ValueError(failmsg + " because of " + info['msg'] + "for URL " + url_to_use)
         else:
-            return f(response)
+            return f(response, info)
 
 
     def download(self, artifact, filename=None):
+        """Make sure filename holds the artifact. Returns True if it had to be written."""
         filename = artifact.get_filename(filename)
         if not artifact.version or artifact.version == "latest":
             artifact = Artifact(artifact.group_id, artifact.artifact_id, self._find_latest_version_available(artifact),
                                 artifact.classifier, artifact.extension)
 
         url = self.find_uri_for_artifact(artifact)
-        if not self.verify_md5(filename, url + ".md5"):
-            response = self._request(url, "Failed to download artifact " + str(artifact), lambda r: r)
-            if response:
-                f = open(filename, 'w')
-                # f.write(response.read())
-                self._write_chunks(response, f, report_hook=self.chunk_report)
-                f.close()
-                return True
-            else:
+        checksum = self._remote_checksum(url)
+
+        if self.cache is None:
+            if os.path.exists(filename) and self._local_checksum(filename) == checksum:
                 return False
-        else:
+            self._fetch(url, filename, checksum, artifact)
             return True
 
-    def chunk_report(self, bytes_so_far, chunk_size, total_size):
-        percent = float(bytes_so_far) / total_size
-        percent = round(percent * 100, 2)
-        sys.stdout.write("Downloaded %d of %d bytes (%0.2f%%)\r" %
-                         (bytes_so_far, total_size, percent))
+        cached = self.cache.path_for(artifact, url)
+        lock = self.cache.lock_for(cached)
+        lock.acquire()
+        try:
+            if self.cache.lookup(cached, self.checksum_alg, checksum):
+                # filename was copied from the verified entry, no need to hash it again
+                if self.cache.is_copy(cached, self.checksum_alg, filename):
+                    return False
+                up_to_date = os.path.exists(filename) and self._local_checksum(filename) == checksum
+            else:
+                if not os.path.exists(os.path.dirname(cached)):
+                    try:
+                        os.makedirs(os.path.dirname(cached))
+                    except OSError:
+                        # Created concurrently by another download
+                        if not os.path.isdir(os.path.dirname(cached)):
+                            raise
+                up_to_date = os.path.exists(filename) and self._local_checksum(filename) == checksum
+                if up_to_date:
+                    # Fill the cache from filename rather than downloading the artifact again
+                    tmp = cached + ".tmp"
+                    shutil.copyfile(filename, tmp)
+                    os.rename(tmp, cached)
+                else:
+                    self._fetch(url, cached, checksum, artifact)
+                self.cache.store(cached, self.checksum_alg, checksum)
+        finally:
+            lock.release()
+
+        if up_to_date:
+            self.cache.mark_copy(cached, self.checksum_alg, filename)
+            return False
 
-        if bytes_so_far >= total_size:
-            sys.stdout.write('\n')
+        tmp = filename + ".tmp"
+        shutil.copyfile(cached, tmp)
+        self.cache.mark_copy(cached, self.checksum_alg, tmp)
+        os.rename(tmp, filename)
+        return True
+
+    def _fetch(self, url, filename, checksum, artifact):
+        """Download url to filename through a .part file, resuming an interrupted
+        download with an HTTP Range request, and verify it against checksum."""
+        part = filename + ".part"
+        digest = hashlib.new(self.checksum_alg)
+        offset = 0
+        headers = None
+
+        if os.path.exists(part):
+            offset = os.path.getsize(part)
+        if offset:
+            headers = {'Range': 'bytes=%d-' % offset}
+
+        try:
+            response, info = self._request(url, "Failed to download artifact " + str(artifact), lambda r, i: (r, i),
+                                           headers=headers, accepted=(200, 206, 416))
+        except ValueError:
+            if not offset:
+                raise
+            response, info = None, {'status': 416}
+
+        if info['status'] == 416:
+            # The partial file can not be resumed, start over
+            os.remove(part)
+            offset = 0
+            response, info = self._request(url, "Failed to download artifact " + str(artifact), lambda r, i: (r, i))
+
+        if info['status'] == 206:
+            # Account for what was already downloaded
+            f = open(part, 'rb')
+            try:
+                for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                    digest.update(chunk)
+            finally:
+                f.close()
+            f = open(part, 'ab')
+        else:
+            f = open(part, 'wb')
+
+        try:
+            self._write_chunks(response, f, digest)
+        finally:
+            f.close()
+
+        if digest.hexdigest() != checksum:
+            os.remove(part)
+            raise ValueError("Checksum mismatch for downloaded artifact " + str(artifact))
+
+        os.rename(part, filename)
 
-    def _write_chunks(self, response, file, chunk_size=8192, report_hook=None):
-        total_size = response.info().getheader('Content-Length').strip()
-        total_size = int(total_size)
+    def _write_chunks(self, response, file, digest=None):
         bytes_so_far = 0
 
         while 1:
-            chunk = response.read(chunk_size)
+            chunk = response.read(self.chunk_size)
             bytes_so_far += len(chunk)
 
             if not chunk:
                 break
 
             file.write(chunk)
-            if report_hook:
-                report_hook(bytes_so_far, chunk_size, total_size)
+            if digest:
+                digest.update(chunk)
 
         return bytes_so_far
 
-    def verify_md5(self, file, remote_md5):
+    def _remote_checksum(self, url):
+        remote = self._request(url + "." + self.checksum_alg, "Failed to download " + self.checksum_alg.upper(), lambda r, i: r.read())
+        # Checksum files may be followed by the file name
+        if isinstance(remote, bytes):
+            remote = remote.decode('ascii')
+        return remote.strip().split()[0].lower()
+
+    def verify_checksum(self, file, url):
         if not os.path.exists(file):
             return False
         else:
-            local_md5 = self._local_md5(file)
-            remote = self._request(remote_md5, "Failed to download MD5", lambda r: r.read())
-            return local_md5 == remote
+            return self._local_checksum(file) == self._remote_checksum(url)
 
-    def _local_md5(self, file):
-        md5 = hashlib.md5()
+    def _local_checksum(self, file):
+        digest = hashlib.new(self.checksum_alg)
         f = open(file, 'rb')
-        for chunk in iter(lambda: f.read(8192), ''):
-            md5.update(chunk)
+        for chunk in iter(lambda: f.read(self.chunk_size), b''):
+            digest.update(chunk)
         f.close()
-        return md5.hexdigest()
+        return digest.hexdigest()
+
+
+def download_artifacts(downloader, items, concurrency):
+    """Download many (artifact, dest) items on a pool of threads.
+    Returns the list of (item, changed, error) in the order of items."""
+    results = [None] * len(items)
+    work = queue.Queue()
+    for index, item in enumerate(items):
+        work.put((index, item))
+
+    def worker():
+        while True:
+            try:
+                index, (artifact, dest) = work.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                results[index] = (artifact, dest, downloader.download(artifact, dest), None)
+            except:
+                # Anything, even SystemExit, must still leave a result
+                e = get_exception()
+                results[index] = (artifact, dest, False, str(e) or e.__class__.__name__)
+
+    threads = []
+    for i in range(min(concurrency, len(items))):
+        t = threading.Thread(target=worker)
+        t.daemon = True
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+
+    return results
+
+
+def artifact_dest(artifact, dest):
+    if os.path.isdir(dest):
+        dest = posixpath.join(dest, artifact.artifact_id + "-" + artifact.version + "." + artifact.extension)
+    path = os.path.dirname(dest)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    return artifact.get_filename(dest)
 
 
 def main():
@@ -330,12 +726,20 @@ def main():
             state = dict(default="present", choices=["present","absent"]), # TODO - Implement a "latest" state
             dest = dict(type="path", default=None),
             validate_certs = dict(required=False, default=True, type='bool'),
-        )
+            checksum_alg = dict(default="md5", choices=list(CHECKSUM_ALGORITHMS)),
+            chunk_size = dict(default=65536, type='int'),
+            cache_dir = dict(type="path", default=None),
+            cache_max_size = dict(default=None, type='int'),
+            artifacts = dict(default=None, type='list'),
+            concurrency = dict(default=4, type='int'),
+        ),
+        mutually_exclusive = [['artifacts', 'group_id'], ['artifacts', 'artifact_id']],
     )
 
     try:
         parsed_url = urlparse(module.params["repository_url"])
-    except AttributeError as e:
+    except AttributeError:
+        e = get_exception()
         module.fail_json(msg='url parsing went wrong %s' % e)
 
     if parsed_url.scheme=='s3' and not HAS_BOTO:
@@ -351,39 +755,78 @@ def main():
     repository_password = module.params["password"]
     state = module.params["state"]
     dest = module.params["dest"]
+    cache_dir = module.params["cache_dir"]
+    cache_max_size = module.params["cache_max_size"]
 
     if not repository_url:
         repository_url = "http://repo1.maven.org/maven2"
 
+    if module.params["chunk_size"] < 1:
+        module.fail_json(msg="chunk_size must be a positive number of bytes")
+
+    cache = None
+    if cache_dir:
+        if cache_max_size:
+            cache_max_size = cache_max_size * 1024 * 1024
+        cache = ArtifactCache(cache_dir, cache_max_size)
+
     #downloader = MavenDownloader(module, repository_url, repository_username, repository_password)
-    downloader = MavenDownloader(module, repository_url)
+    downloader = MavenDownloader(module, repository_url, cache, module.params["checksum_alg"], module.params["chunk_size"])
+
+    if module.params["artifacts"] is not None:
+        items = []
+        for spec in module.params["artifacts"]:
+            if not isinstance(spec, dict) or not spec.get("dest"):
+                module.fail_json(msg="Each item of artifacts must be a dictionary with a dest")
+            try:
+                artifact = Artifact(spec.get("group_id"), spec.get("artifact_id"), spec.get("version", "latest"),
+                                    spec.get("classifier"), spec.get("extension", "jar"))
+            except ValueError:
+                e = get_exception()
+                module.fail_json(msg=e.args[0])
+            items.append((artifact, artifact_dest(artifact, os.path.expanduser(spec["dest"]))))
+
+        results = []
+        failed = []
+        for artifact, item_dest, item_changed, error in download_artifacts(downloader, items, max(module.params["concurrency"], 1)):
+            result = dict(artifact=str(artifact), dest=item_dest, changed=item_changed)
+            if error:
+                result["msg"] = error
+                failed.append(str(artifact))
+            results.append(result)
+
+        evicted = []
+        if cache is not None:
+            evicted = cache.evict()
+
+        changed = len([r for r in results if r["changed"]]) > 0
+        if failed:
+            module.fail_json(msg="Unable to download artifact(s) %s" % ", ".join(failed), results=results, changed=changed)
+        module.exit_json(state=state, results=results, evicted=evicted, repository_url=repository_url, changed=changed)
 
     try:
         artifact = Artifact(group_id, artifact_id, version, classifier, extension)
-    except ValueError as e:
+    except ValueError:
+        e = get_exception()
         module.fail_json(msg=e.args[0])
 
-    prev_state = "absent"
-    if os.path.isdir(dest):
-        dest = posixpath.join(dest, artifact_id + "-" + version + "." + extension)
-    if os.path.lexists(dest) and downloader.verify_md5(dest, downloader.find_uri_for_artifact(artifact) + '.md5'):
-        prev_state = "present"
-    else:
-        path = os.path.dirname(dest)
-        if not os.path.exists(path):
-            os.makedirs(path)
-
-    if prev_state == "present":
-        module.exit_json(dest=dest, state=state, changed=False)
+    dest = artifact_dest(artifact, dest)
 
     try:
-        if downloader.download(artifact, dest):
-            module.exit_json(state=state, dest=dest, group_id=group_id, artifact_id=artifact_id, version=version, classifier=classifier, extension=extension, repository_url=repository_url, changed=True)
-        else:
-            module.fail_json(msg="Unable to download the artifact")
-    except ValueError as e:
+        changed = downloader.download(artifact, dest)
+    except ValueError:
+        e = get_exception()
         module.fail_json(msg=e.args[0])
 
+    evicted = []
+    if cache is not None:
+        evicted = cache.evict()
+
+    if not changed:
+        module.exit_json(dest=dest, state=state, changed=False, evicted=evicted)
+
+    module.exit_json(state=state, dest=dest, group_id=group_id, artifact_id=artifact_id, version=version, classifier=classifier, extension=extension, repository_url=repository_url, evicted=evicted, changed=True)
+
 
 
 if __name__ == '__main__':
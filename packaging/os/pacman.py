@@ -118,38 +118,127 @@ import os
 import re
 import sys
 
-def get_version(pacman_output):
-    """Take pacman -Qi or pacman -Si output and get the Version"""
-    lines = pacman_output.split('\n')
-    for line in lines:
-        if 'Version' in line:
-            return line.split(':')[1].strip()
-    return None
-
-def query_package(module, pacman_path, name, state="present"):
-    """Query the package status in both the local system and the repository. Returns a boolean to indicate if the package is installed, a second boolean to indicate if the package is up-to-date and a third boolean to indicate whether online information were available"""
-    if state == "present":
-        lcmd = "%s -Qi %s" % (pacman_path, name)
-        lrc, lstdout, lstderr = module.run_command(lcmd, check_rc=False)
-        if lrc != 0:
-            # package is not installed locally
-            return False, False, False
+def get_installed_versions(module, pacman_path):
+    """Get the version of every locally installed package with one pacman -Q"""
+    cmd = "%s -Q" % (pacman_path)
+    rc, stdout, stderr = module.run_command(cmd, check_rc=False)
+    if rc != 0:
+        module.fail_json(msg="could not list installed packages: %s" % stderr)
+
+    versions = {}
+    for line in stdout.split('\n'):
+        fields = line.split()
+        if len(fields) >= 2:
+            versions[fields[0]] = fields[1]
+    return versions
+
+def get_provided_versions(module, pacman_path, names):
+    """Look up names that are not installed under their own name with one pacman -Qi,
+    which also matches packages by what they provide (e.g. sh is provided by bash).
+    Returns a dict mapping each name found to the name and version of the package
+    providing it."""
+    cmd = "%s -Qi %s" % (pacman_path, " ".join(names))
+    # pacman exits with 1 when some of the names are not found, the others are still listed
+    rc, stdout, stderr = module.run_command(cmd, check_rc=False)
 
+    packages = []
+    info, key = {}, None
+    for line in stdout.split('\n'):
+        if not line.strip():
+            if info:
+                packages.append(info)
+            info, key = {}, None
+        elif line[0].isspace() and key is not None:
+            info[key] += ' ' + line.strip()
+        elif ':' in line:
+            key, value = line.split(':', 1)
+            key = key.strip()
+            info[key] = value.strip()
+    if info:
+        packages.append(info)
+
+    provided = {}
+    for info in packages:
+        if 'Name' not in info:
+            continue
+        provides = [re.split('[<>=]', p)[0] for p in info.get('Provides', '').split()]
+        for name in names:
+            if name not in provided and (name == info['Name'] or name in provides):
+                provided[name] = (info['Name'], info.get('Version'))
+    return provided
+
+def get_repo_versions(module, pacman_path):
+    """Get the version of every package in the sync repositories with one pacman -Sl.
+    Packages are indexed both by name, for the first repository providing them as
+    pacman would pick it, and by repo/name."""
+    cmd = "%s -Sl" % (pacman_path)
+    rc, stdout, stderr = module.run_command(cmd, check_rc=False)
+    if rc != 0:
+        return None
+
+    versions = {}
+    for line in stdout.split('\n'):
+        fields = line.split()
+        if len(fields) >= 3:
+            repo, name, version = fields[:3]
+            versions["%s/%s" % (repo, name)] = version
+            if name not in versions:
+                versions[name] = version
+    return versions
+
+def query_packages(module, pacman_path, packages, state="present"):
+    """Query the status of all packages in both the local system and the repository.
+    Returns a dict mapping each package to a tuple of a boolean to indicate if the package is installed,
+    a second boolean to indicate if the package is up-to-date and a third boolean to indicate whether
+    online information were not available"""
+    installed_versions = get_installed_versions(module, pacman_path)
+    repo_versions = None
+    if state == "latest":
+        repo_versions = get_repo_versions(module, pacman_path)
+
+    # names that are only provided by another package are resolved in one more call
+    missing = []
+    for package in packages:
+        name = package.split('/')[-1]
+        if name not in installed_versions and name not in missing:
+            missing.append(name)
+    provided = {}
+    if missing:
+        provided = get_provided_versions(module, pacman_path, missing)
+
+    status = {}
+    for package in packages:
         # get the version installed locally (if any)
-        lversion = get_version(lstdout)
+        name = package.split('/')[-1]
+        lversion = installed_versions.get(name)
+        if lversion is None and name in provided:
+            provider, lversion = provided[name]
+            package_name = package[:-len(name)] + provider
+        else:
+            package_name = package
+        if lversion is None:
+            # package is not installed locally
+            status[package] = (False, False, False)
+            continue
 
-        rcmd = "%s -Si %s" % (pacman_path, name)
-        rrc, rstdout, rstderr = module.run_command(rcmd, check_rc=False)
-        # get the version in the repository
-        rversion = get_version(rstdout)
+        if state != "latest":
+            status[package] = (True, True, False)
+            continue
 
-        if rrc == 0:
-            # Return True to indicate that the package is installed locally, and the result of the version number comparison
-            # to determine if the package is up-to-date.
-            return True, (lversion == rversion), False
+        # get the version in the repository
+        rversion = None
+        if repo_versions is not None:
+            rversion = repo_versions.get(package_name)
+
+        if rversion is not None:
+            # The package is installed locally, and the result of the version number comparison
+            # determines if the package is up-to-date.
+            status[package] = (True, (lversion == rversion), False)
+        else:
+            # package is installed but cannot fetch remote Version. Last True stands for the error
+            status[package] = (True, True, True)
 
-    # package is installed but cannot fetch remote Version. Last True stands for the error
-        return True, True, True
+    return status
 
 
 def update_package_db(module, pacman_path):
@@ -194,37 +283,37 @@ def remove_packages(module, pacman_path, packages):
     else:
         args = "R"
 
-    remove_c = 0
-    # Using a for loop incase of error, we can report the package that failed
+    # Query the packages first, to see if we even need to remove
+    status = query_packages(module, pacman_path, packages)
+    to_remove = []
     for package in packages:
-        # Query the package first, to see if we even need to remove
-        installed, updated, unknown = query_package(module, pacman_path, package)
-        if not installed:
-            continue
+        if status[package][0] and package not in to_remove:
+            to_remove.append(package)
 
-        cmd = "%s -%s %s --noconfirm" % (pacman_path, args, package)
+    if to_remove:
+        # Remove all packages in a single transaction
+        cmd = "%s -%s %s --noconfirm" % (pacman_path, args, " ".join(to_remove))
         rc, stdout, stderr = module.run_command(cmd, check_rc=False)
 
         if rc != 0:
-            module.fail_json(msg="failed to remove %s" % (package))
-
-        remove_c += 1
+            module.fail_json(msg="failed to remove %s: %s" % (", ".join(to_remove), stderr))
 
-    if remove_c > 0:
-
-        module.exit_json(changed=True, msg="removed %s package(s)" % remove_c)
+        module.exit_json(changed=True, msg="removed %s package(s)" % len(to_remove))
 
     module.exit_json(changed=False, msg="package(s) already absent")
 
 
 def install_packages(module, pacman_path, state, packages, package_files):
-    install_c = 0
     package_err = []
     message = ""
+    to_install = []
+    to_install_files = []
+
+    status = query_packages(module, pacman_path, packages, state)
 
     for i, package in enumerate(packages):
         # if the package is installed and state == present or state == latest and is up-to-date then skip
-        installed, updated, latestError = query_package(module, pacman_path, package)
+        installed, updated, latestError = status[package]
         if latestError and state == 'latest':
             package_err.append(package)
 
@@ -232,17 +321,24 @@ def install_packages(module, pacman_path, state, packages, package_files):
             continue
 
         if package_files[i]:
-            params = '-U %s' % package_files[i]
-        else:
-            params = '-S %s' % package
+            if package_files[i] not in to_install_files:
+                to_install_files.append(package_files[i])
+        elif package not in to_install:
+            to_install.append(package)
+
+    # Install all packages from the repositories, then all package files,
+    # each in a single transaction
+    for params, targets in (('-S', to_install), ('-U', to_install_files)):
+        if not targets:
+            continue
 
-        cmd = "%s %s --noconfirm --needed" % (pacman_path, params)
+        cmd = "%s %s %s --noconfirm --needed" % (pacman_path, params, " ".join(targets))
         rc, stdout, stderr = module.run_command(cmd, check_rc=False)
 
         if rc != 0:
-            module.fail_json(msg="failed to install %s" % (package))
+            module.fail_json(msg="failed to install %s: %s" % (", ".join(targets), stderr))
 
-        install_c += 1
+    install_c = len(to_install) + len(to_install_files)
 
     if state == 'latest' and len(package_err) > 0:
         message = "But could not ensure 'latest' state for %s package(s) as remote version could not be fetched." % (package_err)
@@ -254,8 +350,9 @@ def install_packages(module, pacman_path, state, packages, package_files):
 
 def check_packages(module, pacman_path, packages, state):
     would_be_changed = []
+    status = query_packages(module, pacman_path, packages, state)
     for package in packages:
-        installed, updated, unknown = query_package(module, pacman_path, package)
+        installed, updated, unknown = status[package]
         if ((state in ["present", "latest"] and not installed) or
                 (state == "absent" and installed) or
                 (state == "latest" and not updated)):
@@ -272,16 +369,21 @@ def check_packages(module, pacman_path, packages, state):
 def expand_package_groups(module, pacman_path, pkgs):
     expanded = []
 
-    for pkg in pkgs:
-        cmd = "%s -Sgq %s" % (pacman_path, pkg)
-        rc, stdout, stderr = module.run_command(cmd, check_rc=False)
+    # List the members of every group at once rather than querying each name
+    cmd = "%s -Sg" % (pacman_path)
+    rc, stdout, stderr = module.run_command(cmd, check_rc=False)
 
-        if rc == 0:
+    groups = {}
+    if rc == 0:
+        for line in stdout.split('\n'):
+            fields = line.split()
+            if len(fields) == 2:
+                groups.setdefault(fields[0], []).append(fields[1])
+
+    for pkg in pkgs:
+        if pkg in groups:
             # A group was found matching the name, so expand it
-            for name in stdout.split('\n'):
-                name = name.strip()
-                if name:
-                    expanded.append(name)
+            expanded.extend(groups[pkg])
         else:
             expanded.append(pkg)
 
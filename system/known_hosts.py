@@ -26,14 +26,16 @@ description:
    - The M(known_hosts) module lets you add or remove a host keys from the C(known_hosts) file.
    - Starting at Ansible 2.2, multiple entries per host are allowed, but only one for each key type supported by ssh.
      This is useful if you're going to want to use the M(git) module over ssh, for example.
-   - If you have a very large number of host keys to manage, you will find the M(template) module more useful.
+   - If you have a very large number of host keys to manage, you will find the M(template) module more useful,
+     or use C(keys) to apply all of them in a single write of the file.
 version_added: "1.9"
 options:
   name:
     aliases: [ 'host' ]
     description:
       - The host to add or remove (must match a host specified in key)
-    required: true
+      - Required unless C(keys) is given.
+    required: false
     default: null
   key:
     description:
@@ -51,6 +53,15 @@ options:
     choices: [ "present", "absent" ]
     required: no
     default: present
+  keys:
+    description:
+      - A list of entries to manage, each a dictionary with C(name), and optionally C(key) and C(state)
+        (which defaults to the C(state) option).
+      - All entries are applied in order to the file, which is then written once.
+      - Mutually exclusive with C(name) and C(key).
+    required: false
+    default: null
+    version_added: "2.3"
 requirements: [ ]
 author: "Matthew Vernon (@mcv21)"
 '''
@@ -61,6 +72,18 @@ EXAMPLES = '''
   known_hosts: path='/etc/ssh/ssh_known_hosts'
                name='foo.com.invalid'
                key="{{ lookup('file', 'pubkeys/foo.com.invalid') }}"
+
+# Add and remove several hosts with a single rewrite of the file
+- name: sync our servers into the system known_hosts
+  known_hosts:
+    path: /etc/ssh/ssh_known_hosts
+    keys:
+      - name: foo.com.invalid
+        key: "{{ lookup('file', 'pubkeys/foo.com.invalid') }}"
+      - name: "[bar.com.invalid]:2222"
+        key: "{{ lookup('file', 'pubkeys/bar.com.invalid') }}"
+      - name: old.com.invalid
+        state: absent
 '''
 
 # Makes sure public host keys are present or absent in the given known_hosts
@@ -72,175 +95,257 @@ EXAMPLES = '''
 #    key = line(s) to add to known_hosts file
 #    path = the known_hosts file to edit (default: ~/.ssh/known_hosts)
 #    state = absent|present (default: present)
+#    keys = list of name/key/state entries, applied in one write
 
 import os
 import os.path
 import tempfile
 import errno
 import re
+import hmac
+import base64
 from ansible.module_utils.pycompat24 import get_exception
 from ansible.module_utils.basic import *
 
+try:
+    from hashlib import sha1
+except ImportError:
+    import sha as sha1
+
 def enforce_state(module, params):
     """
-    Add or remove key.
+    Add or remove keys.
     """
 
-    host = params["name"]
-    key = params.get("key",None)
-    port = params.get("port",None)
     path = params.get("path")
-    state = params.get("state")
-    #Find the ssh-keygen binary
-    sshkeygen = module.get_bin_path("ssh-keygen",True)
-
-    # Trailing newline in files gets lost, so re-add if necessary
-    if key and key[-1] != '\n':
-        key+='\n'
-
-    if key is None and state != "absent":
-        module.fail_json(msg="No key specified when adding a host")
-
-    sanity_check(module,host,key,sshkeygen)
-
-    found,replace_or_add,found_line=search_for_host_key(module,host,key,path,sshkeygen)
-
-    #We will change state if found==True & state!="present"
-    #or found==False & state=="present"
-    #i.e found XOR (state=="present")
-    #Alternatively, if replace is true (i.e. key present, and we must change it)
-    if module.check_mode:
-        module.exit_json(changed = replace_or_add or (state=="present") != found)
-
-    #Now do the work.
-
-    #Only remove whole host if found and no key provided
-    if found and key is None and state=="absent":
-        module.run_command([sshkeygen,'-R',host,'-f',path], check_rc=True)
-        params['changed'] = True
-
-    #Next, add a new (or replacing) entry
-    if replace_or_add or found != (state=="present"):
-        try:
-            inf=open(path,"r")
-        except IOError:
-            e = get_exception()
-            if e.errno == errno.ENOENT:
-                inf=None
-            else:
-                module.fail_json(msg="Failed to read %s: %s" % \
-                                     (path,str(e)))
-        try:
-            outf=tempfile.NamedTemporaryFile(dir=os.path.dirname(path))
-            if inf is not None:
-                for line_number, line in enumerate(inf, start=1):
-                    if found_line==line_number and (replace_or_add or state=='absent'):
-                        continue # skip this line to replace its key
-                    outf.write(line)
-                inf.close()
+    if params.get("keys") is None:
+        entries = [dict(name=params["name"], key=params.get("key",None))]
+    else:
+        entries = params["keys"]
+
+    known_hosts = KnownHosts(module,path)
+
+    changed = False
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get("name"):
+            module.fail_json(msg="Each entry of keys must be a dictionary with a name")
+        host = entry["name"]
+        key = entry.get("key",None)
+        state = entry.get("state",params.get("state"))
+        if state not in ("present","absent"):
+            module.fail_json(msg="Invalid state '%s' for host %s" % (state,host))
+
+        # Trailing newline in files gets lost, so re-add if necessary
+        if key and key[-1] != '\n':
+            key+='\n'
+
+        if key is None and state != "absent":
+            module.fail_json(msg="No key specified when adding a host")
+
+        sanity_check(module,host,key)
+
+        found,replace_or_add,found_line=search_for_host_key(module,host,key,known_hosts)
+
+        #Only remove whole host if found and no key provided
+        if found and key is None and state=="absent":
+            known_hosts.remove_host(host)
+            changed = True
+
+        #We will change state if found==True & state!="present"
+        #or found==False & state=="present"
+        #i.e found XOR (state=="present")
+        #Alternatively, if replace is true (i.e. key present, and we must change it)
+        if replace_or_add or found != (state=="present"):
+            if found_line is not None and (replace_or_add or state=='absent'):
+                known_hosts.remove_line(found_line)
             if state == 'present':
-                outf.write(key)
-            outf.flush()
-            module.atomic_move(outf.name,path)
-        except (IOError,OSError):
-            e = get_exception()
-            module.fail_json(msg="Failed to write to file %s: %s" % \
-                                 (path,str(e)))
+                known_hosts.add(key)
+            changed = True
 
-        try:
-            outf.close()
-        except:
-            pass
-
-        params['changed'] = True
+    #Now do the work, in a single write.
+    if changed and not module.check_mode:
+        known_hosts.write()
 
+    params['changed'] = changed
     return params
 
-def sanity_check(module,host,key,sshkeygen):
+def sanity_check(module,host,key):
     '''Check supplied key is sensible
 
     host and key are parameters provided by the user; If the host
     provided is inconsistent with the key supplied, then this function
     quits, providing an error to the user.
-    sshkeygen is the path to ssh-keygen, found earlier with get_bin_path
     '''
     #If no key supplied, we're doing a removal, and have nothing to check here.
     if key is None:
         return
-    #Rather than parsing the key ourselves, get ssh-keygen to do it
-    #(this is essential for hashed keys, but otherwise useful, as the
-    #key question is whether ssh-keygen thinks the key matches the host).
-
-    #The approach is to write the key to a temporary file,
-    #and then attempt to look up the specified host in that file.
-    try:
-        outf=tempfile.NamedTemporaryFile()
-        outf.write(key)
-        outf.flush()
-    except IOError:
-        e = get_exception()
-        module.fail_json(msg="Failed to write to temporary file %s: %s" % \
-                             (outf.name,str(e)))
-    rc,stdout,stderr=module.run_command([sshkeygen,'-F',host,
-                                         '-f',outf.name],
-                                        check_rc=True)
-    try:
-        outf.close()
-    except:
-        pass
-
-    if stdout=='': #host not found
-        module.fail_json(msg="Host parameter does not match hashed host field in supplied key")
-
-def search_for_host_key(module,host,key,path,sshkeygen):
-    '''search_for_host_key(module,host,key,path,sshkeygen) -> (found,replace_or_add,found_line)
-
-    Looks up host and keytype in the known_hosts file path; if it's there, looks to see
+    #The key question is whether the host field of one of the supplied
+    #lines (possibly hashed) matches the host, the way ssh would see it.
+    for line in key.splitlines():
+        entry = parse_known_hosts_line(line)
+        if entry is not None and host_matches(entry['hosts'],host):
+            return
+
+    module.fail_json(msg="Host parameter does not match hashed host field in supplied key")
+
+def search_for_host_key(module,host,key,known_hosts):
+    '''search_for_host_key(module,host,key,known_hosts) -> (found,replace_or_add,found_line)
+
+    Looks up host and keytype in the parsed known_hosts file; if it's there, looks to see
     if one of those entries matches key. Returns:
     found (Boolean): is host found in path?
     replace_or_add (Boolean): is the key in path different to that supplied by user?
     found_line (int or None): the line where a key of the same type was found
     if found=False, then replace is always False.
-    sshkeygen is the path to ssh-keygen, found earlier with get_bin_path
     '''
-    if os.path.exists(path)==False:
-        return False, False, None
-    #openssh >=6.4 has changed ssh-keygen behaviour such that it returns
-    #1 if no host is found, whereas previously it returned 0
-    rc,stdout,stderr=module.run_command([sshkeygen,'-F',host,'-f',path],
-                                 check_rc=False)
-    if stdout=='' and stderr=='' and (rc==0 or rc==1):
-        return False, False, None #host not found, no other errors
-    if rc!=0: #something went wrong
-        module.fail_json(msg="ssh-keygen failed (rc=%d,stdout='%s',stderr='%s')" % (rc,stdout,stderr))
+    found_lines = known_hosts.find(host)
+    if not found_lines:
+        return False, False, None #host not found
 
     #If user supplied no key, we don't want to try and replace anything with it
     if key is None:
         return True, False, None
 
-    lines=stdout.split('\n')
     new_key = normalize_known_hosts_key(key, host)
 
-    for l in lines:
-        if l=='':
-            continue
-        elif l[0]=='#': # info output from ssh-keygen; contains the line number where key was found
-            try:
-                # This output format has been hardcoded in ssh-keygen since at least OpenSSH 4.0
-                # It always outputs the non-localized comment before the found key
-                found_line = int(re.search(r'found: line (\d+)', l).group(1))
-            except IndexError:
-                e = get_exception()
-                module.fail_json(msg="failed to parse output of ssh-keygen for line number: '%s'" % l)
-        else:
-            found_key = normalize_known_hosts_key(l,host)
-            if new_key==found_key: #found a match
-                return True, False, found_line  #found exactly the same key, don't replace
-            elif new_key['type'] == found_key['type']: # found a different key for the same key type
-                return True, True, found_line
+    for found_line in found_lines:
+        found_key = normalize_known_hosts_key(known_hosts.lines[found_line-1],host)
+        if new_key==found_key: #found a match
+            return True, False, found_line  #found exactly the same key, don't replace
+        elif new_key['type'] == found_key['type']: # found a different key for the same key type
+            return True, True, found_line
     #No match found, return found and replace, but no line
     return True, True, None
 
+def parse_known_hosts_line(line):
+    '''
+    Split a known_hosts line into its optional marker, host patterns, key type
+    and key. Returns None for blank, comment and malformed lines.
+    '''
+    fields = line.split()
+    if not fields or fields[0].startswith('#'):
+        return None
+    marker = None
+    if fields[0].startswith('@'):
+        marker = fields.pop(0)
+    if len(fields) < 3:
+        return None
+    return dict(marker=marker, hosts=fields[0], type=fields[1], key=fields[2])
+
+def hash_host(host, salt):
+    '''Hash host with salt the way ssh does for HashKnownHosts (HMAC-SHA1)'''
+    digest = hmac.new(salt, host.encode('utf-8'), sha1).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+def pattern_to_regex(pattern):
+    '''Compile an ssh host pattern, where only * and ? are special'''
+    regex = ''.join([re.escape(c) for c in pattern]).replace(r'\*', '.*').replace(r'\?', '.')
+    return re.compile('^%s$' % regex, re.IGNORECASE)
+
+def host_matches(hosts, host):
+    '''Does the host field of a known_hosts line match host?'''
+    if hosts.startswith('|1|'):
+        try:
+            salt, hashed = hosts[3:].split('|')
+            return hash_host(host, base64.b64decode(salt)) == hashed
+        except (ValueError, TypeError):
+            return False
+
+    matched = False
+    for pattern in hosts.split(','):
+        negated = pattern.startswith('!')
+        if negated:
+            pattern = pattern[1:]
+        if pattern_to_regex(pattern).match(host):
+            if negated:
+                return False
+            matched = True
+    return matched
+
+class KnownHosts(object):
+    '''
+    In-memory known_hosts file, with an index from plain host names to the
+    lines they appear on. Hashed and wildcard lines can not be indexed by
+    name and are matched one by one. Line numbers are 1-based and stay
+    stable: removed lines are blanked until the file is written.
+    '''
+
+    def __init__(self, module, path):
+        self.module = module
+        self.path = path
+        self.lines = []
+        self.index = {}
+        self.unindexed = []
+
+        try:
+            inf = open(path, "r")
+        except IOError:
+            e = get_exception()
+            if e.errno != errno.ENOENT:
+                module.fail_json(msg="Failed to read %s: %s" % (path,str(e)))
+        else:
+            try:
+                for line in inf:
+                    self._append(line)
+            finally:
+                inf.close()
+
+    def _append(self, line):
+        self.lines.append(line)
+        line_number = len(self.lines)
+        entry = parse_known_hosts_line(line)
+        if entry is None:
+            return
+        hosts = entry['hosts']
+        if hosts.startswith('|') or '*' in hosts or '?' in hosts or '!' in hosts:
+            self.unindexed.append(line_number)
+            return
+        for name in hosts.lower().split(','):
+            self.index.setdefault(name, []).append(line_number)
+
+    def find(self, host, markers=True):
+        '''Return the sorted numbers of the live lines matching host'''
+        found = []
+        for line_number in self.index.get(host.lower(), []) + self.unindexed:
+            line = self.lines[line_number-1]
+            if line is None:
+                continue
+            entry = parse_known_hosts_line(line)
+            if not markers and entry['marker'] is not None:
+                continue
+            if host_matches(entry['hosts'], host):
+                found.append(line_number)
+        found.sort()
+        return found
+
+    def add(self, key):
+        for line in key.splitlines():
+            self._append(line + '\n')
+
+    def remove_line(self, line_number):
+        self.lines[line_number-1] = None
+
+    def remove_host(self, host):
+        # Like ssh-keygen -R, @cert-authority and @revoked lines are kept
+        for line_number in self.find(host, markers=False):
+            self.remove_line(line_number)
+
+    def write(self):
+        try:
+            outf=tempfile.NamedTemporaryFile(mode='w',dir=os.path.dirname(self.path))
+            outf.write(''.join([line for line in self.lines if line is not None]))
+            outf.flush()
+            self.module.atomic_move(outf.name,self.path)
+        except (IOError,OSError):
+            e = get_exception()
+            self.module.fail_json(msg="Failed to write to file %s: %s" % \
+                                      (self.path,str(e)))
+
+        try:
+            outf.close()
+        except:
+            pass
+
 def normalize_known_hosts_key(key, host):
     '''
     Transform a key, either taken from a known_host file or provided by the
@@ -269,11 +374,14 @@ def main():
 
     module = AnsibleModule(
         argument_spec = dict(
-            name      = dict(required=True,  type='str', aliases=['host']),
+            name      = dict(required=False, type='str', aliases=['host']),
             key       = dict(required=False,  type='str'),
             path      = dict(default="~/.ssh/known_hosts", type='path'),
             state     = dict(default='present', choices=['absent','present']),
+            keys      = dict(required=False, type='list'),
             ),
+        required_one_of = [['name','keys']],
+        mutually_exclusive = [['name','keys'],['key','keys']],
         supports_check_mode = True
         )
 
@@ -8,6 +8,29 @@ import cloud.amazon.kinesis_stream as kinesis_stream
 aws_region = 'us-west-2'
 
 
+class PagedShardsClient(object):
+    """Serves describe_stream one page of shards at a time"""
+
+    def __init__(self, shard_count):
+        self.shard_ids = ['shardId-{0:012d}'.format(i) for i in range(shard_count)]
+        self.calls = list()
+
+    def describe_stream(self, **params):
+        self.calls.append(params)
+        start = 0
+        if 'ExclusiveStartShardId' in params:
+            start = self.shard_ids.index(params['ExclusiveStartShardId']) + 1
+        page = self.shard_ids[start:start + params['Limit']]
+        return {
+            'StreamDescription': {
+                'Shards': [{'ShardId': shard_id} for shard_id in page],
+                'HasMoreShards': start + len(page) < len(self.shard_ids),
+                'StreamName': params['StreamName'],
+                'StreamStatus': 'ACTIVE'
+            }
+        }
+
+
 class AnsibleKinesisStreamFunctions(unittest.TestCase):
 
     def test_convert_to_lower(self):
@@ -106,6 +129,26 @@ class AnsibleKinesisStreamFunctions(unittest.TestCase):
         self.assertTrue(success)
         self.assertEqual(stream, should_return)
 
+    def test_get_shards(self):
+        client = PagedShardsClient(250)
+        description, shards = kinesis_stream.get_shards(client, 'test')
+        self.assertEqual(
+            [shard['ShardId'] for shard in shards], client.shard_ids
+        )
+        self.assertEqual(len(client.calls), 3)
+        self.assertEqual(
+            client.calls[2]['ExclusiveStartShardId'], client.shard_ids[199]
+        )
+        self.assertFalse('Shards' in description)
+
+    def test_get_shards_count_only(self):
+        client = PagedShardsClient(250)
+        description, shard_count = (
+            kinesis_stream.get_shards(client, 'test', count_only=True)
+        )
+        self.assertEqual(shard_count, 250)
+        self.assertEqual(description['StreamStatus'], 'ACTIVE')
+
     def test_wait_for_status(self):
         client = boto3.client('kinesis', region_name=aws_region)
         success, err_msg, stream = (
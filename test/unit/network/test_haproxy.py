@@ -0,0 +1,114 @@
+#!/usr/bin/python
+
+import unittest
+
+import network.haproxy as haproxy
+
+
+class FakeModule(object):
+
+    def __init__(self, **params):
+        self.params = dict(state='disabled', host='web1', backend=None,
+                           weight=None, socket='/var/run/haproxy.sock',
+                           shutdown_sessions=False, fail_on_not_found=False,
+                           wait=True, wait_retries=5, wait_interval=0)
+        self.params.update(params)
+
+    def fail_json(self, **kwargs):
+        raise AssertionError(kwargs['msg'])
+
+
+class FakeSocket(object):
+    """
+    Answers like HAProxy in prompt mode: one response, ended by a prompt,
+    for every command of a line, all sent back in a single chunk.
+    """
+
+    def __init__(self):
+        self.status = {'www': 'UP', 'api': 'UP'}
+        self.lines = []
+        self.pending = ''
+
+    def show_stat(self):
+        stat = '# pxname,svname,status,weight,\n'
+        for backend in ('api', 'www'):
+            stat += '%s,web1,%s,1,\n%s,BACKEND,UP,1,\n' % (backend, self.status[backend], backend)
+        return stat + '\n'
+
+    def sendall(self, data):
+        for line in data.splitlines():
+            self.lines.append(line)
+            if line == 'prompt':
+                self.pending += '\n' + haproxy.PROMPT
+                continue
+            for cmd in line.split(';'):
+                cmd = cmd.strip()
+                out = '\n'
+                if cmd == 'show stat':
+                    out = self.show_stat()
+                elif cmd.startswith('get weight'):
+                    out = '1 (initial 1)\n\n'
+                elif cmd.startswith('disable server'):
+                    self.status[cmd.split()[2].split('/')[0]] = 'MAINT'
+                self.pending += out + haproxy.PROMPT
+
+    def recv(self, size):
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+
+    def close(self):
+        pass
+
+
+class AnsibleHAProxyFunctions(unittest.TestCase):
+
+    def make_client(self, **params):
+        client = haproxy.HAProxy(FakeModule(**params))
+        client.client = FakeSocket()
+        return client
+
+    def test_count_commands(self):
+        self.assertEqual(haproxy.count_commands('show stat'), 1)
+        self.assertEqual(haproxy.count_commands('get weight b/s; enable server b/s'), 2)
+        self.assertEqual(haproxy.count_commands(r'set server b/s agent-send a\;b'), 1)
+
+    def test_read_response_one_prompt_per_command(self):
+        client = self.make_client()
+        client.execute('get weight www/web1; disable server www/web1; disable server api/web1')
+        self.assertEqual(client.buffer, '')
+        by_name, by_svname, backends = client.get_stats()
+        self.assertEqual(sorted(backends), ['api', 'www'])
+        self.assertEqual(by_name[('www', 'web1')]['status'], 'MAINT')
+
+    def test_disable_all_backends_waits_for_maint(self):
+        client = self.make_client()
+        client.execute_for_backends('disable server $pxname/$svname', None, 'web1', 'MAINT')
+        self.assertEqual(client.client.status, {'www': 'MAINT', 'api': 'MAINT'})
+        self.assertEqual(client.buffer, '')
+        state = client.get_state_for(None, 'web1')
+        self.assertEqual([s['status'] for s in state], ['MAINT', 'MAINT'])
+
+    def test_many_backends_are_sent_in_chunks(self):
+        client = self.make_client()
+        names = ['backend%04d' % i for i in range(2000)]
+        sock = client.client
+        sock.status = dict([(name, 'UP') for name in names])
+        sent = []
+        sendall = sock.sendall
+        def record(data):
+            sent.append(data)
+            sendall(data)
+        sock.sendall = record
+        client.execute_lines(['disable server %s/web1' % name for name in names])
+        self.assertTrue(len(sent) > 1)
+        self.assertTrue(max([len(data) for data in sent]) <= haproxy.CLI_CHUNK_SIZE)
+        self.assertEqual(sum([data.count('\n') for data in sent]), 2000)
+        self.assertEqual(set(sock.status.values()), set(['MAINT']))
+        self.assertEqual(client.buffer, '')
+
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()